@@ -3,20 +3,42 @@ MODULE: app.py
 DESCRIPTION: Streamlit web interface for real-time survival predictions.
 
 INTEGRATION:
-- Loads 'titanic_model.pkl' (Random Forest Classifier).
-- Loads 'model_columns.pkl' to ensure input alignment.
+- Loads 'model_artifact/' (memory-mapped compiled Random Forest, feature columns and
+  fitted preprocessing state; see artifact_store.py).
+- Scores through `online_predictor.PassengerScorer`, cached across reruns with `st.cache_resource`
+  (artifacts are loaded once per server process, not on every interaction). Repeated inputs are
+  answered from its LRU prediction cache (prediction_cache.py).
+- When a fresh 'lookup_table/' exists (lookup_table.py), predictions are read from the precomputed
+  table for every widget combination instead of walking the forest.
+- With a 'model_registry/' (model_registry.py), newly published model versions are picked up
+  without a restart: a background watcher loads and warms them, then swaps them in between reruns.
+- "Why this prediction?" splits the passenger's survival probability into per-feature
+  contributions along the forest's decision paths (`PassengerScorer.explain_one`).
+- "Bulk CSV upload" scores a whole passenger file (test.csv schema) in chunks on a background thread
+  with the same cached model (bulk_scorer.py), showing progress, rows/sec and the first results while it
+  runs, then offers the submission.csv download.
 
 TESTING (Boundary Value Analysis):
 - Age Range: 0.42 to 80.0 years.
 - Pclass: 1, 2, 3.
 - Fare: $0.00 to $512.33.
 
+MONITORING: `TITANIC_INSTRUMENT=1 streamlit run app.py` records per-request latency (instrumentation.py)
+and refreshes 'app_metrics.prom' (Prometheus text format) after every prediction.
+
 USAGE: Run via 'streamlit run app.py' or view live on Streamlit Cloud.
 """
 
-import streamlit as st
+import os
+import time
 import pandas as pd
-import joblib
+import streamlit as st
+from online_predictor import PassengerScorer
+from bulk_scorer import BulkScoringJob
+from lookup_table import LookupScorer
+from artifact_store import ArtifactError
+from model_registry import ModelWatcher, is_registry
+from instrumentation import span, is_enabled, write_prometheus
 
 # --- SIDEBAR DOCUMENTATION ---
 with st.sidebar:
@@ -36,38 +58,106 @@ with st.sidebar:
     st.caption("Developed by Preety Gupta | 2026")
     st.caption("Check out the full code on [GitHub](https://github.com/preetygupta23/titanic-predictor.git)")
 
-# Load the trained model and the column names
-model = joblib.load('titanic_model.pkl')
-model_columns = joblib.load('model_columns.pkl')
+# Load the trained model, column names and preprocessing state once per process
+@st.cache_resource
+def get_scorer():
+    return PassengerScorer.load('model_artifact', cache_size=50_000)
+
+
+# With a model registry: the served version follows its CURRENT pointer (polled in the background)
+@st.cache_resource
+def get_watcher():
+    if not is_registry('model_registry'):
+        return None
+    return ModelWatcher('model_registry', lambda path: PassengerScorer.load(path, cache_size=50_000),
+                        probe=lambda scorer: scorer.predict_one(3, 'male', 22, 1, 0, 7.25, 'S')).start()
+
+
+# Precomputed answers for the app's inputs; None until `python lookup_table.py` builds it for this model
+@st.cache_resource
+def get_table():
+    try:
+        return LookupScorer.load('lookup_table', artifact_dir='model_artifact')
+    except ArtifactError:
+        return None
+
+
+watcher = get_watcher()
+# Read once per rerun: a swap during this run does not change the model it uses
+scorer = watcher.active if watcher is not None else get_scorer()
+# The table is built for model_artifact/; a registry may already serve a newer model
+table = get_table() if watcher is None else None
 
 st.title("🚢 Titanic Survival Predictor")
-st.write("Enter passenger details to see if they would have survived the sinking.")
-
-# User Inputs
-pclass = st.selectbox("Ticket Class (1 = 1st, 2 = 2nd, 3 = 3rd)", [1, 2, 3])
-sex = st.selectbox("Gender", ["male", "female"])
-age = st.slider("Age", 0, 100, 30)
-sibsp = st.number_input("Siblings/Spouses Aboard", 0, 10, 0)
-parch = st.number_input("Parents/Children Aboard", 0, 10, 0)
-fare = st.number_input("Fare Paid", 0.0, 500.0, 32.0)
-embarked = st.selectbox("Port of Embarkation", ["S", "C", "Q"])
-
-# Prediction Logic
-if st.button("Predict Survival"):
-    # Create a dataframe for the input
-    input_data = pd.DataFrame([[pclass, sex, age, sibsp, parch, fare, embarked]],
-                              columns=['Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare', 'Embarked'])
-
-    # Simple manual preprocessing to match our pipeline
-    input_data['Sex_male'] = 1 if sex == 'male' else 0
-    # (Note: For a full app, you'd import your preprocessor.py functions here)
-
-    # Align columns with model
-    input_data = input_data.reindex(columns=model_columns, fill_value=0)
-
-    prediction = model.predict(input_data)
-
-    if prediction[0] == 1:
-        st.success("✨ This passenger would likely have SURVIVED.")
-    else:
-        st.error("💀 This passenger would likely NOT have survived.")
\ No newline at end of file
+single_tab, bulk_tab = st.tabs(["Single passenger", "Bulk CSV upload"])
+
+with single_tab:
+    st.write("Enter passenger details to see if they would have survived the sinking.")
+
+    # User Inputs
+    pclass = st.selectbox("Ticket Class (1 = 1st, 2 = 2nd, 3 = 3rd)", [1, 2, 3])
+    sex = st.selectbox("Gender", ["male", "female"])
+    age = st.slider("Age", 0, 100, 30)
+    sibsp = st.number_input("Siblings/Spouses Aboard", 0, 10, 0)
+    parch = st.number_input("Parents/Children Aboard", 0, 10, 0)
+    fare = st.number_input("Fare Paid", 0.0, 500.0, 32.0)
+    embarked = st.selectbox("Port of Embarkation", ["S", "C", "Q"])
+
+    # Prediction Logic
+    if st.button("Predict Survival"):
+        # Same Title/FamilySize/FareBin features as training, filled into a resident vector
+        # Per-request latency is recorded when the server runs with TITANIC_INSTRUMENT=1
+        with span('app.predict_one', rows_in=1):
+            prediction, probability = (table or scorer).predict_one(pclass, sex, age, sibsp, parch, fare, embarked)
+        if is_enabled():
+            write_prometheus('app_metrics.prom')
+
+        if prediction == 1:
+            st.success("✨ This passenger would likely have SURVIVED.")
+        else:
+            st.error("💀 This passenger would likely NOT have survived.")
+        st.caption(f"Estimated survival probability: {probability:.0%}")
+
+        # Per-feature contributions for this passenger (they add up to probability - baseline)
+        baseline, contributions = scorer.explain_one(pclass, sex, age, sibsp, parch, fare, embarked)
+        with st.expander("Why this prediction?"):
+            st.write(f"Baseline survival rate in training: {baseline:.0%}")
+            reasons = pd.Series(contributions).loc[lambda s: s.abs() > 0.005]
+            st.bar_chart(reasons.reindex(reasons.abs().sort_values(ascending=False).index).rename('Contribution'))
+
+with bulk_tab:
+    st.write("Upload a passenger CSV in the test.csv schema to score every row.")
+    upload = st.file_uploader("Passenger CSV", type='csv')
+    with_probability = st.checkbox("Include survival probabilities")
+    if upload is not None and st.button("Score file"):
+        previous = st.session_state.get('bulk_job')
+        if previous is not None:
+            previous.cleanup()
+        # Scored in chunks on a background thread with the cached model; this script only polls the job.
+        # The upload is read in place (it is seekable): no second in-memory copy of the file
+        st.session_state['bulk_job'] = BulkScoringJob(upload, scorer.forest, scorer.state,
+                                                      probabilities=with_probability).start()
+
+    job = st.session_state.get('bulk_job')
+    if job is not None:
+        stats = job.progress()
+        st.progress(stats['fraction'], text=f"{stats['rows']:,} rows scored")
+        rows_col, rate_col, time_col = st.columns(3)
+        rows_col.metric("Rows", f"{stats['rows']:,}")
+        rate_col.metric("Rows/sec", f"{stats['rows_per_sec']:,.0f}")
+        time_col.metric("Total latency" if stats['done'] else "Elapsed", f"{stats['elapsed']:.2f}s")
+        if stats['rows']:
+            st.caption(f"Predicted survivors so far: {stats['survivors']:,} ({stats['survivors'] / stats['rows']:.0%})"
+                       f" | first {len(stats['preview'])} rows:")
+            st.dataframe(stats['preview'])
+        if stats['error']:
+            st.error(f"❌ Could not score the file: {stats['error']}")
+        elif stats['done'] and not os.path.exists(job.output_path):
+            st.info("These results have expired: score the file again to download them.")
+        elif stats['done']:
+            with open(job.output_path, 'rb') as f:
+                st.download_button("Download submission.csv", f, file_name='submission.csv', mime='text/csv')
+        else:
+            # Poll for progress; any widget interaction starts a new run right away
+            time.sleep(0.5)
+            st.rerun()
@@ -0,0 +1,127 @@
+"""
+**Purpose**: Versioned, memory-mappable model artifact (`model_artifact/`).
+- **Layout**: `manifest.json` (format version, feature columns, fitted preprocessing state, array schema,
+  per-file SHA-256 and an overall checksum) plus one `.npy` file per compiled-forest array.
+- **`save_artifact(directory, model, preprocessor)`**: Compiles the Random Forest and writes the bundle.
+- **`load_artifact(directory)`**: Memory-maps the arrays read-only. Every scoring process on a host then shares
+  one copy through the OS page cache instead of unpickling a private model, and start-up does not import
+  scikit-learn at all (nor pandas: the fitted state stays a dict until `.preprocessor` is first used).
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+from tree_compiler import CompiledForest, compile_forest
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+
+class ArtifactError(Exception):
+    """Raised when an artifact is missing, from an unknown format version or fails its checksum."""
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _manifest_checksum(manifest):
+    """Checksum over everything in the manifest except the checksum itself."""
+    body = {key: value for key, value in manifest.items() if key != 'checksum'}
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+
+
+def save_artifact(directory, model, preprocessor):
+    """Writes the compiled model, fitted preprocessing state and column list to `directory`."""
+    os.makedirs(directory, exist_ok=True)
+    forest = compile_forest(model)
+
+    arrays = {}
+    for name, array in forest.to_arrays().items():
+        file_name = f'{name}.npy'
+        path = os.path.join(directory, file_name)
+        np.save(path, np.ascontiguousarray(array))
+        arrays[name] = {'file': file_name, 'dtype': str(array.dtype), 'shape': list(np.shape(array)),
+                        'sha256': _sha256(path)}
+
+    state = preprocessor.get_state()
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'model_type': type(model).__name__,
+        'forest': forest.meta(),
+        'columns': list(state['columns']),
+        'preprocessor_state': state,
+        'arrays': arrays,
+    }
+    manifest['checksum'] = _manifest_checksum(manifest)
+    with open(os.path.join(directory, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class ModelArtifact:
+    """Loaded artifact: `forest` (CompiledForest), `columns`, the fitted `state` dict and its `preprocessor`."""
+
+    def __init__(self, manifest, forest):
+        self.manifest = manifest
+        self.forest = forest
+        self.columns = manifest['columns']
+        self.state = manifest['preprocessor_state']
+        self._preprocessor = None
+
+    @property
+    def preprocessor(self):
+        # Built on first use: the pandas import is only paid by callers that transform DataFrames
+        if self._preprocessor is None:
+            from preprocessor import TitanicPreprocessor
+            self._preprocessor = TitanicPreprocessor(self.state)
+        return self._preprocessor
+
+    def predict(self, X):
+        return self.forest.predict(X)
+
+    def predict_proba(self, X):
+        return self.forest.predict_proba(X)
+
+
+def load_artifact(directory, verify=True, mmap_mode='r'):
+    """
+    Memory-maps the artifact in `directory`. `verify=True` also checks every array
+    file against the manifest SHA-256 (reads each file once, warming the page cache).
+    """
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        raise ArtifactError(f"No artifact manifest found at {manifest_path}")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported artifact format version: {manifest.get('format_version')}")
+    if manifest.get('checksum') != _manifest_checksum(manifest):
+        raise ArtifactError("Artifact manifest checksum mismatch")
+
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        path = os.path.join(directory, spec['file'])
+        if verify and _sha256(path) != spec['sha256']:
+            raise ArtifactError(f"Checksum mismatch for {spec['file']}")
+        array = np.load(path, mmap_mode=mmap_mode)
+        if str(array.dtype) != spec['dtype'] or list(array.shape) != spec['shape']:
+            raise ArtifactError(f"Schema mismatch for {spec['file']}")
+        arrays[name] = array
+    return ModelArtifact(manifest, CompiledForest.from_arrays(arrays, manifest['forest']))
+
+
+if __name__ == "__main__":
+    # Convert the existing joblib artifacts into the memory-mappable format
+    import joblib
+    from preprocessor import TitanicPreprocessor
+    model = joblib.load('titanic_model.pkl')
+    preprocessor = TitanicPreprocessor.load('preprocessor_state.pkl')
+    save_artifact('model_artifact', model, preprocessor)
+    print("✅ Wrote model_artifact/")
@@ -0,0 +1,80 @@
+"""
+**Purpose**: Per-prediction feature attributions for the saved Random Forest.
+- **Method**: Path decomposition (Saabas). Inside one tree, the survival probability of a leaf is the root's
+  value plus the change in node value at every split on the way down; each change is credited to the feature
+  that split. Averaged over the trees: `P(survived) = bias + sum(contributions)`, where `bias` is the mean root
+  value (the survival rate the forest saw in training).
+- **Vectorised**: `contributions(forest, X)` walks the compiled forest (`tree_compiler.py`) level by level for a
+  whole block of rows, like `CompiledForest.predict_proba`; every level adds one `bincount` into an
+  (rows x features) matrix, so explaining costs a small multiple of predicting.
+- **Outputs**: `explain_frame` (one column per model feature, plus Bias and Probability) for batch scoring
+  (`predict.py --explain PATH`); `PassengerScorer.explain_one` does the same walk for a single passenger (app).
+"""
+
+import numpy as np
+import pandas as pd
+from tree_compiler import CompiledForest, compile_forest, BLOCK_ROWS
+
+
+def as_forest(model):
+    """The compiled forest of a fitted RandomForestClassifier (a CompiledForest is returned as is)."""
+    return model if isinstance(model, CompiledForest) else compile_forest(model)
+
+
+def positive_class_index(forest):
+    """Row of `forest.value` holding P(Survived == 1)."""
+    classes = list(np.asarray(forest.classes))
+    return classes.index(1) if 1 in classes else len(classes) - 1
+
+
+def bias(forest):
+    value = forest.value[positive_class_index(forest)]
+    return float(value.take(forest.roots).mean())
+
+
+def _contributions_block(forest, X, value):
+    n, n_features = X.shape
+    node = np.repeat(forest.roots[:, np.newaxis], n, axis=1)
+    row_base = np.arange(n, dtype=np.intp) * n_features
+    X_flat = X.astype(np.float64).ravel()
+    out = np.zeros(n * n_features, dtype=np.float64)
+    for _ in range(forest.max_depth):
+        feature_pos = forest.feature.take(node)
+        feature_pos += row_base
+        go_left = X_flat.take(feature_pos) <= forest.threshold.take(node)
+        child = forest.right.take(node)
+        child += forest.left_minus_right.take(node) * go_left
+        # Leaves are their own child, so rows that already finished add exactly 0
+        out += np.bincount(feature_pos.ravel(), weights=(value.take(child) - value.take(node)).ravel(),
+                           minlength=n * n_features)
+        node = child
+    return out.reshape(n, n_features) / forest.n_trees
+
+
+def contributions(forest, X):
+    """(n_rows, n_features) contributions to P(survived); each row sums to its probability minus `bias`."""
+    forest = as_forest(forest)
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    value = forest.value[positive_class_index(forest)]
+    if X.shape[0] <= BLOCK_ROWS:
+        return _contributions_block(forest, X, value)
+    return np.concatenate([_contributions_block(forest, X[start:start + BLOCK_ROWS], value)
+                           for start in range(0, X.shape[0], BLOCK_ROWS)])
+
+
+def explain_frame(model, X, columns=None):
+    """Bias, Probability and one contribution column per feature for every row of the model matrix `X`."""
+    forest = as_forest(model)
+    columns = list(X.columns) if columns is None else list(columns)
+    contrib = contributions(forest, X)
+    base = bias(forest)
+    frame = pd.DataFrame(contrib, columns=columns, index=getattr(X, 'index', None))
+    frame.insert(0, 'Probability', base + contrib.sum(axis=1))
+    frame.insert(1, 'Bias', base)
+    return frame
+
+
+def top_reasons(contribution_row, k=3):
+    """The `k` features with the largest absolute contribution, as (feature, contribution) pairs."""
+    ordered = sorted(contribution_row.items(), key=lambda item: -abs(item[1]))
+    return ordered[:k]
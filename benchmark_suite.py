@@ -0,0 +1,192 @@
+"""
+**Purpose**: Per-stage performance benchmarks on synthetic data, with a JSON baseline and regression check.
+- **Data**: `synthetic_data.py` generates labelled and unlabelled CSVs of each requested size (cached on disk).
+- **Stages**: `load_titanic_data` (CSV parse and cache hit), `run_feature_engineering`, `clean_data`,
+  `clean_data_lean` (both steps in the memory-lean mode), training
+  (`train_on_features`, OOB mode) and `generate_predictions` (against the model trained in the same run),
+  each timed separately.
+- **Metrics**: Best wall time over `--repeats`, throughput (rows/sec) and peak traced memory (MB). Memory is
+  measured in a separate `tracemalloc` pass so tracing overhead never inflates the timings.
+- **Baseline**: `--output` writes a JSON file; `--compare BASELINE.json` re-runs the same sizes and flags every
+  stage whose time or peak memory grew by more than `--threshold` (exit code 1 on regressions).
+
+USAGE: python benchmark_suite.py --rows 1000 100000 --output benchmark_baseline.json
+       python benchmark_suite.py --compare benchmark_baseline.json --threshold 0.25
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+import sklearn
+from data_loader import load_titanic_data
+from feature_engineering import run_feature_engineering
+from preprocessor import clean_data, clean_data_lean, TitanicPreprocessor
+from model_trainer import train_on_features
+from predict import generate_predictions
+from synthetic_data import write_synthetic_csv
+
+STAGES = ['load', 'load_cached', 'feature_engineering', 'clean', 'clean_lean', 'train', 'predict']
+
+
+def dataset_paths(n_rows, data_dir='benchmark_data', seed=42):
+    """Labelled/unlabelled synthetic CSVs for `n_rows` (generated once, then reused)."""
+    os.makedirs(data_dir, exist_ok=True)
+    train_path = os.path.join(data_dir, f'train_{n_rows}.csv')
+    test_path = os.path.join(data_dir, f'test_{n_rows}.csv')
+    if not os.path.exists(train_path):
+        write_synthetic_csv(train_path, n_rows, seed)
+    if not os.path.exists(test_path):
+        write_synthetic_csv(test_path, n_rows, seed + 1, labelled=False)
+    return train_path, test_path
+
+
+def stage_runners(train_path, test_path, work_dir, max_train_rows=None):
+    """Zero-argument callables per stage; each returns what the next stage needs."""
+    state = {}
+
+    def load():
+        # CSV parsing cost; `load_cached` measures the typed-frame cache hit
+        state['raw'] = load_titanic_data(train_path, cache=False)
+
+    def load_cached():
+        load_titanic_data(train_path, cache=True)
+
+    def feature_engineering():
+        state['engineered'] = run_feature_engineering(state['raw'].copy())
+
+    def clean():
+        clean_data(state['engineered'].copy())
+
+    def clean_lean():
+        clean_data_lean(state['raw'].copy(deep=False))
+
+    def train():
+        raw = state['raw'] if max_train_rows is None else state['raw'].iloc[:max_train_rows]
+        preprocessor = TitanicPreprocessor()
+        X = preprocessor.fit_transform(raw)
+        train_on_features(X, raw['Survived'].to_numpy(), preprocessor, cv_mode='oob', output_dir=work_dir)
+
+    def predict():
+        generate_predictions(test_path, os.path.join(work_dir, 'model_artifact'),
+                             os.path.join(work_dir, 'model_columns.pkl'),
+                             output_path=os.path.join(work_dir, 'submission.csv'))
+
+    return {'load': load, 'load_cached': load_cached, 'feature_engineering': feature_engineering, 'clean': clean,
+            'clean_lean': clean_lean, 'train': train, 'predict': predict}
+
+
+def _quiet(func):
+    """Runs `func` with the stage's own progress prints suppressed."""
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        try:
+            return func()
+        finally:
+            sys.stdout = stdout
+
+
+def benchmark_size(n_rows, repeats=3, memory=True, data_dir='benchmark_data', max_train_rows=None):
+    """{stage: {rows, seconds, rows_per_sec, peak_mb}} for one dataset size."""
+    train_path, test_path = dataset_paths(n_rows, data_dir)
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        runners = stage_runners(train_path, test_path, work_dir, max_train_rows)
+        for stage in STAGES:
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                _quiet(runners[stage])
+                timings.append(time.perf_counter() - start)
+            peak_mb = None
+            if memory:
+                tracemalloc.start()
+                _quiet(runners[stage])
+                peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                tracemalloc.stop()
+            rows = min(n_rows, max_train_rows or n_rows) if stage == 'train' else n_rows
+            seconds = min(timings)
+            results[stage] = {'rows': rows, 'seconds': seconds, 'rows_per_sec': rows / seconds,
+                              'peak_mb': peak_mb}
+            print(f"{n_rows:>10,} rows | {stage:20} | {seconds:8.3f}s | {rows / seconds:>12,.0f} rows/s"
+                  + (f" | peak {peak_mb:8.1f} MB" if peak_mb is not None else ""))
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'sklearn': sklearn.__version__, 'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def run_benchmarks(sizes, repeats=3, memory=True, data_dir='benchmark_data', max_train_rows=None):
+    results = {str(n): benchmark_size(n, repeats, memory, data_dir, max_train_rows) for n in sizes}
+    return {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': environment(),
+            'settings': {'repeats': repeats, 'max_train_rows': max_train_rows}, 'results': results}
+
+
+def compare(current, baseline, threshold=0.2):
+    """Regressions: stages whose seconds or peak_mb exceed the baseline by more than `threshold`."""
+    regressions = []
+    for size, stages in current['results'].items():
+        for stage, now in stages.items():
+            before = baseline['results'].get(size, {}).get(stage)
+            if before is None:
+                continue
+            for metric in ('seconds', 'peak_mb'):
+                if now.get(metric) is None or before.get(metric) is None:
+                    continue
+                change = now[metric] / before[metric] - 1 if before[metric] else 0.0
+                if change > threshold:
+                    regressions.append({'rows': int(size), 'stage': stage, 'metric': metric,
+                                        'baseline': before[metric], 'current': now[metric], 'change': change})
+    return regressions
+
+
+def report_regressions(regressions, threshold):
+    if not regressions:
+        print(f"✅ No stage regressed by more than {threshold:.0%}.")
+        return
+    print(f"⚠️ {len(regressions)} regression(s) beyond {threshold:.0%}:")
+    for r in regressions:
+        print(f"   {r['rows']:>10,} rows | {r['stage']:20} | {r['metric']:8} | "
+              f"{r['baseline']:.3f} -> {r['current']:.3f} (+{r['change']:.0%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-stage pipeline benchmarks on synthetic data.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 100_000],
+                        help="Dataset sizes (1k to 10M)")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc pass")
+    parser.add_argument('--max-train-rows', type=int, default=None, help="Cap rows used by the train stage")
+    parser.add_argument('--data-dir', default='benchmark_data')
+    parser.add_argument('--output', default=None, help="Write the results as a JSON baseline")
+    parser.add_argument('--compare', default=None, help="Baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed relative slowdown / growth")
+    args = parser.parse_args()
+
+    baseline = None
+    sizes = args.rows
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sizes = [int(size) for size in baseline['results']]
+        settings = baseline.get('settings', {})
+        args.max_train_rows = settings.get('max_train_rows', args.max_train_rows)
+
+    current = run_benchmarks(sizes, args.repeats, not args.no_memory, args.data_dir, args.max_train_rows)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"✅ Benchmark results written to {args.output}")
+    if baseline is not None:
+        regressions = compare(current, baseline, args.threshold)
+        report_regressions(regressions, args.threshold)
+        sys.exit(1 if regressions else 0)
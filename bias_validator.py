@@ -2,51 +2,54 @@
 **Purpose**: Model Fairness/Unit Testing.
 - **Slicing**: Breaks down performance metrics by `Sex` and `Pclass`.
 - **Validation**: Ensures that the model is actually learning survival nuances for men and 3rd class passengers rather than just relying on majority-class statistics.
+- **Engine**: All slices come from one grouped pass over the confusion counts (`slice_audit.py`); `output_path`
+  also writes the full Sex x Pclass x AgeBin x Embarked x IsAlone table (CSV/JSON) with bootstrap CIs.
 """
 
-import pandas as pd
-import joblib
-from sklearn.metrics import accuracy_score, recall_score
-from preprocessor import clean_data
-from feature_engineering import run_feature_engineering  # <--- Add this import
+import numpy as np
+from data_loader import load_titanic_data
+from predict import load_assets
+from slice_audit import count_cells, audit_table, save_table
 
 
-def run_bias_audit(data_path, model_path):
+def run_bias_audit(data_path, model_path=None, predictions=None, output_path=None, n_bootstrap=0, workers=1):
+    """
+    Prints the Sex / Pclass audit and returns the slice table.
+    `predictions` (array aligned with the CSV rows) skips scoring; otherwise `model_path` is used.
+    """
     # 1. Load Model and Data
-    model = joblib.load(model_path)
-    raw_df = pd.read_csv(data_path)
-
-    # 2. Prepare Data
-    # FIRST: Create the new features (FamilySize, etc.)
-    engineered_df = run_feature_engineering(raw_df.copy())
-
-    # SECOND: Clean and Encode
-    cleaned_df = clean_data(engineered_df)
-
-    # THIRD: Align columns with what the model expects
-    X = cleaned_df.drop('Survived', axis=1)
-
-    # 3. Get Predictions
-    # We use the engineered/cleaned X to get predictions
-    raw_df['Predictions'] = model.predict(X)
+    raw_df = load_titanic_data(data_path)
+
+    # 2. Get Predictions (precomputed ones are reused as-is)
+    if predictions is None:
+        # model_path may be 'titanic_model.pkl' or the memory-mapped 'model_artifact/' directory
+        model, model_columns, preprocessor = load_assets(model_path)
+        # Create the engineered features, clean and encode with the training-time statistics,
+        # then align columns with what the model expects
+        X = preprocessor.transform(raw_df).reindex(columns=model_columns, fill_value=0)
+        predictions = model.predict(X)
+    raw_df['Predictions'] = np.asarray(predictions)
+
+    # 3. Confusion counts for every slice in one pass
+    table = audit_table(count_cells(raw_df), max_order=2, n_bootstrap=n_bootstrap, workers=workers)
+    if output_path:
+        save_table(table, output_path)
 
     print("\n=== MODEL BIAS AUDIT ===")
 
     # 4. Audit by Gender
-    for gender in ['male', 'female']:
-        subset = raw_df[raw_df['Sex'] == gender]
-        acc = accuracy_score(subset['Survived'], subset['Predictions'])
-        rec = recall_score(subset['Survived'], subset['Predictions'])
-        print(f"Gender: {gender:6} | Accuracy: {acc:.2f} | Recall (Survival): {rec:.2f}")
+    by_sex = table[table['slice'] == 'Sex'].set_index('Sex', drop=False)
+    for row in by_sex.reindex([g for g in ['male', 'female'] if g in by_sex.index]).itertuples():
+        print(f"Gender: {row.Sex:6} | Accuracy: {row.accuracy:.2f} | Recall (Survival): {row.recall:.2f}")
 
     print("-" * 35)
 
     # 5. Audit by Class
-    for pclass in sorted(raw_df['Pclass'].unique()):
-        subset = raw_df[raw_df['Pclass'] == pclass]
-        acc = accuracy_score(subset['Survived'], subset['Predictions'])
-        print(f"Class: {pclass}        | Accuracy: {acc:.2f}")
+    for row in table[table['slice'] == 'Pclass'].itertuples():
+        print(f"Class: {row.Pclass!s:8} | Accuracy: {row.accuracy:.2f}")
+
+    return table
 
 
 if __name__ == "__main__":
-    run_bias_audit('train.csv', 'titanic_model.pkl')
\ No newline at end of file
+    run_bias_audit('train.csv', 'model_artifact', output_path='bias_audit.csv', n_bootstrap=1000)
@@ -0,0 +1,162 @@
+"""
+**Purpose**: Background scoring of an uploaded passenger CSV (the Streamlit app's bulk mode).
+- **`BulkScoringJob(source, forest, state)`**: Reads a CSV in the `test.csv` schema (a path or a binary file
+  object such as a Streamlit upload) chunk by chunk on a background thread. Each chunk is encoded with
+  `FeatureEncoder` and scored by the forest the caller already holds (the app's cached `PassengerScorer`), so
+  nothing is reloaded per chunk and the UI thread only ever reads counters.
+- **Bounded memory**: Results are appended to a temporary `submission.csv`-style file as they are produced; the
+  job keeps counters and the first `preview_rows` results, so memory is one chunk whatever the upload size.
+- **Temporary outputs**: Written to one directory (`OUTPUT_DIR`). A job's file is deleted by `cleanup()` or, at
+  the latest, when the job object is garbage collected (e.g. its Streamlit session ended); files left by a crashed
+  process are swept once they are older than `OUTPUT_TTL` seconds, whenever a new job starts.
+- **Progress**: `progress()` can be called from the UI thread at any time: rows scored, share of the input read,
+  survivors so far, elapsed seconds, rows/sec, the preview and any error.
+
+USAGE: job = BulkScoringJob('test.csv', scorer.forest, scorer.state).start(); job.wait(); job.output_path
+"""
+
+import os
+import time
+import tempfile
+import weakref
+import threading
+import numpy as np
+import pandas as pd
+from data_loader import iter_titanic_chunks, GROUP_COLUMNS
+from fast_encoder import FeatureEncoder
+
+REQUIRED_COLUMNS = ['PassengerId', 'Pclass', 'Name', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare', 'Embarked']
+OUTPUT_DIR = os.path.join(tempfile.gettempdir(), 'titanic_bulk_scoring')
+OUTPUT_TTL = 6 * 3600
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def sweep_outputs(max_age=OUTPUT_TTL):
+    """Deletes job outputs older than `max_age` seconds (left behind by processes that did not clean up)."""
+    if not os.path.isdir(OUTPUT_DIR):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(OUTPUT_DIR):
+        path = os.path.join(OUTPUT_DIR, name)
+        if os.path.getmtime(path) < cutoff:
+            _remove(path)
+
+
+class BulkScoringJob:
+    """One uploaded file scored in chunks on a daemon thread; start with `start()`, poll with `progress()`."""
+
+    def __init__(self, source, forest, state, chunksize=20_000, probabilities=False, preview_rows=100):
+        self.source = source
+        self.forest = forest
+        self.encoder = FeatureEncoder(state)
+        # Ticket/Cabin are optional: read when present and the model uses group features
+        self.columns = REQUIRED_COLUMNS + (GROUP_COLUMNS if self.encoder.group_tables is not None else [])
+        self.chunksize = chunksize
+        self.probabilities = probabilities
+        self.preview_rows = preview_rows
+        sweep_outputs()
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        fd, self.output_path = tempfile.mkstemp(prefix='bulk_submission_', suffix='.csv', dir=OUTPUT_DIR)
+        os.close(fd)
+        # Runs on cleanup() or when the job is garbage collected, whichever comes first
+        self._remove_output = weakref.finalize(self, _remove, self.output_path)
+
+        self.rows = 0
+        self.survivors = 0
+        self.fraction = 0.0
+        self.preview = []
+        self.error = None
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def score_chunk(self, chunk):
+        """Submission rows for one DataFrame chunk: PassengerId, Survived (and Probability)."""
+        X = self.encoder.transform(chunk)
+        proba = self.forest.predict_proba(X)
+        result = pd.DataFrame({'PassengerId': chunk['PassengerId'].to_numpy(),
+                               'Survived': np.asarray(self.forest.classes).take(np.argmax(proba, axis=1))})
+        if self.probabilities:
+            result['Probability'] = proba[:, 1]
+        return result
+
+    def _run(self):
+        handle = open(self.source, 'rb') if isinstance(self.source, (str, os.PathLike)) else self.source
+        try:
+            handle.seek(0, os.SEEK_END)
+            size = handle.tell()
+            handle.seek(0)
+            for i, chunk in enumerate(iter_titanic_chunks(handle, self.chunksize, columns=self.columns)):
+                if i == 0:
+                    missing = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+                    if missing:
+                        raise ValueError(f"Missing column(s) {', '.join(missing)}: expected the test.csv schema")
+                if self._cancel.is_set():
+                    break
+                result = self.score_chunk(chunk)
+                result.to_csv(self.output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+                with self._lock:
+                    self.rows += len(result)
+                    self.survivors += int(np.count_nonzero(result['Survived'].to_numpy() == 1))
+                    # The parser reads ahead, so this is the share of the input already consumed
+                    self.fraction = min(handle.tell() / size, 1.0) if size else 1.0
+                    if len(self.preview) < self.preview_rows:
+                        self.preview.extend(result.head(self.preview_rows - len(self.preview)).to_dict('records'))
+            if self.rows == 0:
+                self.score_chunk(pd.DataFrame(columns=REQUIRED_COLUMNS)).to_csv(self.output_path, index=False)
+        except Exception as error:  # Reported through progress(); the UI decides how to show it
+            self.error = str(error)
+        finally:
+            if handle is not self.source:
+                handle.close()
+            self.finished = time.perf_counter()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='bulk-scoring', daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    def progress(self):
+        with self._lock:
+            elapsed = ((self.finished or time.perf_counter()) - self.started) if self.started else 0.0
+            return {'rows': self.rows, 'survivors': self.survivors, 'done': self.done, 'error': self.error,
+                    'fraction': 1.0 if self.done and self.error is None else self.fraction,
+                    'elapsed': elapsed, 'rows_per_sec': self.rows / elapsed if elapsed > 0 else 0.0,
+                    'preview': pd.DataFrame(self.preview)}
+
+    def cleanup(self):
+        """Stops the job and deletes its output file."""
+        self.cancel()
+        if self._thread is not None:
+            self._thread.join()
+        self._remove_output()
+
+
+if __name__ == "__main__":
+    # Throughput check on the bundled test file, with the app's resident scorer
+    from online_predictor import PassengerScorer
+    scorer = PassengerScorer.load('model_artifact')
+    job = BulkScoringJob('test.csv', scorer.forest, scorer.state, chunksize=100).start().wait()
+    stats = job.progress()
+    print(f"Scored {stats['rows']:,} rows in {stats['elapsed']:.3f}s ({stats['rows_per_sec']:,.0f} rows/sec) "
+          f"-> {job.output_path}")
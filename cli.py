@@ -0,0 +1,209 @@
+"""
+**Purpose**: One command-line entry point: `python cli.py {train,audit,predict,serve} ...`.
+- **Lazy imports**: Only the standard library is imported up front; every subcommand imports what it needs
+  when it runs. `--help` never loads pandas or scikit-learn, scoring (`predict`, `serve`) never imports the
+  scikit-learn training / CV modules, and only `train` and `audit` pay for them.
+- **Single passenger**: `predict --passenger Pclass=3 Sex=male Age=22 ...` scores one row straight from the
+  memory-mapped `model_artifact/` (compiled forest + fitted state): NumPy only, no pandas, no scikit-learn.
+  Sex / Embarked / Pclass must be one of their levels and `Title` one of the model's titles.
+- **Import profiling**: `--import-profile` prints the time and the number of modules each lazy import cost and
+  which heavy packages ended up loaded (for a per-module breakdown: `python -X importtime cli.py ...`).
+- **Arguments**: The `add_*_arguments` builders are also used by the modules' own `__main__` blocks, so
+  `python predict.py` and `python cli.py predict` accept the same flags.
+
+USAGE: python cli.py predict --input test.csv --output submission.csv
+       python cli.py predict --passenger Pclass=1 Sex=female Age=29 SibSp=0 Parch=0 Fare=80 Embarked=C
+       python cli.py train --cv-mode oob
+       python cli.py serve --port 8000 --import-profile
+"""
+
+import sys
+import json
+import time
+import argparse
+import importlib
+from instrumentation import add_arguments as add_instrumentation_arguments
+
+HEAVY_PACKAGES = ['pandas', 'sklearn', 'scipy', 'joblib', 'streamlit']
+PASSENGER_FIELDS = {'Pclass': int, 'Sex': str, 'Age': float, 'SibSp': int, 'Parch': int, 'Fare': float,
+                    'Embarked': str, 'Title': str}
+# Levels of the categorical fields (also what the inference server validates JSON records against)
+CATEGORIES = {'Pclass': (1, 2, 3), 'Sex': ('female', 'male'), 'Embarked': ('C', 'Q', 'S')}
+
+_import_log = []
+
+
+def lazy_import(name):
+    """Imports `name`, recording how long it took and how many modules it pulled in."""
+    before = len(sys.modules)
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    _import_log.append((name, time.perf_counter() - start, len(sys.modules) - before))
+    return module
+
+
+def print_import_profile():
+    print("--- Import Profile ---")
+    for name, seconds, count in _import_log:
+        print(f"{name:20} {seconds * 1000:8.1f} ms | {count:4} new modules")
+    loaded = [package for package in HEAVY_PACKAGES if package in sys.modules]
+    print(f"Heavy packages loaded: {', '.join(loaded) or 'none'}")
+
+
+def add_train_arguments(parser):
+    parser.add_argument('--data', default='train.csv')
+    parser.add_argument('--n-jobs', type=int, default=None, help="Cores for CV folds and fitting (-1 = all)")
+    parser.add_argument('--cv-mode', choices=['kfold', 'oob'], default='kfold')
+    parser.add_argument('--cv-folds', type=int, default=5)
+    parser.add_argument('--registry', default=None, help="Also publish the model as a new version of this registry")
+    parser.add_argument('--group-features', action='store_true',
+                        help="Add ticket / surname / deck group sizes and out-of-fold survival rates")
+    add_instrumentation_arguments(parser)
+    return parser
+
+
+def add_audit_arguments(parser):
+    parser.add_argument('--data', default='train.csv')
+    parser.add_argument('--model', default='model_artifact', help="model_artifact/ directory or a joblib .pkl")
+    parser.add_argument('--output', default='bias_audit.csv', help="Full slice table (CSV or JSON)")
+    parser.add_argument('--bootstrap', type=int, default=1000, help="Bootstrap resamples for the CIs")
+    parser.add_argument('--workers', type=int, default=1)
+    add_instrumentation_arguments(parser)
+    return parser
+
+
+def add_predict_arguments(parser):
+    parser.add_argument('--input', default='test.csv', help="Passenger CSV in the test.csv schema")
+    parser.add_argument('--model', default='model_artifact',
+                        help="model_artifact/ directory, a model_registry/ or a joblib .pkl model")
+    parser.add_argument('--columns', default='model_columns.pkl')
+    parser.add_argument('--output', default='submission.csv')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="Rows per chunk/shard (enables streaming mode)")
+    parser.add_argument('--workers', type=int, default=1, help="Scoring processes")
+    parser.add_argument('--dedupe', action='store_true',
+                        help="Score each distinct feature row once per chunk (repetitive inputs)")
+    parser.add_argument('--explain', default=None,
+                        help="Also write per-row feature contributions (and probabilities) to this CSV")
+    parser.add_argument('--drift-report', default=None,
+                        help="Write input/prediction drift scores vs the training data to this JSON file")
+    add_instrumentation_arguments(parser)
+    return parser
+
+
+def add_serve_arguments(parser):
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model', default='model_artifact',
+                        help="model_artifact/ directory or a model_registry/ (hot-reloads new versions)")
+    parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds between registry checks")
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--cache-size', type=int, default=0, help="LRU prediction cache entries (0 = off)")
+    parser.add_argument('--drift', action='store_true', help="Monitor input/prediction drift (GET /drift)")
+    return parser
+
+
+def parse_passenger(fields, titles=None):
+    """
+    ['Pclass=3', 'Sex=male', 'Age=', ...] -> keyword arguments of `PassengerScorer.predict_one`.
+    Categorical fields must be one of their levels, and `Title` one of the model's `titles` when given.
+    """
+    values = {}
+    for field in fields:
+        key, _, raw = field.partition('=')
+        if key not in PASSENGER_FIELDS:
+            raise ValueError(f"Unknown passenger field '{key}'. Use: {', '.join(PASSENGER_FIELDS)}")
+        # Empty / NaN values are left to the fitted imputation, as in the CSV path
+        values[key.lower()] = None if raw in ('', 'nan', 'NaN') else PASSENGER_FIELDS[key](raw)
+    missing = [key for key in ('Pclass', 'Sex', 'SibSp', 'Parch') if key.lower() not in values]
+    if missing:
+        raise ValueError(f"Missing passenger field(s): {', '.join(missing)}")
+    for key, levels in CATEGORIES.items():
+        if values.get(key.lower()) is not None and values[key.lower()] not in levels:
+            raise ValueError(f"{key}: expected one of {', '.join(map(str, levels))}, got {values[key.lower()]!r}")
+    if titles is not None and values.get('title') is not None and values['title'] not in titles:
+        raise ValueError(f"Title: expected one of {', '.join(titles)}, got {values['title']!r}")
+    values.setdefault('age', None)
+    values.setdefault('fare', None)
+    values.setdefault('embarked', None)
+    return values
+
+
+def run_train(args):
+    instrumentation = lazy_import('instrumentation')
+    model_trainer = lazy_import('model_trainer')
+    instrumentation.start_from_args(args)
+    model = model_trainer.train_titanic_model(args.data, n_jobs=args.n_jobs, cv_mode=args.cv_mode,
+                                              cv_folds=args.cv_folds, registry=args.registry,
+                                              group_features=args.group_features)
+    model_trainer.get_feature_importance(model, model.feature_names_in_)
+    instrumentation.finish_from_args(args)
+
+
+def run_audit(args):
+    instrumentation = lazy_import('instrumentation')
+    bias_validator = lazy_import('bias_validator')
+    instrumentation.start_from_args(args)
+    bias_validator.run_bias_audit(args.data, args.model, output_path=args.output, n_bootstrap=args.bootstrap,
+                                  workers=args.workers)
+    instrumentation.finish_from_args(args)
+
+
+def run_predict(args):
+    if args.passenger:
+        online_predictor = lazy_import('online_predictor')
+        scorer = online_predictor.PassengerScorer.load(args.model, args.columns)
+        try:
+            passenger = parse_passenger(args.passenger, scorer.titles)
+        except ValueError as e:
+            sys.exit(f"❌ {e}")
+        label, probability = scorer.predict_one(**passenger)
+        print(json.dumps({'Survived': label, 'probability': probability}))
+        return
+    instrumentation = lazy_import('instrumentation')
+    predict = lazy_import('predict')
+    instrumentation.start_from_args(args)
+    predict.generate_predictions(args.input, args.model, args.columns, chunksize=args.chunksize,
+                                 workers=args.workers, dedupe=args.dedupe, output_path=args.output,
+                                 drift_report=args.drift_report, explain_path=args.explain)
+    instrumentation.finish_from_args(args)
+
+
+def run_serve(args):
+    asyncio = lazy_import('asyncio')
+    inference_server = lazy_import('inference_server')
+    server = inference_server.InferenceServer(args.model, args.max_batch_size, args.max_wait_ms, args.cache_size,
+                                              args.drift, args.poll_interval)
+    if args.import_profile:
+        print_import_profile()
+    asyncio.run(server.serve(args.host, args.port))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description="Titanic survival model: train, audit, predict, serve.")
+    parser.add_argument('--import-profile', action='store_true', help="Print what each lazy import cost")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    train = add_train_arguments(commands.add_parser('train', help="Train, validate and save the model"))
+    train.set_defaults(run=run_train)
+    audit = add_audit_arguments(commands.add_parser('audit', help="Per-slice bias audit of a saved model"))
+    audit.set_defaults(run=run_audit)
+    predict = add_predict_arguments(commands.add_parser('predict', help="Score a CSV or a single passenger"))
+    predict.add_argument('--passenger', nargs='+', metavar='FIELD=VALUE',
+                         help="Score one passenger (Pclass, Sex, Age, SibSp, Parch, Fare, Embarked[, Title])")
+    predict.set_defaults(run=run_predict)
+    serve = add_serve_arguments(commands.add_parser('serve', help="HTTP/JSON scoring service"))
+    serve.set_defaults(run=run_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.run(args)
+    if args.import_profile and args.command != 'serve':
+        print_import_profile()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,207 @@
 """**Purpose**: Handles data ingestion and initial health checks.
 - **`load_titanic_data(file_path)`**: Safely reads CSV files and returns a DataFrame or None.
+    - *Schema*: Explicit compact dtypes (`SCHEMA`): categoricals for Sex/Embarked, int8/int16/int32 counts and ids.
+      Age and Fare stay float64: the fitted FareBin edges and imputation medians are float64 values, and
+      rounding the inputs to float32 could move a passenger across a bin edge.
+    - *Missing counts*: Only an integer column that actually has blanks falls back: to float64 (`Int64` for
+      PassengerId, so ids and the submission format stay integers). Sex/Embarked values outside the category list
+      are reported (and then treated as missing) instead of being dropped silently.
+    - *Column pruning*: Only the columns the pipeline uses are read (`PIPELINE_COLUMNS`); `columns='all'` or an
+      explicit list reads more (e.g. `PIPELINE_COLUMNS + GROUP_COLUMNS` for the Ticket/Cabin group features).
+    - *Arrow parser*: Used automatically when `pyarrow` is installed (`engine='auto'`).
+    - *Cache* (opt-in, `cache=True`; the training entry points use it): The typed frame is cached in
+      `.data_cache/` under the source file's SHA-256 (Parquet when a Parquet engine is installed, pickle otherwise),
+      so repeated loads skip CSV parsing entirely. Files scored once (test sets) are not cached or hashed; the
+      oldest cached frames are evicted once the directory exceeds `CACHE_MAX_BYTES`.
+- **`iter_titanic_chunks(file_path, chunksize)`**: The same schema and fallbacks, chunk by chunk (streaming scorers);
+  also reads open binary file objects (e.g. a Streamlit upload).
 - **`check_class_balance(df)`**: Performs an audit of the target variable (`Survived`).
     - *Metric*: Returns the percentage split.
     - *Goal*: Alert the user if the dataset is too skewed to train effectively.
 """
 
+import os
+import json
+import hashlib
+import warnings
 import pandas as pd
+from instrumentation import instrumented
 
-def load_titanic_data(file_path):
-    """Loads data and performs initial integrity checks."""
+try:
+    import pyarrow  # Optional: faster CSV parser and Parquet cache
+except ImportError:
+    pyarrow = None
+
+SCHEMA = {
+    'PassengerId': 'int32',
+    'Survived': 'int8',
+    'Pclass': 'int8',
+    'Name': 'object',
+    'Sex': pd.CategoricalDtype(['female', 'male']),
+    'Age': 'float64',
+    'SibSp': 'int8',
+    'Parch': 'int8',
+    'Ticket': 'object',
+    'Fare': 'float64',
+    'Cabin': 'object',
+    'Embarked': pd.CategoricalDtype(['C', 'Q', 'S']),
+}
+# Everything the pipeline reads downstream (Ticket/Cabin are dropped by clean_data anyway)
+PIPELINE_COLUMNS = ['PassengerId', 'Survived', 'Pclass', 'Name', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare', 'Embarked']
+# Also read for models trained with the opt-in group features (preprocessor.TitanicPreprocessor(group_features=True))
+GROUP_COLUMNS = ['Ticket', 'Cabin']
+CACHE_DIR = '.data_cache'
+CACHE_MAX_BYTES = 512 * 2 ** 20
+SCHEMA_VERSION = 2
+
+
+def _select_columns(file_path, columns):
+    header = list(pd.read_csv(file_path, nrows=0).columns)
+    if columns == 'all':
+        return header
+    wanted = PIPELINE_COLUMNS if columns is None else list(columns)
+    return [col for col in header if col in wanted]
+
+
+def _is_integer(dtype):
+    return str(dtype).startswith('int')
+
+
+def _dtypes(usecols, integers=True):
+    """Parser dtypes: categoricals are read as strings (checked by `_finish_types`); `integers=False` leaves the
+    integer columns to the parser's inference."""
+    dtypes = {}
+    for col in usecols:
+        dtype = SCHEMA.get(col)
+        if dtype is None or (_is_integer(dtype) and not integers):
+            continue
+        dtypes[col] = 'object' if isinstance(dtype, pd.CategoricalDtype) else dtype
+    return dtypes
+
+
+def _finish_types(df, source):
+    """Integer columns with blanks -> float64 (PassengerId -> Int64); unknown categorical levels are reported."""
+    for col in df.columns:
+        dtype = SCHEMA.get(col)
+        if dtype is None:
+            continue
+        if _is_integer(dtype) and df[col].dtype != dtype:
+            if df[col].isna().any():
+                df[col] = df[col].astype('Int64' if col == 'PassengerId' else 'float64')
+            else:
+                df[col] = df[col].astype(dtype)
+        elif isinstance(dtype, pd.CategoricalDtype) and df[col].dtype != dtype:
+            unknown = df[col].notna() & ~df[col].isin(dtype.categories)
+            if unknown.any():
+                levels = ', '.join(repr(level) for level in df.loc[unknown, col].unique()[:5])
+                print(f"⚠️ {source}: {int(unknown.sum())} row(s) with unknown {col} value(s) {levels} "
+                      f"(expected {', '.join(dtype.categories)}); treated as missing.")
+                # Explicitly: casting values outside the categories is deprecated in pandas
+                df[col] = df[col].where(~unknown)
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def _read_typed_csv(file_path, usecols, engine):
+    for integers in (True, False):
+        dtypes = _dtypes(usecols, integers)
+        try:
+            with warnings.catch_warnings():
+                # The parser warns about the failed integer cast before raising it
+                warnings.simplefilter('ignore', RuntimeWarning)
+                if engine == 'pyarrow':
+                    df = pd.read_csv(file_path, usecols=usecols, engine='pyarrow').astype(dtypes)
+                else:
+                    df = pd.read_csv(file_path, usecols=usecols, dtype=dtypes)
+        except (ValueError, TypeError):
+            # Blanks in an integer column: read the integer columns untyped, then type them one by one
+            if not integers:
+                raise
+            continue
+        return _finish_types(df, file_path)
+    return None
+
+
+def file_digest(file_path):
+    """SHA-256 of the file, remembered in the cache index by (size, mtime) so unchanged files are not re-hashed."""
+    stat = os.stat(file_path)
+    index_path = os.path.join(CACHE_DIR, 'index.json')
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    entry = index.get(os.path.abspath(file_path))
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['sha256']
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    index[os.path.abspath(file_path)] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                         'sha256': digest.hexdigest()}
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f'{index_path}.tmp-{os.getpid()}'
+    with open(tmp, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp, index_path)
+    return digest.hexdigest()
+
+
+def _cache_path(file_path, usecols):
+    key = hashlib.sha256(json.dumps([file_digest(file_path), usecols, SCHEMA_VERSION]).encode()).hexdigest()[:24]
+    return os.path.join(CACHE_DIR, key + ('.parquet' if pyarrow is not None else '.pkl'))
+
+
+def _read_cache(path):
+    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_pickle(path)
+
+
+def _write_cache(df, path):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f'{path}.tmp-{os.getpid()}'
+    if path.endswith('.parquet'):
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, path)
+    _evict_cache(keep=path)
+
+
+def _evict_cache(keep):
+    """Deletes the least recently written cached frames until the directory fits in `CACHE_MAX_BYTES`."""
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        if name.endswith(('.parquet', '.pkl')) and path != keep:
+            info = os.stat(path)
+            entries.append((info.st_mtime_ns, info.st_size, path))
+    total = sum(size for _, size, _ in entries) + os.path.getsize(keep)
+    for _, size, path in sorted(entries):
+        if total <= CACHE_MAX_BYTES:
+            break
+        os.remove(path)
+        total -= size
+
+
+@instrumented()
+def load_titanic_data(file_path, columns=None, cache=False, engine='auto'):
+    """
+    Loads data and performs initial integrity checks.
+    `cache=True` keeps the typed frame in `.data_cache/` (for files loaded again and again, e.g. train.csv).
+    """
     try:
-        df = pd.read_csv(file_path)
+        usecols = _select_columns(file_path, columns)
+        cache_path = _cache_path(file_path, usecols) if cache else None
+        if cache_path is not None and os.path.exists(cache_path):
+            df = _read_cache(cache_path)
+        else:
+            if engine == 'auto':
+                engine = 'pyarrow' if pyarrow is not None else 'c'
+            df = _read_typed_csv(file_path, usecols, engine)
+            if cache_path is not None:
+                _write_cache(df, cache_path)
         print(f"✅ Successfully loaded {file_path}")
         return df
     except FileNotFoundError:
@@ -18,6 +209,22 @@ def load_titanic_data(file_path):
         return None
 
 
+def iter_titanic_chunks(file_path, chunksize, columns=None):
+    """
+    Typed chunks of a large CSV (the C parser streams; nothing is cached). A chunk cannot be re-read, so the
+    integer columns are parsed untyped and typed per chunk, with the same blank-value fallback as a full load.
+    """
+    start = file_path.tell() if hasattr(file_path, 'read') else None
+    usecols = _select_columns(file_path, columns)
+    if start is not None:
+        # Reading the header consumed the file object
+        file_path.seek(start)
+    source = file_path if start is None else getattr(file_path, 'name', 'uploaded file')
+    dtypes = _dtypes(usecols, integers=False)
+    for chunk in pd.read_csv(file_path, usecols=usecols, dtype=dtypes, chunksize=chunksize):
+        yield _finish_types(chunk, source)
+
+
 def check_class_balance(df):
     """Verifies the ratio of Survived vs Not Survived."""
     if 'Survived' not in df.columns:
@@ -40,4 +247,4 @@ def check_class_balance(df):
 if __name__ == "__main__":
     data = load_titanic_data('train.csv')
     if data is not None:
-        check_class_balance(data)
\ No newline at end of file
+        check_class_balance(data)
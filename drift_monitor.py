@@ -0,0 +1,213 @@
+"""
+**Purpose**: Constant-memory input / prediction drift monitoring on the scoring path.
+- **`DriftSketch`**: Fixed-size, mergeable summaries of a stream of passengers:
+    - *Age, Fare*: Histograms over the training deciles (equal-mass bins on the reference data).
+    - *Pclass, Sex, Embarked, Title*: Counts over the training vocabulary plus one `Other` bucket.
+    - *Imputed-value rates*: Missing Age / Fare / Embarked (the values the preprocessor has to fill).
+    - *Prediction positive rate*: Predicted survivors / scored rows.
+  Memory is O(bins), never O(rows); `merge` adds the counts of sketches with the same layout (parallel workers).
+- **Reference**: `TitanicPreprocessor.fit` stores a sketch of the training data as `drift_reference` (so it travels
+  with `preprocessor_state.pkl` and `model_artifact/`); `train_on_features` adds the hold-out prediction rate.
+- **Scores**: `drift_scores(reference, current)` gives PSI per feature (plus a binned KS distance for Age/Fare)
+  and the reference vs current rates; PSI above 0.1 is flagged `watch`, above 0.25 `drift`.
+- **Hooks**: `predict.generate_predictions(..., drift_report=PATH)`, `PassengerScorer(monitor=...)` and the
+  inference server's `GET /drift`.
+"""
+
+import json
+from bisect import bisect_right
+import numpy as np
+import pandas as pd
+
+NUMERIC_FEATURES = ['Age', 'Fare']
+CATEGORICAL_FEATURES = ['Pclass', 'Sex', 'Embarked', 'Title']
+IMPUTED_FEATURES = ['Age', 'Fare', 'Embarked']
+DECILES = np.linspace(0.1, 0.9, 9)
+PSI_WATCH = 0.1
+PSI_DRIFT = 0.25
+RATE_DRIFT = 0.1
+PSI_FLOOR = 1e-4  # Empty bins would make PSI infinite
+
+
+class DriftSketch:
+    """Mergeable fixed-size counts; build the reference with `reference(frame)` and live sketches with `empty()`."""
+
+    def __init__(self, state):
+        self.rows = state['rows']
+        self.edges = {name: np.asarray(edges, dtype=np.float64) for name, edges in state['edges'].items()}
+        self.levels = {name: list(levels) for name, levels in state['levels'].items()}
+        self.counts = {name: np.asarray(counts, dtype=np.int64) for name, counts in state['counts'].items()}
+        self.missing = dict(state['missing'])
+        self.predicted = state['predicted']
+        self.positives = state['positives']
+        self._edge_lists = {name: edges.tolist() for name, edges in self.edges.items()}
+        self._level_index = {name: {level: i for i, level in enumerate(levels)}
+                             for name, levels in self.levels.items()}
+        self._indexers = {name: pd.Index(levels, dtype=object) for name, levels in self.levels.items()}
+
+    @classmethod
+    def reference(cls, frame):
+        """Layout (decile edges, vocabularies) taken from `frame`, which must have a `Title` column; counts it."""
+        edges = {}
+        for name in NUMERIC_FEATURES:
+            values = frame[name].to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            edges[name] = np.unique(np.quantile(values, DECILES)).tolist() if values.size else []
+        levels = {name: sorted(frame[name].dropna().unique().tolist()) for name in CATEGORICAL_FEATURES}
+        sketch = cls.layout(edges, levels)
+        return sketch.update(frame, frame['Title'])
+
+    @classmethod
+    def layout(cls, edges, levels):
+        counts = {name: [0] * (len(edges[name]) + 1) for name in NUMERIC_FEATURES}
+        counts.update({name: [0] * (len(levels[name]) + 1) for name in CATEGORICAL_FEATURES})
+        return cls({'rows': 0, 'edges': edges, 'levels': levels, 'counts': counts,
+                    'missing': {name: 0 for name in IMPUTED_FEATURES}, 'predicted': 0, 'positives': 0})
+
+    def empty(self):
+        """A zeroed sketch with this sketch's bins and vocabularies."""
+        return DriftSketch.layout({name: edges.tolist() for name, edges in self.edges.items()}, self.levels)
+
+    def update(self, data, titles, predictions=None):
+        """
+        Counts one batch. `data` maps Pclass/Sex/Age/Fare/Embarked to 1-D arrays (a DataFrame or a dict of
+        lists), `titles` are the canonical titles and `predictions` the predicted labels, if any.
+        """
+        columns = {name: data[name] for name in ('Pclass', 'Sex', 'Age', 'Fare', 'Embarked')}
+        columns['Title'] = titles
+        n_rows = len(titles)
+        for name in NUMERIC_FEATURES:
+            values = np.asarray(columns[name], dtype=np.float64)
+            missing = np.isnan(values)
+            bins = np.searchsorted(self.edges[name], values[~missing], side='right')
+            self.counts[name] += np.bincount(bins, minlength=len(self.counts[name]))
+            if name in self.missing:
+                self.missing[name] += int(missing.sum())
+        for name in CATEGORICAL_FEATURES:
+            values = columns[name]
+            missing = np.asarray(pd.isna(values))
+            # Unseen levels all land in the last (`Other`) bucket
+            other = len(self.levels[name])
+            codes = self._indexers[name].get_indexer(values)
+            codes[codes < 0] = other
+            self.counts[name] += np.bincount(codes[~missing], minlength=other + 1)
+            if name in self.missing:
+                self.missing[name] += int(missing.sum())
+        if predictions is not None:
+            self.predicted += len(predictions)
+            self.positives += int(np.count_nonzero(np.asarray(predictions) == 1))
+        self.rows += n_rows
+        return self
+
+    def update_one(self, pclass, sex, age, fare, embarked, title, prediction=None):
+        """Single-row `update` without NumPy calls (for `PassengerScorer.predict_one`)."""
+        for name, value in (('Age', age), ('Fare', fare)):
+            if value is None or value != value:
+                self.missing[name] += 1
+            else:
+                self.counts[name][bisect_right(self._edge_lists[name], value)] += 1
+        for name, value in (('Pclass', pclass), ('Sex', sex), ('Embarked', embarked), ('Title', title)):
+            if value is None:
+                if name in self.missing:
+                    self.missing[name] += 1
+            else:
+                self.counts[name][self._level_index[name].get(value, len(self.levels[name]))] += 1
+        if prediction is not None:
+            self.predicted += 1
+            self.positives += int(prediction == 1)
+        self.rows += 1
+        return self
+
+    def merge(self, other):
+        if other.levels != self.levels or any(not np.array_equal(self.edges[name], other.edges[name])
+                                              for name in NUMERIC_FEATURES):
+            raise ValueError("Only sketches with the same bins and vocabularies can be merged")
+        for name in self.counts:
+            self.counts[name] += other.counts[name]
+        for name in self.missing:
+            self.missing[name] += other.missing[name]
+        self.rows += other.rows
+        self.predicted += other.predicted
+        self.positives += other.positives
+        return self
+
+    def get_state(self):
+        # JSON-safe (it is embedded in the artifact manifest)
+        return {'rows': int(self.rows), 'edges': {name: edges.tolist() for name, edges in self.edges.items()},
+                'levels': self.levels, 'counts': {name: counts.tolist() for name, counts in self.counts.items()},
+                'missing': {name: int(n) for name, n in self.missing.items()},
+                'predicted': int(self.predicted), 'positives': int(self.positives)}
+
+    def rates(self):
+        rates = {f'{name}_imputed': self.missing[name] / self.rows if self.rows else None for name in self.missing}
+        rates['positive_rate'] = self.positives / self.predicted if self.predicted else None
+        return rates
+
+
+def live_sketch(reference_state):
+    """An empty sketch in the reference's layout (None for models trained before drift monitoring)."""
+    return DriftSketch(reference_state).empty() if reference_state is not None else None
+
+
+def with_predictions(state, predictions):
+    """The reference state with its prediction counts replaced by those of `predictions`."""
+    sketch = DriftSketch(state)
+    sketch.predicted = len(predictions)
+    sketch.positives = int(np.count_nonzero(np.asarray(predictions) == 1))
+    return sketch.get_state()
+
+
+def psi(expected, actual):
+    """Population Stability Index between two count vectors over the same bins."""
+    p = np.maximum(expected / max(expected.sum(), 1), PSI_FLOOR)
+    q = np.maximum(actual / max(actual.sum(), 1), PSI_FLOOR)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def binned_ks(expected, actual):
+    """Largest CDF gap at the bin edges (a lower bound of the exact two-sample KS statistic)."""
+    p = np.cumsum(expected) / max(expected.sum(), 1)
+    q = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.max(np.abs(p - q)))
+
+
+def _status(value, watch, drift):
+    return 'drift' if value > drift else 'watch' if value > watch else 'ok'
+
+
+def drift_scores(reference, current):
+    """Per-feature PSI (and binned KS for Age/Fare) plus rate comparisons, each with an ok/watch/drift status."""
+    features = {}
+    for name in NUMERIC_FEATURES + CATEGORICAL_FEATURES:
+        score = {'psi': psi(reference.counts[name], current.counts[name])}
+        if name in NUMERIC_FEATURES:
+            score['ks'] = binned_ks(reference.counts[name], current.counts[name])
+        score['status'] = _status(score['psi'], PSI_WATCH, PSI_DRIFT)
+        features[name] = score
+    rates = {}
+    current_rates = current.rates()
+    for name, before in reference.rates().items():
+        now = current_rates[name]
+        delta = None if before is None or now is None else now - before
+        rates[name] = {'reference': before, 'current': now, 'delta': delta,
+                       'status': 'ok' if delta is None else _status(abs(delta), RATE_DRIFT / 2, RATE_DRIFT)}
+    return {'reference_rows': reference.rows, 'rows': current.rows, 'features': features, 'rates': rates}
+
+
+def print_drift_report(scores):
+    icons = {'ok': '✅', 'watch': '⚠️', 'drift': '🚨'}
+    print(f"--- Drift vs Training ({scores['rows']:,} scored rows) ---")
+    for name, score in scores['features'].items():
+        ks = f" | KS {score['ks']:.3f}" if 'ks' in score else ""
+        print(f"{icons[score['status']]} {name:10} PSI {score['psi']:.3f}{ks}")
+    for name, rate in scores['rates'].items():
+        if rate['current'] is None or rate['reference'] is None:
+            continue
+        print(f"{icons[rate['status']]} {name:16} {rate['reference']:.3f} -> {rate['current']:.3f}")
+
+
+def write_drift_report(path, scores):
+    with open(path, 'w') as f:
+        json.dump(scores, f, indent=2)
+    print(f"📊 Drift report written to {path}")
+    return path
@@ -1,10 +1,19 @@
 """**Purpose**: Generates new signals from existing data.
 - **`create_family_features(df)`**: Calculates `FamilySize` (SibSp + Parch + 1) and creates a binary `IsAlone` flag.
 - **`bin_fare(df)`**: Uses quantiles to group the `Fare` column into four categories, reducing the impact of outliers.
+- **`fit_fare_bins(fare)` / `apply_fare_bins(df, edges)`**: Learns the quartile edges once (training) and re-applies them to any batch (inference).
+- **`fit_group_tables(df, survived)` / `apply_group_features(df, tables, ...)`**: Opt-in group-travel features. Fitting
+  builds hash indexes over ticket, surname and cabin deck (one `factorize` + `bincount` pass each, O(rows)) and keeps
+  the largest groups as bounded lookup tables (`group_tables.py`); applying joins a batch to them (one
+  `get_indexer` pass each) for group sizes, deck and smoothed group survival rates. Training rows pass their own
+  labels and get out-of-fold rates, so no row's features depend on its own label.
 - **`run_feature_engineering(df)`**: Orchestrates the order of feature creation.
 """
 
+import numpy as np
 import pandas as pd
+from instrumentation import instrumented
+from group_tables import DECK_CODES, MAX_KEYS, FOLDS, ticket_key, surname_key, deck_key, group_values
 
 
 def create_family_features(df):
@@ -28,6 +37,89 @@ def bin_fare(df):
     return df
 
 
+def fit_fare_bins(fare):
+    """Returns the 5 quartile edges that `bin_fare` would use on this Fare column."""
+    _, edges = pd.qcut(fare, 4, retbins=True)
+    return edges
+
+
+def apply_fare_bins(df, edges):
+    """
+    Assigns FareBin using previously learned edges instead of re-computing quartiles.
+    Bins are right-closed like `pd.qcut`; fares outside the training range are
+    clipped into the first/last bin so a single row always gets a valid label.
+    """
+    df['FareBin'] = np.searchsorted(np.asarray(edges[1:-1]), df['Fare'].to_numpy(), side='left')
+    return df
+
+
+def group_keys(df):
+    """The Ticket / Surname / Deck key of every row (a missing Ticket, Name or Cabin column counts as all-missing)."""
+    missing = pd.Series(None, index=df.index, dtype=object)
+    # The encoder's per-value key rules, mapped in one pass each (faster than chained `.str` calls on names)
+    return {name: (df[column] if column in df.columns else missing).astype(object).map(key)
+            for name, column, key in (('Ticket', 'Ticket', ticket_key), ('Surname', 'Name', surname_key),
+                                      ('Deck', 'Cabin', deck_key))}
+
+
+@instrumented()
+def fit_group_tables(df, survived, max_keys=MAX_KEYS):
+    """
+    Learns the group tables on the training set: for every key, its passenger count and number of survivors.
+    Only the `max_keys` largest groups of each index are kept (rows of the others are treated as unseen).
+    """
+    survived = np.asarray(survived, dtype=np.float64)
+    tables = {}
+    for name, keys in group_keys(df).items():
+        # Hash index: one code per row (-1 = no key), then per-group sums in one bincount pass
+        codes, uniques = pd.factorize(keys)
+        valid = codes >= 0
+        count = np.bincount(codes[valid], minlength=len(uniques))
+        total = np.bincount(codes[valid], weights=survived[valid], minlength=len(uniques))
+        keep = np.arange(len(uniques))
+        if len(uniques) > max_keys:
+            keep = np.argpartition(-count, max_keys - 1)[:max_keys]
+        keep = keep[np.argsort(np.asarray(uniques, dtype=object)[keep].astype(str), kind='stable')]
+        tables[name] = {'keys': [str(key) for key in np.asarray(uniques, dtype=object)[keep]],
+                        'count': count[keep].astype(int).tolist(),
+                        'survived': np.rint(total[keep]).astype(int).tolist()}
+    return tables
+
+
+def _held_out(index, survived, n_keys, folds, seed=0):
+    """Per row: passengers and survivors of its group within its own (random, fixed-seed) fold."""
+    fold = np.random.default_rng(seed).integers(0, folds, len(index))
+    found = index >= 0
+    cell = index[found] * folds + fold[found]
+    passengers, survivors = np.zeros(len(index)), np.zeros(len(index))
+    passengers[found] = np.bincount(cell, minlength=n_keys * folds)[cell]
+    survivors[found] = np.bincount(cell, weights=np.asarray(survived, dtype=np.float64)[found],
+                                   minlength=n_keys * folds)[cell]
+    return passengers, survivors
+
+
+@instrumented()
+def apply_group_features(df, tables, prior, smoothing, survived=None, folds=FOLDS):
+    """
+    Group features of `df` from fitted tables: size and survival rate per index, plus the Deck code.
+    `survived`: only for the frame the tables were fitted on. Its rates are cross-fitted over `folds` folds:
+    a plain leave-one-out rate, (group survivors - own label) / (size - 1), would still encode the row's label.
+    """
+    features = {}
+    for name, keys in group_keys(df).items():
+        # Vectorized join of the batch against the table keys (-1 = unseen)
+        index = pd.Index(tables[name]['keys'], dtype=object).get_indexer(keys)
+        held_out = None if survived is None else _held_out(index, survived, len(tables[name]['keys']), folds)
+        size, rate = group_values(tables[name], index, prior, smoothing, held_out)
+        if name == 'Deck':
+            features['Deck'] = keys.map(DECK_CODES).fillna(0).to_numpy(dtype=np.float64)
+        else:
+            features[f'{name}GroupSize'] = size
+        features[f'{name}Survival'] = rate
+    return pd.DataFrame(features, index=df.index)
+
+
+@instrumented()
 def run_feature_engineering(df):
     """Applies all engineering transformations."""
     df = create_family_features(df)
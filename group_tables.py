@@ -0,0 +1,55 @@
+"""
+**Purpose**: Group-travel lookup tables shared by the pandas pipeline (`feature_engineering.py`) and the NumPy
+encoder (`fast_encoder.py`). NumPy only, so the pandas-free scoring path can import it.
+- **Indexes**: `Ticket` (shared ticket number), `Surname` (the part of `Name` before the comma) and `Deck` (first
+  letter of `Cabin`, `U` when unknown). Each fitted table is a dict of parallel lists (`keys`, `count`,
+  `survived`) holding at most `max_keys` of the largest groups, so it stays small in the artifact manifest.
+- **`group_values(...)`**: Group size and smoothed survival rate of each row's group, from the table rows it was
+  matched to (-1 = unseen key, or a group too small to be kept: it falls back to size 1 and the prior rate).
+  Training rows are cross-fitted: their rate only counts group members from the other folds.
+- **Key rules**: `ticket_key`, `surname_key` and `deck_key` turn one raw value into its group key; both the
+  pandas stage (`feature_engineering.group_keys`) and the encoder use them, so the two paths share one set of keys.
+"""
+
+import numpy as np
+
+# Model columns added by the group stage, in this order
+GROUP_FEATURES = ['TicketGroupSize', 'TicketSurvival', 'SurnameGroupSize', 'SurnameSurvival', 'Deck', 'DeckSurvival']
+UNKNOWN_DECK = 'U'
+# Deck as an ordinal (A is the top deck); 0 = no cabin on record
+DECK_CODES = {deck: i + 1 for i, deck in enumerate('ABCDEFGT')}
+MAX_KEYS = 10_000
+# Pseudo-passengers at the prior rate added to every group (a group of one is not a 0% / 100% rate)
+SMOOTHING = 2.0
+# Training rows get their rate from the group members outside their own fold (cross-fitting)
+FOLDS = 5
+
+
+def ticket_key(ticket):
+    return ticket.strip() if isinstance(ticket, str) else None
+
+
+def surname_key(name):
+    return name.partition(',')[0].strip() if isinstance(name, str) else None
+
+
+def deck_key(cabin):
+    return (cabin[:1] or UNKNOWN_DECK) if isinstance(cabin, str) else UNKNOWN_DECK
+
+
+def group_values(table, index, prior, smoothing, held_out=None):
+    """
+    (group size, survival rate) per row. `index` holds each row's position in `table` (-1 = not in it).
+    Training rows pass `held_out`: the (passengers, survivors) of their group inside their own fold, themselves
+    included. They are members of their group, so the size is the stored count, and the held-out members are
+    left out of the rate, so it never depends on the row's own label. Any other row is a new group member.
+    """
+    count = np.append(np.asarray(table['count'], dtype=np.float64), 0.0)[index]
+    survived = np.append(np.asarray(table['survived'], dtype=np.float64), 0.0)[index]
+    if held_out is None:
+        size = count + 1
+        others, survivors = count, survived
+    else:
+        size = np.maximum(count, 1.0)
+        others, survivors = count - held_out[0], survived - held_out[1]
+    return size, (survivors + smoothing * prior) / (others + smoothing)
@@ -0,0 +1,246 @@
+"""
+**Purpose**: Budgeted Random Forest hyperparameter search with successive halving.
+- **Search space**: `n_estimators`, `max_depth`, `min_samples_leaf`, `max_features`, `class_weight`.
+- **Successive halving**: Every sampled config is first scored on a small budget (a stratified subset of the
+  rows and a fraction of its trees); only the best `1 / eta` of each rung is promoted to the next, larger budget.
+  The last rung uses all rows and the full tree count.
+- **Trials**: Run in a process pool; every worker memory-maps one cached, preprocessed float32 feature matrix
+  (`search_cache/`, keyed by the CSV and the preprocessing source) instead of re-reading and re-engineering the CSV.
+- **Resumable**: Each finished trial is appended to a JSONL trial log. Re-running the same search skips the
+  trials already in the log, so an interrupted search continues where it stopped. Trial keys include the feature
+  matrix's content digest and the search space, so a shared log never serves scores from other data.
+- **Winner**: Retrained on the full data through `model_trainer.train_titanic_model` (pickles + `model_artifact/`).
+
+USAGE: python hyperparameter_search.py --configs 27 --eta 3 --workers 4 --time-budget 300
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+from data_loader import load_titanic_data
+from preprocessor import TitanicPreprocessor
+from model_trainer import build_model, train_titanic_model
+from pipeline_cache import file_sha256, source_closure
+
+SEARCH_SPACE = {
+    'n_estimators': [50, 100, 200, 400],
+    'max_depth': [3, 4, 5, 6, 8, 10, None],
+    'min_samples_leaf': [1, 2, 4, 8],
+    'max_features': ['sqrt', 'log2', 0.5, None],
+    'class_weight': [None, 'balanced', 'balanced_subsample'],
+}
+MIN_ROWS = 150
+MIN_TREES = 10
+
+
+def sample_configs(n_configs, seed=42, space=SEARCH_SPACE):
+    """`n_configs` distinct configs, drawn deterministically so a resumed search sees the same ones."""
+    rng = random.Random(seed)
+    configs, seen = [], set()
+    total = int(np.prod([len(values) for values in space.values()]))
+    while len(configs) < min(n_configs, total):
+        config = {name: rng.choice(values) for name, values in space.items()}
+        key = json.dumps(config, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+def trial_key(config, n_rows, n_trees, cv_folds, seed, data_digest, space=SEARCH_SPACE):
+    """Stable id of one (config, budget) evaluation on one feature matrix, used to match trials already in the log."""
+    payload = json.dumps({'config': config, 'rows': n_rows, 'trees': n_trees, 'cv': cv_folds, 'seed': seed,
+                          'data': data_digest, 'space': space}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def matrix_digest(X_path, y_path):
+    """SHA-256 of the cached feature matrix and labels (changes with the data and with the preprocessing)."""
+    digest = hashlib.sha256()
+    for path in (X_path, y_path):
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def read_trial_log(path):
+    """Finished trials by key (a partially written last line from an interrupted run is ignored)."""
+    trials = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    trial = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                trials[trial['key']] = trial
+    return trials
+
+
+def append_trial(path, trial):
+    with open(path, 'a+b') as f:
+        # Start on a fresh line if an interrupted run left a partial record behind
+        f.seek(0, os.SEEK_END)
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+        f.write((json.dumps(trial) + '\n').encode())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _save_atomic(path, array):
+    # Written aside and renamed into place: an interrupted run never leaves a truncated matrix behind
+    scratch = f'{path}.tmp-{os.getpid()}'
+    with open(scratch, 'wb') as f:
+        np.save(f, array)
+    os.replace(scratch, path)
+
+
+def cache_feature_matrix(data_path, cache_dir='search_cache'):
+    """
+    Preprocesses `data_path` once into `X.npy` / `y.npy`, keyed by the CSV's content hash and the hashes of
+    the source files that build the matrix (an edit to the preprocessing code gives a new matrix).
+    """
+    digest = hashlib.sha256(file_sha256(data_path).encode())
+    for path in source_closure(cache_feature_matrix):
+        digest.update(f'{path}:{file_sha256(path)}'.encode())
+    directory = os.path.join(cache_dir, digest.hexdigest()[:16])
+    X_path, y_path = os.path.join(directory, 'X.npy'), os.path.join(directory, 'y.npy')
+    if not (os.path.exists(X_path) and os.path.exists(y_path)):
+        raw_df = load_titanic_data(data_path)
+        X = TitanicPreprocessor().fit_transform(raw_df)
+        os.makedirs(directory, exist_ok=True)
+        _save_atomic(y_path, raw_df['Survived'].to_numpy())
+        _save_atomic(X_path, np.ascontiguousarray(X.to_numpy(dtype=np.float32)))
+    return X_path, y_path
+
+
+# Per-process matrix, memory-mapped once by the pool initializer
+_matrix = None
+
+
+def _init_worker(X_path, y_path):
+    global _matrix
+    _matrix = (np.load(X_path, mmap_mode='r'), np.load(y_path, mmap_mode='r'))
+
+
+def subsample(y, n_rows, seed):
+    """Row indices of a stratified subset of size `n_rows` (all rows when `n_rows >= len(y)`)."""
+    if n_rows >= len(y):
+        return np.arange(len(y))
+    rng = np.random.default_rng(seed)
+    picked = []
+    for label in np.unique(y):
+        members = np.flatnonzero(y == label)
+        take = max(1, round(n_rows * len(members) / len(y)))
+        picked.append(rng.choice(members, size=min(take, len(members)), replace=False))
+    return np.sort(np.concatenate(picked))
+
+
+def evaluate_trial(config, n_rows, n_trees, cv_folds, seed):
+    """Mean/std stratified k-fold accuracy of `config` with `n_trees` trees on `n_rows` rows."""
+    X, y = _matrix
+    rows = subsample(np.asarray(y), n_rows, seed)
+    params = dict(config, n_estimators=n_trees, random_state=seed)
+    start = time.perf_counter()
+    scores = cross_val_score(build_model(n_jobs=1, **params), X[rows], y[rows],
+                             cv=StratifiedKFold(cv_folds, shuffle=True, random_state=seed))
+    return float(scores.mean()), float(scores.std()), time.perf_counter() - start
+
+
+def rung_budgets(n_rungs, eta):
+    """Fraction of the full budget used on each rung: eta^-(n_rungs-1), ..., 1/eta, 1."""
+    return [eta ** (rung - n_rungs + 1) for rung in range(n_rungs)]
+
+
+def successive_halving(X_path, y_path, n_configs=27, eta=3, workers=2, cv_folds=3, seed=42,
+                       log_path='search_trials.jsonl', time_budget=None, space=SEARCH_SPACE):
+    """
+    Runs the search and returns (best config, best trial). Trials already in `log_path` are reused.
+    `time_budget` (seconds) stops promoting after the current rung once exceeded; the best trial of the
+    deepest rung reached wins.
+    """
+    start = time.perf_counter()
+    n_total_rows = len(np.load(y_path, mmap_mode='r'))
+    configs = sample_configs(n_configs, seed, space)
+    n_rungs = max(1, int(np.floor(np.log(len(configs)) / np.log(eta))) + 1)
+    log = read_trial_log(log_path)
+    data_digest = matrix_digest(X_path, y_path)
+    reused = run = 0
+
+    survivors = configs
+    best = None
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X_path, y_path)) as pool:
+        for rung, fraction in enumerate(rung_budgets(n_rungs, eta)):
+            n_rows = max(MIN_ROWS, int(round(n_total_rows * fraction)))
+            results, pending = [], {}
+            for config in survivors:
+                n_trees = max(MIN_TREES, int(round(config['n_estimators'] * fraction)))
+                key = trial_key(config, n_rows, n_trees, cv_folds, seed, data_digest, space)
+                if key in log:
+                    reused += 1
+                    results.append(log[key])
+                else:
+                    future = pool.submit(evaluate_trial, config, n_rows, n_trees, cv_folds, seed)
+                    pending[future] = (key, config, n_trees)
+            for future in as_completed(pending):
+                key, config, n_trees = pending[future]
+                score, std, seconds = future.result()
+                trial = {'key': key, 'rung': rung, 'config': config, 'n_rows': n_rows, 'n_estimators': n_trees,
+                         'cv_folds': cv_folds, 'seed': seed, 'score': score, 'std': std, 'seconds': seconds}
+                append_trial(log_path, trial)
+                log[key] = trial
+                results.append(trial)
+                run += 1
+
+            # Higher accuracy first; ties go to the steadier (lower CV std), then the earlier-sampled config
+            order = {json.dumps(c, sort_keys=True): i for i, c in enumerate(configs)}
+            results.sort(key=lambda t: (-t['score'], t['std'], order[json.dumps(t['config'], sort_keys=True)]))
+            best = results[0]
+            print(f"🪜 Rung {rung + 1}/{n_rungs}: {len(results)} configs | {n_rows} rows | "
+                  f"best {best['score']:.3f} ({best['config']})")
+
+            survivors = [t['config'] for t in results[:max(1, len(results) // eta)]]
+            if time_budget is not None and time.perf_counter() - start > time_budget and rung < n_rungs - 1:
+                print("⏱️ Time budget exhausted, stopping after this rung.")
+                break
+
+    print(f"✅ Search finished in {time.perf_counter() - start:.1f}s ({run} trials run, {reused} reused from log)")
+    best = dict(best, trials_run=run, trials_reused=reused)
+    return best['config'], best
+
+
+def search_and_train(data_path='train.csv', n_configs=27, eta=3, workers=2, cv_folds=3, seed=42,
+                     log_path='search_trials.jsonl', time_budget=None, output_dir='.', cache_dir='search_cache'):
+    """Full search, then retrains the winning config and saves it like `model_trainer.py` does."""
+    X_path, y_path = cache_feature_matrix(data_path, cache_dir)
+    config, trial = successive_halving(X_path, y_path, n_configs, eta, workers, cv_folds, seed,
+                                       log_path, time_budget)
+    print(f"🏆 Winner: {config} (CV accuracy {trial['score']:.3f})")
+    model = train_titanic_model(data_path, output_dir=output_dir, params=config)
+    return model, config, trial
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Successive-halving Random Forest search.")
+    parser.add_argument('--data', default='train.csv')
+    parser.add_argument('--configs', type=int, default=27, help="Configs sampled for the first rung")
+    parser.add_argument('--eta', type=int, default=3, help="Keep the best 1/eta of each rung")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--cv-folds', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--log', default='search_trials.jsonl', help="Resumable trial log")
+    parser.add_argument('--time-budget', type=float, default=None, help="Seconds before promotion stops")
+    parser.add_argument('--output-dir', default='.')
+    args = parser.parse_args()
+    search_and_train(args.data, args.configs, args.eta, args.workers, args.cv_folds, args.seed,
+                     args.log, args.time_budget, args.output_dir)
@@ -0,0 +1,226 @@
+"""
+**Purpose**: Incremental model updates from newly labelled batches, without a full retrain.
+- **Warm start**: `update_model(batch_path)` loads `titanic_model.pkl` and grows `n_new_trees` extra trees on the
+  new batch only (scikit-learn `warm_start`), so an update costs O(batch rows), not O(history).
+- **Sliding window**: `window=k` retires the trees of every batch but the last `k` (the initial fit counts as
+  one batch). The per-batch tree counts are kept on the model as `update_history_`.
+- **Mergeable statistics**: `PreprocessingAggregates` holds the counts behind every fitted value of
+  `TitanicPreprocessor` (Age values per Title, Fare values, Embarked counts). A batch is added to the counts and
+  the medians, Embarked mode and FareBin edges are read off the merged counts, never off the raw history.
+  Values are counted at 4-decimal resolution (the CSV's precision), so the result equals a refit on all rows.
+- **Replays**: Every merged file is recorded by its SHA-256 (in the aggregates, which never forget a batch, and in
+  `update_history_`); merging the same batch twice, or the training data itself, is refused instead of counting
+  its rows twice.
+- **Feature layout**: The dummy-column vocabulary stays as fitted: every tree must see the same features.
+  Categories first seen in a batch simply get no column, as in `TitanicPreprocessor.transform`.
+- **Artifacts**: Rewritten through `model_trainer.save_model_artifacts`, plus `preprocessor_aggregates.pkl`.
+
+USAGE: python incremental_trainer.py --batch new_labels.csv --trees 20 [--window 5]
+"""
+
+import os
+import argparse
+from collections import Counter
+import numpy as np
+import joblib
+from data_loader import load_titanic_data
+from preprocessor import TitanicPreprocessor, extract_titles
+from model_trainer import save_model_artifacts
+from artifact_store import _sha256
+from instrumentation import instrumented, span
+
+AGGREGATES_NAME = 'preprocessor_aggregates.pkl'
+DECIMALS = 4
+FARE_QUANTILES = [0.0, 0.25, 0.5, 0.75, 1.0]
+
+
+class ValueCounts:
+    """Mergeable counts of (rounded) values; medians and quantiles match pandas on the counted values."""
+
+    def __init__(self, counts=None):
+        self.counts = Counter(counts or {})
+
+    def add(self, values):
+        values = np.round(np.asarray(values, dtype=np.float64), DECIMALS)
+        keys, counts = np.unique(values[~np.isnan(values)], return_counts=True)
+        self.counts.update(dict(zip(keys.tolist(), counts.tolist())))
+        return self
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        return self
+
+    def total(self):
+        return sum(self.counts.values())
+
+    def _order_statistics(self, *positions):
+        keys = sorted(self.counts)
+        ends = np.cumsum([self.counts[key] for key in keys])
+        return [keys[int(np.searchsorted(ends, position, side='right'))] for position in positions]
+
+    def median(self):
+        n = self.total()
+        if n == 0:
+            return float('nan')
+        low, high = self._order_statistics((n - 1) // 2, n // 2)
+        return (low + high) / 2
+
+    def quantile(self, q):
+        """Linear interpolation between order statistics (what `pd.qcut` uses for its edges)."""
+        position = (self.total() - 1) * q
+        below = int(np.floor(position))
+        low, high = self._order_statistics(below, int(np.ceil(position)))
+        t = position - below
+        # numpy's lerp: approached from the nearer end, so the edges are bit-identical
+        return low + (high - low) * t if t < 0.5 else high - (high - low) * (1 - t)
+
+
+class PreprocessingAggregates:
+    """Sufficient statistics for `TitanicPreprocessor`'s fitted values, updatable one batch at a time."""
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.rows = state.get('rows', 0)
+        self.age = ValueCounts(state.get('age'))
+        self.age_by_title = {title: ValueCounts(counts) for title, counts in state.get('age_by_title', {}).items()}
+        self.fare = ValueCounts(state.get('fare'))
+        self.embarked = Counter(state.get('embarked', {}))
+        # SHA-256 of every file counted in, so a batch is never merged twice
+        self.batches = list(state.get('batches', []))
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls().update(df)
+
+    def update(self, df):
+        work = extract_titles(df[['Name', 'Age', 'Fare', 'Embarked']].copy())
+        for title, ages in work.groupby('Title')['Age']:
+            self.age_by_title.setdefault(title, ValueCounts()).add(ages)
+        self.age.add(work['Age'])
+        self.fare.add(work['Fare'])
+        self.embarked.update({str(port): int(n) for port, n in work['Embarked'].value_counts().items() if n})
+        self.rows += len(df)
+        return self
+
+    def merge(self, other):
+        for title, counts in other.age_by_title.items():
+            self.age_by_title.setdefault(title, ValueCounts()).merge(counts)
+        self.age.merge(other.age)
+        self.fare.merge(other.fare)
+        self.embarked.update(other.embarked)
+        self.rows += other.rows
+        self.batches += other.batches
+        return self
+
+    def apply_to(self, preprocessor):
+        """Sets the preprocessor's fitted statistics from the counts (the column vocabulary is left as is)."""
+        preprocessor.title_age_medians = {title: counts.median() for title, counts in sorted(self.age_by_title.items())
+                                          if counts.total()}
+        preprocessor.age_fill = self.age.median()
+        # Most frequent port; ties go to the first in sort order, as with Series.mode
+        preprocessor.embarked_mode = min(self.embarked, key=lambda port: (-self.embarked[port], port))
+        preprocessor.fare_fill = self.fare.median()
+        preprocessor.fare_bin_edges = [self.fare.quantile(q) for q in FARE_QUANTILES]
+        return preprocessor
+
+    def get_state(self):
+        # Plain dicts, like the preprocessor state, so the file does not depend on these classes' pickle path
+        return {'rows': self.rows, 'age': dict(self.age.counts), 'fare': dict(self.fare.counts),
+                'age_by_title': {title: dict(counts.counts) for title, counts in self.age_by_title.items()},
+                'embarked': dict(self.embarked), 'batches': list(self.batches)}
+
+    def save(self, path):
+        joblib.dump(self.get_state(), path)
+
+    @classmethod
+    def load(cls, path):
+        return cls(joblib.load(path))
+
+
+def load_aggregates(model_dir, history_path='train.csv'):
+    """The saved aggregates, or (first update only) aggregates built from the data the model was trained on."""
+    path = os.path.join(model_dir, AGGREGATES_NAME)
+    if os.path.exists(path):
+        return PreprocessingAggregates.load(path)
+    print(f"ℹ️ No {AGGREGATES_NAME} yet: counting {history_path} once.")
+    history = load_titanic_data(history_path)
+    if history is None:
+        raise FileNotFoundError(f"{history_path} is needed once to seed the preprocessing aggregates")
+    aggregates = PreprocessingAggregates.from_frame(history)
+    aggregates.batches.append(_sha256(history_path))
+    return aggregates
+
+
+def retire_trees(model, window):
+    """Keeps the trees of the last `window` batches in `model.update_history_`; returns how many were dropped."""
+    history = model.update_history_
+    if window is None or len(history) <= window:
+        return 0
+    retired = sum(entry['trees'] for entry in history[:-window])
+    model.estimators_ = model.estimators_[retired:]
+    model.n_estimators = len(model.estimators_)
+    model.update_history_ = history[-window:]
+    return retired
+
+
+@instrumented()
+def update_model(batch_path, model_dir='.', n_new_trees=20, window=None, history_path='train.csv',
+                 output_dir=None, n_jobs=None):
+    """
+    Grows `n_new_trees` trees on the labelled batch at `batch_path` and refreshes the preprocessing
+    statistics from the merged aggregates; writes the updated artifacts to `output_dir` (default: `model_dir`).
+    """
+    output_dir = output_dir or model_dir
+    batch = load_titanic_data(batch_path)
+    if batch is None:
+        return None
+    if 'Survived' not in batch.columns or batch['Survived'].nunique() < 2:
+        # Every tree of one forest must predict the same classes
+        raise ValueError(f"{batch_path} needs labelled rows of both classes for an incremental update")
+
+    digest = _sha256(batch_path)
+    aggregates = load_aggregates(model_dir, history_path)
+    if digest in aggregates.batches:
+        raise ValueError(f"{batch_path} (sha256 {digest[:12]}) was already merged into this model; "
+                         f"replaying it would count its rows twice")
+    model = joblib.load(os.path.join(model_dir, 'titanic_model.pkl'))
+    preprocessor = TitanicPreprocessor.load(os.path.join(model_dir, 'preprocessor_state.pkl'))
+    aggregates.update(batch).batches.append(digest)
+    aggregates.apply_to(preprocessor)
+
+    X = preprocessor.transform(batch).astype(np.float32)
+    y = batch['Survived'].to_numpy().astype(np.int64)
+    history = getattr(model, 'update_history_', None) or [{'batch': 'initial', 'rows': None,
+                                                             'trees': len(model.estimators_)}]
+
+    # OOB scores would mix old trees with rows they never saw, so updates never compute them
+    model.set_params(warm_start=True, oob_score=False, n_jobs=n_jobs,
+                     n_estimators=len(model.estimators_) + n_new_trees)
+    for attr in ('oob_score_', 'oob_decision_function_'):
+        model.__dict__.pop(attr, None)
+    with span('model.fit', rows_in=len(y)):
+        model.fit(X, y)
+    model.set_params(warm_start=False, n_jobs=None)
+
+    model.update_history_ = history + [{'batch': os.path.basename(batch_path), 'sha256': digest,
+                                        'rows': len(batch), 'trees': n_new_trees}]
+    retired = retire_trees(model, window)
+
+    save_model_artifacts(model, preprocessor, preprocessor.columns, output_dir)
+    aggregates.save(os.path.join(output_dir, AGGREGATES_NAME))
+    print(f"✅ Added {n_new_trees} trees on {len(batch):,} new rows "
+          f"(forest: {len(model.estimators_)} trees, retired {retired}, statistics over {aggregates.rows:,} rows)")
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grow the saved forest on a new labelled batch.")
+    parser.add_argument('--batch', required=True, help="CSV of newly labelled passengers")
+    parser.add_argument('--model-dir', default='.')
+    parser.add_argument('--trees', type=int, default=20, help="Trees grown on the batch")
+    parser.add_argument('--window', type=int, default=None, help="Keep only the trees of the last N batches")
+    parser.add_argument('--history', default='train.csv', help="Training data, read once to seed the aggregates")
+    parser.add_argument('--output-dir', default=None)
+    parser.add_argument('--n-jobs', type=int, default=None)
+    args = parser.parse_args()
+    update_model(args.batch, args.model_dir, args.trees, args.window, args.history, args.output_dir, args.n_jobs)
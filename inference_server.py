@@ -0,0 +1,387 @@
+"""
+**Purpose**: Standalone asyncio HTTP/JSON scoring service (no web framework required).
+- **`POST /predict`**: One passenger object, a list of passengers, or `{"records": [...]}`.
+  Fields follow the `test.csv` schema (Pclass, Sex, Age, SibSp, Parch, Fare, Embarked, optional Name/PassengerId).
+  Without a Name the Title is inferred from Sex/Age, like the Streamlit app. Every record is validated and coerced
+  (`validate_record`) before it joins a micro-batch; an invalid one answers 400 for its own request only.
+- **Micro-batching**: Concurrent single-record requests are queued and merged into one vectorised call of up to
+  `max_batch_size` rows, waiting at most `max_wait_ms` for the batch to fill.
+- **`GET /health`** and **`GET /metrics`** (Prometheus text format: requests, batches, rows, latency quantiles).
+- **`GET /drift`**: With `--drift`, every scored batch is counted into a constant-memory `DriftSketch` and this
+  returns PSI/KS scores and imputed/positive rates against the training reference (`drift_monitor.py`).
+- **Cache**: `--cache-size N` puts an LRU `PredictionCache` in front of the model (hit/miss/eviction counters
+  are exported on `/metrics`).
+- **Model**: The memory-mapped `model_artifact/` (compiled forest + fitted preprocessing state).
+- **Hot reload**: With `--model model_registry`, a `ModelWatcher` thread checks the registry's `CURRENT` pointer
+  every `--poll-interval` seconds; a new version is loaded and warmed with a probe batch on that thread and then
+  swapped in. Batches already being scored finish on the old version; `/health` reports the version served.
+
+USAGE: python inference_server.py --port 8000 --max-batch-size 64 --max-wait-ms 2
+"""
+
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from artifact_store import load_artifact
+from model_registry import ModelWatcher, is_registry, resolve_artifact
+from fast_encoder import FeatureEncoder
+from online_predictor import infer_title
+from prediction_cache import PredictionCache, cached_predict_proba
+from cli import CATEGORIES
+
+RECORD_FIELDS = ['Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare', 'Embarked']
+REQUIRED_FIELDS = ['Pclass', 'Sex', 'SibSp', 'Parch']
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error'}
+MAX_BODY_BYTES = 16 * 1024 * 1024
+# Warms a newly loaded model before it takes traffic
+PROBE_RECORDS = [{'Pclass': 3, 'Sex': 'male', 'Age': 22, 'SibSp': 1, 'Parch': 0, 'Fare': 7.25, 'Embarked': 'S'},
+                 {'Pclass': 1, 'Sex': 'female', 'Age': None, 'SibSp': 0, 'Parch': 0, 'Fare': 71.28, 'Embarked': 'C',
+                  'Name': 'Cumings, Mrs. John Bradley'}]
+
+
+def _number(field, value, integer):
+    if isinstance(value, bool):
+        raise ValueError(f"{field}: expected a number, got {value!r}")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field}: expected a number, got {value!r}") from None
+    if integer:
+        if number != number or number != int(number) or number < 0:
+            raise ValueError(f"{field}: expected a non-negative integer, got {value!r}")
+        return int(number)
+    if number < 0:
+        raise ValueError(f"{field}: expected a non-negative number, got {value!r}")
+    return number
+
+
+def validate_record(record):
+    """
+    A checked copy of one passenger record with coerced types. Pclass, Sex, SibSp and Parch are required;
+    Age, Fare and Embarked may be missing or null (imputed like in training). Raises ValueError otherwise.
+    """
+    if not isinstance(record, dict):
+        raise ValueError(f"Expected a passenger object, got {type(record).__name__}")
+    missing = [field for field in REQUIRED_FIELDS if record.get(field) is None]
+    if missing:
+        raise ValueError(f"Missing required field(s): {', '.join(missing)}")
+    clean = dict(record)
+    for field, integer in (('Pclass', True), ('SibSp', True), ('Parch', True), ('Age', False), ('Fare', False)):
+        if record.get(field) is not None:
+            clean[field] = _number(field, record[field], integer)
+    for field, levels in CATEGORIES.items():
+        if clean.get(field) is not None and clean[field] not in levels:
+            raise ValueError(f"{field}: expected one of {', '.join(map(str, levels))}, got {record[field]!r}")
+    if clean.get('Name') is not None and not isinstance(clean['Name'], str):
+        raise ValueError(f"Name: expected a string, got {record['Name']!r}")
+    return clean
+
+
+class BatchScorer:
+    """Vectorised scoring of a list of JSON records with the artifact's encoder and forest."""
+
+    def __init__(self, artifact, cache_size=0, drift=False):
+        self.forest = artifact.forest
+        self.encoder = FeatureEncoder(artifact.state)
+        self.cache = PredictionCache.for_forest(self.forest, artifact.columns, cache_size) if cache_size else None
+        self.reference = artifact.state.get('drift_reference')
+        self.monitor = None
+        if drift:
+            # Imported only when enabled: the sketches use pandas, the plain scoring path does not
+            from drift_monitor import live_sketch
+            self.monitor = live_sketch(self.reference)
+
+    def score(self, records):
+        columns = {field: [record.get(field) for record in records] for field in RECORD_FIELDS}
+        for field in ('Age', 'Fare'):
+            columns[field] = [np.nan if value is None else value for value in columns[field]]
+
+        # Title from the Name when given (same regex as training), otherwise inferred like the app
+        names = [record.get('Name') for record in records]
+        codes = self.encoder.title_codes(names)
+        columns['Title'] = [(self.encoder.titles[code] if code >= 0 else None) if isinstance(name, str) and name
+                            else infer_title(record.get('Sex'), record.get('Age'))
+                            for record, name, code in zip(records, names, codes)]
+
+        proba = cached_predict_proba(self.forest, self.encoder.transform(columns), self.cache)
+        labels = np.asarray(self.forest.classes).take(np.argmax(proba, axis=1)).tolist()
+        if self.monitor is not None:
+            self.monitor.update(columns, columns['Title'], labels)
+        results = []
+        for record, label, p in zip(records, labels, proba[:, 1].tolist()):
+            result = {'Survived': int(label), 'probability': p}
+            if 'PassengerId' in record:
+                result['PassengerId'] = record['PassengerId']
+            results.append(result)
+        return results
+
+    def warm(self, records=None):
+        """Scores a probe batch (not counted by the drift monitor) so real requests never pay first-call costs."""
+        monitor, self.monitor = self.monitor, None
+        try:
+            self.score(records or PROBE_RECORDS)
+        finally:
+            self.monitor = monitor
+
+    def drift(self):
+        if self.monitor is None:
+            return None
+        from drift_monitor import DriftSketch, drift_scores
+        return drift_scores(DriftSketch(self.reference), self.monitor)
+
+
+class MicroBatcher:
+    """Collects single-record requests and scores them together."""
+
+    def __init__(self, scorer, max_batch_size=64, max_wait_ms=2.0, metrics=None):
+        self.scorer = scorer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = metrics
+        self.queue = asyncio.Queue()
+        # One scoring thread: keeps the event loop free while a batch is being evaluated
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, record):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((record, future))
+        return await future
+
+    async def score_batch(self, records):
+        """Explicit batch requests skip the queue but share the scoring thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.scorer.score, records)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Drain whatever else is already waiting, up to the size limit
+            while len(batch) < self.max_batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            records = [record for record, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.scorer.score, records)
+            except Exception as error:  # Fail every request of the batch, keep the server alive
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            if self.metrics is not None:
+                self.metrics.record_batch(len(batch))
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class Metrics:
+    """Counters plus a window of recent request latencies for quantiles."""
+
+    def __init__(self, cache=None, window=10_000):
+        self.cache = cache
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.rows = 0
+        self.batches = 0
+        self.batched_rows = 0
+        self.reloads = 0
+        self.latencies = deque(maxlen=window)
+
+    def record_request(self, rows, seconds, ok=True):
+        self.requests += 1
+        self.rows += rows
+        self.errors += 0 if ok else 1
+        self.latencies.append(seconds)
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.batched_rows += size
+
+    def quantiles(self):
+        if not self.latencies:
+            return 0.0, 0.0
+        p50, p99 = np.percentile(np.fromiter(self.latencies, dtype=np.float64), [50, 99])
+        return float(p50), float(p99)
+
+    def to_prometheus(self):
+        p50, p99 = self.quantiles()
+        lines = [
+            '# TYPE titanic_requests_total counter', f'titanic_requests_total {self.requests}',
+            '# TYPE titanic_request_errors_total counter', f'titanic_request_errors_total {self.errors}',
+            '# TYPE titanic_rows_scored_total counter', f'titanic_rows_scored_total {self.rows}',
+            '# TYPE titanic_micro_batches_total counter', f'titanic_micro_batches_total {self.batches}',
+            '# TYPE titanic_micro_batch_rows_total counter', f'titanic_micro_batch_rows_total {self.batched_rows}',
+            '# TYPE titanic_request_latency_seconds summary',
+            f'titanic_request_latency_seconds{{quantile="0.5"}} {p50:.6f}',
+            f'titanic_request_latency_seconds{{quantile="0.99"}} {p99:.6f}',
+            '# TYPE titanic_model_reloads_total counter', f'titanic_model_reloads_total {self.reloads}',
+            '# TYPE titanic_uptime_seconds gauge', f'titanic_uptime_seconds {time.time() - self.started:.1f}',
+        ]
+        if self.cache is not None:
+            stats = self.cache.stats()
+            for name in ('hits', 'misses', 'evictions'):
+                lines += [f'# TYPE titanic_cache_{name}_total counter', f'titanic_cache_{name}_total {stats[name]}']
+            lines += ['# TYPE titanic_cache_entries gauge', f'titanic_cache_entries {stats["entries"]}']
+        return '\n'.join(lines) + '\n'
+
+
+class InferenceServer:
+    def __init__(self, artifact_dir='model_artifact', max_batch_size=64, max_wait_ms=2.0, cache_size=0, drift=False,
+                 poll_interval=2.0):
+        self.artifact_dir = artifact_dir
+        self.watcher = None
+        if is_registry(artifact_dir):
+            def load_version(path):
+                return BatchScorer(load_artifact(resolve_artifact(path)), cache_size, drift)
+            self.watcher = ModelWatcher(artifact_dir, load_version, probe=BatchScorer.warm, interval=poll_interval,
+                                        on_swap=self.swap)
+            self.scorer = self.watcher.active
+        else:
+            self.scorer = BatchScorer(load_artifact(artifact_dir), cache_size, drift)
+        self.metrics = Metrics(self.scorer.cache)
+        self.batcher = MicroBatcher(self.scorer, max_batch_size, max_wait_ms, self.metrics)
+
+    def swap(self, scorer, version):
+        # Runs on the watcher thread; a batch already in the executor keeps the scorer it started with
+        self.scorer = scorer
+        self.batcher.scorer = scorer
+        self.metrics.cache = scorer.cache
+        self.metrics.reloads += 1
+
+    async def handle_predict(self, body):
+        payload = json.loads(body or b'null')
+        if isinstance(payload, dict) and 'records' in payload:
+            payload = payload['records']
+        # Validated here, per request: a bad record must never reach (and fail) a shared micro-batch
+        if isinstance(payload, dict):
+            return 1, await self.batcher.submit(validate_record(payload))
+        if isinstance(payload, list) and all(isinstance(r, dict) for r in payload):
+            records = []
+            for i, record in enumerate(payload):
+                try:
+                    records.append(validate_record(record))
+                except ValueError as error:
+                    raise ValueError(f"record {i}: {error}") from None
+            results = await self.batcher.score_batch(records) if records else []
+            return len(records), {'predictions': results}
+        raise ValueError("Expected a passenger object, a list of passengers or {'records': [...]}")
+
+    async def route(self, method, path, body):
+        if path == '/health':
+            version = self.watcher.version if self.watcher is not None else None
+            return 200, 'application/json', json.dumps({'status': 'ok', 'artifact': self.artifact_dir,
+                                                        'version': version}), 0
+        if path == '/metrics':
+            return 200, 'text/plain; version=0.0.4', self.metrics.to_prometheus(), 0
+        if path == '/drift':
+            scores = self.scorer.drift()
+            if scores is None:
+                return 404, 'application/json', json.dumps({'error': 'drift monitoring is off (--drift) or the '
+                                                                      'model has no drift reference'}), 0
+            return 200, 'application/json', json.dumps(scores), 0
+        if path == '/predict':
+            if method != 'POST':
+                return 405, 'application/json', json.dumps({'error': 'use POST'}), 0
+            try:
+                rows, result = await self.handle_predict(body)
+            except (ValueError, KeyError, TypeError) as error:
+                return 400, 'application/json', json.dumps({'error': str(error)}), 0
+            return 200, 'application/json', json.dumps(result), rows
+        return 404, 'application/json', json.dumps({'error': f'unknown path {path}'}), 0
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    length = -1
+                start = time.perf_counter()
+                if length < 0:
+                    # The body cannot be framed: answer and close the connection
+                    status, content_type, payload, rows = 400, 'application/json', '{"error": "bad Content-Length"}', 0
+                    headers['connection'] = 'close'
+                elif length > MAX_BODY_BYTES:
+                    # The body is left unread: close, or it would be parsed as the next request
+                    status, content_type, payload, rows = 413, 'application/json', '{"error": "body too large"}', 0
+                    headers['connection'] = 'close'
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    try:
+                        status, content_type, payload, rows = await self.route(method, path.split('?')[0], body)
+                    except Exception as error:
+                        status, content_type, payload, rows = 500, 'application/json', json.dumps({'error': str(error)}), 0
+                if path.startswith('/predict'):
+                    self.metrics.record_request(rows, time.perf_counter() - start, ok=(status == 200))
+
+                data = payload.encode()
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        self.batcher.start()
+        if self.watcher is not None:
+            self.watcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"🚢 Serving model from '{self.artifact_dir}' on http://{host}:{port} "
+              f"(max batch {self.batcher.max_batch_size}, max wait {self.batcher.max_wait * 1000:.1f} ms)")
+        async with server:
+            await server.serve_forever()
+
+
+def parse_args(argv=None):
+    from cli import add_serve_arguments
+    parser = argparse.ArgumentParser(description="Async HTTP scoring service with micro-batching.")
+    return add_serve_arguments(parser).parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = InferenceServer(args.model, args.max_batch_size, args.max_wait_ms, args.cache_size, args.drift,
+                             args.poll_interval)
+    asyncio.run(server.serve(args.host, args.port))
@@ -0,0 +1,306 @@
+"""
+**Purpose**: Opt-in instrumentation of pipeline stages and sub-steps.
+- **Spans**: `with span('predict'):` or `@instrumented('extract_titles')` records wall time, CPU time, rows in/out,
+  rows/sec and (with `memory=True`, via `tracemalloc`) the peak memory growth of the block. Spans nest, so a
+  sub-step is reported as `predict/score_frame/model.predict`.
+- **Disabled by default**: Until `enable()` is called (or `TITANIC_INSTRUMENT=1` is set) `span()` returns a
+  shared no-op object and the decorator is a single `None` check, so the hooks cost nothing measurable.
+- **Reports**: `write_report(path)` (JSON: per-span calls, totals, p50/p99 latency, rows/sec) and
+  `write_prometheus(path)` (text exposition format for a node-exporter textfile collector).
+- **Profiling**: `enable(profile=['train'])` wraps those spans in `cProfile` and writes `profiles/<span>.prof`.
+- **Threads**: Span stacks are per thread, so the Streamlit app and the inference server can record per-request
+  latency concurrently.
+"""
+
+import os
+import json
+import time
+import threading
+import functools
+import tracemalloc
+from collections import deque
+
+ENV_FLAG = 'TITANIC_INSTRUMENT'
+LATENCY_WINDOW = 10_000
+
+
+class _NoSpan:
+    """Returned while instrumentation is off; accepts the same attribute writes as a real span."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class SpanStats:
+    """Aggregate of every execution of one span path."""
+
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.peak_mb = None
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def add(self, wall, cpu, rows_in, rows_out, peak_mb):
+        self.calls += 1
+        self.wall += wall
+        self.cpu += cpu
+        self.rows_in += rows_in or 0
+        self.rows_out += rows_out or 0
+        self.latencies.append(wall)
+        if peak_mb is not None:
+            self.peak_mb = peak_mb if self.peak_mb is None else max(self.peak_mb, peak_mb)
+
+    def to_dict(self):
+        ordered = sorted(self.latencies)
+        quantile = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+        rows = self.rows_in or self.rows_out
+        return {'calls': self.calls, 'wall_seconds': self.wall, 'cpu_seconds': self.cpu,
+                'rows_in': self.rows_in, 'rows_out': self.rows_out,
+                'rows_per_sec': rows / self.wall if rows and self.wall else None,
+                'peak_memory_delta_mb': self.peak_mb,
+                'p50_seconds': quantile(0.5), 'p99_seconds': quantile(0.99)}
+
+
+class Span:
+    def __init__(self, recorder, name, rows_in=None):
+        self.recorder = recorder
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+
+    def __enter__(self):
+        recorder = self.recorder
+        stack = recorder.stack()
+        self.path = '/'.join([s.name for s in stack] + [self.name])
+        stack.append(self)
+        if recorder.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if len(stack) > 1:
+                # Hand the peak reached so far to the parent before this span resets it
+                stack[-2].max_traced = max(stack[-2].max_traced, peak)
+            tracemalloc.reset_peak()
+            self.start_traced = self.max_traced = current
+        self.profiler = recorder.start_profile(self.path)
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        recorder = self.recorder
+        if self.profiler is not None:
+            recorder.stop_profile(self.path, self.profiler)
+        stack = recorder.stack()
+        stack.pop()
+        peak_mb = None
+        if recorder.memory:
+            peak = max(self.max_traced, tracemalloc.get_traced_memory()[1])
+            peak_mb = (peak - self.start_traced) / 2 ** 20
+            if stack:
+                stack[-1].max_traced = max(stack[-1].max_traced, peak)
+            tracemalloc.reset_peak()
+        recorder.record(self.path, wall, cpu, self.rows_in, self.rows_out, peak_mb)
+        return False
+
+
+class Recorder:
+    def __init__(self, memory=False, profile=None, profile_dir='profiles'):
+        self.memory = memory
+        self.profile = set(profile or [])
+        self.profile_dir = profile_dir
+        self.stats = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def record(self, path, wall, cpu, rows_in, rows_out, peak_mb):
+        with self._lock:
+            stats = self.stats.get(path)
+            if stats is None:
+                stats = self.stats[path] = SpanStats(path)
+            stats.add(wall, cpu, rows_in, rows_out, peak_mb)
+
+    def start_profile(self, path):
+        if not self.profile or not ({path, path.split('/')[-1], '*'} & self.profile):
+            return None
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # Another profiler (e.g. an enclosing profiled span) is already active
+            return None
+        return profiler
+
+    def stop_profile(self, path, profiler):
+        profiler.disable()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.profile_dir, path.replace('/', '__') + '.prof'))
+
+    def report(self):
+        with self._lock:
+            spans = {path: stats.to_dict() for path, stats in sorted(self.stats.items())}
+        return {'started': self.started, 'finished': time.time(), 'memory_tracing': self.memory, 'spans': spans}
+
+
+_recorder = None
+
+
+def enable(memory=False, profile=None, profile_dir='profiles'):
+    """Starts recording (idempotent); returns the active recorder."""
+    global _recorder
+    if _recorder is None:
+        _recorder = Recorder(memory, profile, profile_dir)
+    return _recorder
+
+
+def disable():
+    """Stops recording and returns the final report (None if nothing was recorded)."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None and recorder.memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return recorder.report() if recorder is not None else None
+
+
+def is_enabled():
+    return _recorder is not None
+
+
+def span(name, rows_in=None):
+    """Context manager timing one stage / sub-step; set `.rows_out` on it inside the block."""
+    if _recorder is None:
+        return _NO_SPAN
+    return Span(_recorder, name, rows_in)
+
+
+def _is_frame(obj):
+    # Duck-typed so this module never has to import pandas
+    return hasattr(obj, 'columns') and hasattr(obj, 'iloc')
+
+
+def instrumented(name=None, rows=None):
+    """
+    Decorator version of `span`. The length of the first DataFrame argument is recorded as rows in, and of a
+    DataFrame result as rows out (`rows(result)` overrides the latter).
+    """
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return func(*args, **kwargs)
+            frame = next((arg for arg in args if _is_frame(arg)), None)
+            rows_in = len(frame) if frame is not None else None
+            with Span(_recorder, label, rows_in) as s:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    s.rows_out = rows(result)
+                elif _is_frame(result):
+                    s.rows_out = len(result)
+            return result
+        return wrapper
+    return decorate
+
+
+def report():
+    return _recorder.report() if _recorder is not None else None
+
+
+def write_report(path, data=None):
+    """Writes the JSON run report (the current one unless `data` is given)."""
+    data = data or report()
+    if data is None:
+        return None
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+    print(f"📊 Run report written to {path}")
+    return path
+
+
+def to_prometheus(data):
+    metrics = [('titanic_stage_calls_total', 'counter', 'calls'),
+               ('titanic_stage_wall_seconds_total', 'counter', 'wall_seconds'),
+               ('titanic_stage_cpu_seconds_total', 'counter', 'cpu_seconds'),
+               ('titanic_stage_rows_in_total', 'counter', 'rows_in'),
+               ('titanic_stage_rows_out_total', 'counter', 'rows_out'),
+               ('titanic_stage_rows_per_second', 'gauge', 'rows_per_sec'),
+               ('titanic_stage_peak_memory_delta_megabytes', 'gauge', 'peak_memory_delta_mb'),
+               ('titanic_stage_latency_p50_seconds', 'gauge', 'p50_seconds'),
+               ('titanic_stage_latency_p99_seconds', 'gauge', 'p99_seconds')]
+    lines = []
+    for metric, kind, key in metrics:
+        lines.append(f'# TYPE {metric} {kind}')
+        for path, stats in data['spans'].items():
+            if stats[key] is not None:
+                lines.append(f'{metric}{{stage="{path}"}} {stats[key]:.6g}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path, data=None):
+    """Writes the report in Prometheus text format (atomically, as textfile collectors expect)."""
+    data = data or report()
+    if data is None:
+        return None
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        f.write(to_prometheus(data))
+    os.replace(tmp, path)
+    print(f"📊 Prometheus metrics written to {path}")
+    return path
+
+
+def add_arguments(parser):
+    """Shared `--instrument` CLI flags for the entry points."""
+    group = parser.add_argument_group('instrumentation')
+    group.add_argument('--instrument', action='store_true', help="Record stage timings/rows (JSON run report)")
+    group.add_argument('--report', default='run_report.json', help="Run report path (with --instrument)")
+    group.add_argument('--prometheus', default=None, help="Also write Prometheus text-format metrics here")
+    group.add_argument('--trace-memory', action='store_true', help="Record peak memory per span (tracemalloc)")
+    group.add_argument('--profile', nargs='*', default=None,
+                       help="cProfile these spans (names or '*'), dumped to profiles/")
+    return parser
+
+
+def start_from_args(args):
+    if args.instrument or args.profile is not None or os.environ.get(ENV_FLAG):
+        # A bare --profile profiles the outermost spans
+        enable(memory=args.trace_memory, profile=args.profile or (['*'] if args.profile is not None else None))
+
+
+def finish_from_args(args):
+    """Writes the requested outputs and stops recording."""
+    data = disable()
+    if data is not None:
+        write_report(args.report, data)
+        if args.prometheus:
+            write_prometheus(args.prometheus, data)
+    return data
+
+
+if os.environ.get(ENV_FLAG):
+    enable(memory=os.environ.get(ENV_FLAG) == 'memory')
@@ -0,0 +1,87 @@
+"""
+**Purpose**: Local load generator for `inference_server.py`.
+- Opens `--concurrency` keep-alive connections, each sending single-passenger `POST /predict` requests
+  (sampled from `test.csv`) back to back for `--duration` seconds.
+- Reports throughput (requests/sec) and p50/p99 client-side latency, plus the server's micro-batch stats.
+
+USAGE: python inference_server.py &  python load_generator.py --concurrency 64 --duration 10
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+import numpy as np
+from data_loader import load_titanic_data
+
+FIELDS = ['PassengerId', 'Pclass', 'Name', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare', 'Embarked']
+
+
+def load_payloads(path='test.csv'):
+    """Pre-encoded request bodies so the generator spends its time on I/O, not JSON."""
+    df = load_titanic_data(path, columns=FIELDS)
+    records = df.astype(object).where(df.notna(), None).to_dict('records')
+    return [json.dumps(record).encode() for record in records]
+
+
+async def _request(reader, writer, host, method, path, body=b''):
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':')[1])
+    return status, await reader.readexactly(length)
+
+
+async def _client(host, port, payloads, stop_at, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            status, _ = await _request(reader, writer, host, 'POST', '/predict', random.choice(payloads))
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load(host='127.0.0.1', port=8000, concurrency=32, duration=10.0, data_path='test.csv'):
+    payloads = load_payloads(data_path)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[_client(host, port, payloads, start + duration, latencies, errors)
+                           for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, metrics = await _request(reader, writer, host, 'GET', '/metrics')
+    writer.close()
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000 if latencies else (0.0, 0.0)
+    print(f"Requests: {len(latencies):,} in {elapsed:.1f}s | Throughput: {len(latencies) / elapsed:,.0f} req/s "
+          f"| p50: {p50:.2f} ms | p99: {p99:.2f} ms | Errors: {len(errors)}")
+    stats = dict(line.split() for line in metrics.decode().splitlines() if line.startswith('titanic_micro'))
+    batches = float(stats.get('titanic_micro_batches_total', 0))
+    if batches:
+        print(f"Server micro-batches: {batches:,.0f} | Mean batch size: "
+              f"{float(stats['titanic_micro_batch_rows_total']) / batches:.1f}")
+    return {'requests': len(latencies), 'seconds': elapsed, 'p50_ms': p50, 'p99_ms': p99, 'errors': len(errors)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Titanic inference server.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--data', default='test.csv')
+    args = parser.parse_args()
+    asyncio.run(run_load(args.host, args.port, args.concurrency, args.duration, args.data))
@@ -0,0 +1,314 @@
+"""
+**Purpose**: Precomputed predictions for every input the Streamlit app can send (`lookup_table/`).
+- **Domain**: The app's widgets: Pclass 1-3, both sexes, integer ages 0-100, SibSp / Parch 0-10, ports S/C/Q and
+  Fare 0-500. Inputs that no split of the forest can tell apart share one cell:
+    - *Fare*: Cut at every Fare split of the forest (compared in float32, like the trees do) and at the FareBin
+      edges, so ~220 fare cells cover the whole range.
+    - *Age*: Integer ages on the same side of every Age split (and with the same inferred Title) share a cell.
+    - *SibSp x Parch*: Pairs with the same SibSp / Parch / FamilySize / IsAlone splits share a cell.
+- **Build**: `build_table()` encodes one representative passenger per cell with `FeatureEncoder` (the scoring
+  path's encoding) and scores the grid once with the compiled forest, in vectorised batches.
+- **Artifact**: `manifest.json` (format version, checksum of the `model_artifact/` it was built from, the cell
+  maps, file hashes) + `labels.npy` (predictions, bit-packed) + `probabilities.npy` (P(survived) as uint16).
+  For the app's domain: ~14M cells, ~1.8 MB of labels and ~28 MB of probabilities, memory-mapped.
+- **Online**: `LookupScorer.predict_one` has `PassengerScorer.predict_one`'s signature but is an index computation
+  and two array reads: no model in memory. Inputs outside the domain raise ValueError.
+- **Verify**: `verify_table()` re-scores every cell with `model.predict` / `predict_proba` and compares random
+  app inputs with `PassengerScorer`.
+
+USAGE: python lookup_table.py --artifact model_artifact --output lookup_table
+       python lookup_table.py --verify --model titanic_model.pkl
+"""
+
+import os
+import json
+import time
+import argparse
+from bisect import bisect_left, bisect_right
+import numpy as np
+from artifact_store import load_artifact, ArtifactError, MANIFEST_NAME, _sha256, _manifest_checksum
+from fast_encoder import FeatureEncoder
+from online_predictor import PassengerScorer, infer_title
+
+FORMAT_VERSION = 1
+PROBABILITY_SCALE = 65_535  # uint16 probabilities: resolution 1.5e-5
+BATCH_ROWS = 1 << 18
+APP_DOMAIN = {'Pclass': [1, 2, 3], 'Sex': ['male', 'female'], 'Embarked': ['S', 'C', 'Q'],
+              'Age': [0, 100], 'SibSp': [0, 10], 'Parch': [0, 10], 'Fare': [0.0, 500.0]}
+DIMENSIONS = ['Pclass', 'Sex', 'Embarked', 'Age', 'Family', 'Fare']
+
+
+def split_thresholds(forest, columns, column):
+    """Sorted distinct thresholds of the forest's splits on `column` (empty if the model has no such column)."""
+    if column not in columns:
+        return []
+    # In the compiled layout leaves (and padding) are the nodes whose right child is themselves
+    internal = forest.right != np.arange(len(forest.right))
+    return np.unique(forest.threshold[internal & (forest.feature == columns.index(column))]).tolist()
+
+
+def _float32_boundary(threshold):
+    """Smallest float64 `x >= 0` with `float32(x) > threshold`: the first value sent right by this split."""
+    above = np.float32(threshold)
+    if above <= threshold:
+        above = np.nextafter(above, np.float32(np.inf))
+    # float32(low) <= threshold < float32(high); bisect the float64s in between by bit pattern
+    low = int(np.float64(np.nextafter(above, np.float32(-np.inf))).view(np.int64))
+    high = int(np.float64(above).view(np.int64))
+    while high - low > 1:
+        mid = (low + high) // 2
+        if np.float32(np.int64(mid).view(np.float64)) > threshold:
+            high = mid
+        else:
+            low = mid
+    return float(np.int64(high).view(np.float64))
+
+
+def fare_boundaries(forest, columns, state, low, high):
+    """Start of every fare cell in [low, high]: the fare range cut wherever a split or FareBin changes."""
+    cuts = {_float32_boundary(t) for t in split_thresholds(forest, columns, 'Fare') if t >= low}
+    # FareBin counts the edges strictly below the fare (bisect_left)
+    cuts |= {float(np.nextafter(edge, np.inf)) for edge in state['fare_bin_edges'][1:-1]}
+    return [float(low)] + sorted(cut for cut in cuts if low < cut <= high)
+
+
+def _group(values, key):
+    """Cell id per value (values with equal keys share a cell) and one representative value per cell."""
+    cells, representatives, ids = {}, [], []
+    for value in values:
+        cell = cells.setdefault(key(value), len(representatives))
+        if cell == len(representatives):
+            representatives.append(value)
+        ids.append(cell)
+    return ids, representatives
+
+
+def age_cells(forest, columns, low, high):
+    thresholds = split_thresholds(forest, columns, 'Age')
+    return _group(range(low, high + 1), lambda age: (bisect_left(thresholds, age), infer_title('male', age),
+                                                     infer_title('female', age)))
+
+
+def family_cells(forest, columns, sibsp_range, parch_range):
+    thresholds = [split_thresholds(forest, columns, name) for name in ('SibSp', 'Parch', 'FamilySize')]
+    pairs = [(sibsp, parch) for sibsp in range(sibsp_range[0], sibsp_range[1] + 1)
+             for parch in range(parch_range[0], parch_range[1] + 1)]
+    return _group(pairs, lambda pair: (bisect_left(thresholds[0], pair[0]), bisect_left(thresholds[1], pair[1]),
+                                       bisect_left(thresholds[2], sum(pair) + 1), sum(pair) == 0))
+
+
+def _cell_batches(manifest, encoder, batch_rows=BATCH_ROWS):
+    """Yields (first cell, model matrix) for consecutive batches of cells, in flat-index order."""
+    levels = manifest['levels']
+    shape = manifest['shape']
+    ages = np.asarray(manifest['age_values'], dtype=np.float64)
+    family = np.asarray(manifest['family_values'], dtype=np.float64)
+    fares = np.asarray(manifest['fare_boundaries'], dtype=np.float64)
+    sexes = np.asarray(levels['Sex'], dtype=object)
+    ports = np.asarray(levels['Embarked'], dtype=object)
+    # The app sends no name: the Title is inferred from sex and age, as PassengerScorer does
+    titles = np.array([[infer_title(sex, age) for age in manifest['age_values']] for sex in levels['Sex']],
+                      dtype=object)
+    n_cells = int(np.prod(shape))
+    for start in range(0, n_cells, batch_rows):
+        pclass, sex, port, age, pair, fare = np.unravel_index(np.arange(start, min(start + batch_rows, n_cells)),
+                                                              shape)
+        data = {'Pclass': np.asarray(levels['Pclass'], dtype=np.float64)[pclass], 'Sex': sexes[sex],
+                'Embarked': ports[port], 'Age': ages[age], 'SibSp': family[pair, 0], 'Parch': family[pair, 1],
+                'Fare': fares[fare], 'Title': titles[sex, age]}
+        yield start, encoder.transform(data)
+
+
+def build_table(artifact_dir='model_artifact', output_dir='lookup_table', domain=None, batch_rows=BATCH_ROWS):
+    """Scores every cell of `domain` (default: the app's inputs) and writes the table to `output_dir`."""
+    domain = domain or APP_DOMAIN
+    artifact = load_artifact(artifact_dir)
+    forest, columns, state = artifact.forest, list(artifact.columns), artifact.state
+
+    age_ids, age_values = age_cells(forest, columns, *domain['Age'])
+    family_ids, family_values = family_cells(forest, columns, domain['SibSp'], domain['Parch'])
+    boundaries = fare_boundaries(forest, columns, state, *domain['Fare'])
+    shape = [len(domain['Pclass']), len(domain['Sex']), len(domain['Embarked']), len(age_values),
+             len(family_values), len(boundaries)]
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'source_checksum': artifact.manifest['checksum'],
+        'domain': domain,
+        'dimensions': DIMENSIONS,
+        'shape': shape,
+        'levels': {name: list(domain[name]) for name in ('Pclass', 'Sex', 'Embarked')},
+        'age_cells': age_ids,
+        'age_values': age_values,
+        'family_cells': family_ids,
+        'family_values': [list(pair) for pair in family_values],
+        'fare_boundaries': boundaries,
+        'classes': np.asarray(forest.classes).tolist(),
+        'probability_scale': PROBABILITY_SCALE,
+    }
+
+    n_cells = int(np.prod(shape))
+    print(f"🔢 Scoring {n_cells:,} cells ({' x '.join(map(str, shape))})...")
+    start_time = time.perf_counter()
+    labels = np.empty(n_cells, dtype=bool)
+    probabilities = np.empty(n_cells, dtype=np.uint16)
+    for start, X in _cell_batches(manifest, FeatureEncoder(state), batch_rows):
+        proba = forest.predict_proba(X)
+        # Same rule as PassengerScorer: the second class only when strictly more probable
+        labels[start:start + len(X)] = proba[:, 1] > proba[:, 0]
+        probabilities[start:start + len(X)] = np.rint(proba[:, 1] * PROBABILITY_SCALE)
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest['arrays'] = {}
+    for name, array in (('labels', np.packbits(labels)), ('probabilities', probabilities)):
+        path = os.path.join(output_dir, f'{name}.npy')
+        np.save(path, array)
+        manifest['arrays'][name] = {'file': f'{name}.npy', 'dtype': str(array.dtype), 'shape': list(array.shape),
+                                    'sha256': _sha256(path)}
+    manifest['checksum'] = _manifest_checksum(manifest)
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f)
+    size_mb = sum(os.path.getsize(os.path.join(output_dir, spec['file']))
+                  for spec in manifest['arrays'].values()) / 2 ** 20
+    print(f"✅ Wrote {output_dir}/ ({n_cells:,} cells, {size_mb:.1f} MB) in {time.perf_counter() - start_time:.1f}s")
+    return manifest
+
+
+class LookupScorer:
+    """Answers `predict_one` from a built table; build once (e.g. with `st.cache_resource`)."""
+
+    def __init__(self, manifest, labels, probabilities):
+        self.manifest = manifest
+        self.labels = labels
+        self.probabilities = probabilities
+        self.classes = manifest['classes']
+        self.scale = manifest['probability_scale']
+        domain = manifest['domain']
+        self.age_low, self.age_high = domain['Age']
+        self.sibsp_low, self.sibsp_high = domain['SibSp']
+        self.parch_low, self.parch_high = domain['Parch']
+        self.n_parch = self.parch_high - self.parch_low + 1
+        self.fare_low, self.fare_high = domain['Fare']
+        self.level_index = {name: {value: i for i, value in enumerate(values)}
+                            for name, values in manifest['levels'].items()}
+        self.age_cells = manifest['age_cells']
+        self.family_cells = manifest['family_cells']
+        self.fare_boundaries = manifest['fare_boundaries']
+        # Row-major strides of the (Pclass, Sex, Embarked, Age, Family, Fare) grid
+        shape = manifest['shape']
+        self.strides = [int(np.prod(shape[i + 1:])) for i in range(len(shape))]
+
+    @classmethod
+    def load(cls, directory='lookup_table', artifact_dir=None, verify=True):
+        """
+        Memory-maps the table. With `artifact_dir`, a table built from a different model artifact is rejected
+        (ArtifactError), so a retrained model is never answered from stale cells.
+        """
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            raise ArtifactError(f"No lookup table manifest found at {manifest_path}")
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != FORMAT_VERSION:
+            raise ArtifactError(f"Unsupported lookup table format version: {manifest.get('format_version')}")
+        if manifest.get('checksum') != _manifest_checksum(manifest):
+            raise ArtifactError("Lookup table manifest checksum mismatch")
+        if artifact_dir is not None:
+            with open(os.path.join(artifact_dir, MANIFEST_NAME)) as f:
+                if json.load(f).get('checksum') != manifest['source_checksum']:
+                    raise ArtifactError(f"{directory}/ was built from another model; rebuild it (lookup_table.py)")
+        arrays = {}
+        for name, spec in manifest['arrays'].items():
+            path = os.path.join(directory, spec['file'])
+            if verify and _sha256(path) != spec['sha256']:
+                raise ArtifactError(f"Checksum mismatch for {spec['file']}")
+            arrays[name] = np.load(path, mmap_mode='r')
+        return cls(manifest, arrays['labels'], arrays['probabilities'])
+
+    def cell_index(self, pclass, sex, age, sibsp, parch, fare, embarked):
+        """Flat cell index of one passenger; ValueError if any input is outside the table's domain."""
+        levels = self.level_index
+        if pclass not in levels['Pclass'] or sex not in levels['Sex'] or embarked not in levels['Embarked']:
+            raise ValueError(f"Pclass={pclass!r}, Sex={sex!r}, Embarked={embarked!r}: not in the table's domain")
+        if age is None or age != int(age) or not self.age_low <= age <= self.age_high:
+            raise ValueError(f"Age={age!r}: the table covers integer ages {self.age_low}-{self.age_high}")
+        if not (self.sibsp_low <= sibsp <= self.sibsp_high and self.parch_low <= parch <= self.parch_high):
+            raise ValueError(f"SibSp={sibsp!r}, Parch={parch!r}: not in the table's domain")
+        if fare is None or not self.fare_low <= fare <= self.fare_high:
+            raise ValueError(f"Fare={fare!r}: the table covers {self.fare_low}-{self.fare_high}")
+        coords = (levels['Pclass'][pclass], levels['Sex'][sex], levels['Embarked'][embarked],
+                  self.age_cells[int(age) - self.age_low],
+                  self.family_cells[(int(sibsp) - self.sibsp_low) * self.n_parch + int(parch) - self.parch_low],
+                  bisect_right(self.fare_boundaries, fare) - 1)
+        return sum(coord * stride for coord, stride in zip(coords, self.strides))
+
+    def predict_one(self, pclass, sex, age, sibsp, parch, fare, embarked, title=None):
+        """Returns (predicted class, survival probability) for one passenger, like `PassengerScorer`."""
+        if title is not None and title != infer_title(sex, age):
+            raise ValueError(f"Title={title!r}: the table only covers titles inferred from sex and age")
+        cell = self.cell_index(pclass, sex, age, sibsp, parch, fare, embarked)
+        bit = (int(self.labels[cell >> 3]) >> (7 - (cell & 7))) & 1
+        return self.classes[bit], int(self.probabilities[cell]) / self.scale
+
+
+def verify_table(directory='lookup_table', model=None, artifact_dir='model_artifact', samples=10_000, seed=0):
+    """
+    Re-scores every cell with `model` (default: the artifact's compiled forest) and checks random in-domain
+    app inputs (2-decimal fares) against `PassengerScorer`. Returns a summary; `ok` is True when nothing differs.
+    """
+    table = LookupScorer.load(directory, artifact_dir)
+    artifact = load_artifact(artifact_dir)
+    model = artifact.forest if model is None else model
+    manifest = table.manifest
+    labels = np.unpackbits(table.labels, count=int(np.prod(manifest['shape']))).astype(bool)
+
+    mismatches = 0
+    max_error = 0.0
+    for start, X in _cell_batches(manifest, FeatureEncoder(artifact.state)):
+        stop = start + len(X)
+        expected = np.asarray(model.predict(X)) == manifest['classes'][1]
+        mismatches += int(np.count_nonzero(expected != labels[start:stop]))
+        stored = table.probabilities[start:stop] / table.scale
+        max_error = max(max_error, float(np.abs(model.predict_proba(X)[:, 1] - stored).max()))
+
+    scorer = PassengerScorer(artifact.forest, artifact.columns, artifact.state)
+    domain = manifest['domain']
+    rng = np.random.default_rng(seed)
+    spot_mismatches = 0
+    for _ in range(samples):
+        passenger = (int(rng.choice(domain['Pclass'])), str(rng.choice(domain['Sex'])),
+                     int(rng.integers(domain['Age'][0], domain['Age'][1] + 1)),
+                     int(rng.integers(domain['SibSp'][0], domain['SibSp'][1] + 1)),
+                     int(rng.integers(domain['Parch'][0], domain['Parch'][1] + 1)),
+                     round(float(rng.uniform(*domain['Fare'])), 2), str(rng.choice(domain['Embarked'])))
+        label, probability = table.predict_one(*passenger)
+        expected_label, expected_probability = scorer.predict_one(*passenger)
+        if label != expected_label or abs(probability - expected_probability) > 1 / table.scale:
+            spot_mismatches += 1
+
+    summary = {'cells': len(labels), 'label_mismatches': mismatches, 'max_probability_error': max_error,
+               'spot_checks': samples, 'spot_mismatches': spot_mismatches,
+               # Rounding to uint16 is off by at most half a step
+               'ok': mismatches == 0 and spot_mismatches == 0 and max_error <= 0.5 / table.scale + 1e-12}
+    icon = '✅' if summary['ok'] else '❌'
+    print(f"{icon} {summary['cells']:,} cells: {mismatches} label mismatches, max probability error "
+          f"{max_error:.2e}; {samples:,} random app inputs: {spot_mismatches} mismatches")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the app's predictions into a lookup table.")
+    parser.add_argument('--artifact', default='model_artifact')
+    parser.add_argument('--output', default='lookup_table')
+    parser.add_argument('--verify', action='store_true', help="Check an existing table instead of building one")
+    parser.add_argument('--model', default=None, help="joblib model to verify against (default: the artifact)")
+    parser.add_argument('--samples', type=int, default=10_000, help="Random app inputs checked by --verify")
+    args = parser.parse_args()
+    if args.verify:
+        reference = None
+        if args.model:
+            import joblib
+            reference = joblib.load(args.model)
+        if not verify_table(args.output, reference, args.artifact, args.samples)['ok']:
+            raise SystemExit(1)
+    else:
+        build_table(args.artifact, args.output)
@@ -1,21 +1,97 @@
 """
 **Purpose**: The Orchestrator.
 - **Workflow**: Manages the dependency chain between all other scripts. It serves as the single entry point for the user.
+- **Stages**: load -> feature_engineering -> clean -> train -> audit / predict, run through `pipeline_cache.py`.
+  Each stage is cached under a key built from its input file hashes, its source files and its parameters, so
+  only stages whose inputs changed re-execute (iterating on the audit or prediction code never retrains).
+  A stage's source files are derived from the modules its body uses (`pipeline_cache.source_closure`).
+- **Drift**: The predict stage also writes `drift_report.json` (test.csv vs the training reference).
+- **Overrides**: `--force` re-runs every stage, `--from-stage NAME` re-runs NAME and everything after it.
+- **Instrumentation**: `--instrument` writes a JSON run report of per-stage/sub-step timings, rows and memory
+  (`--prometheus PATH`, `--trace-memory`, `--profile STAGE` as in `instrumentation.py`).
 
 """
 
 import os
 import sys
-from model_trainer import train_titanic_model
+import argparse
+import numpy as np
+import pandas as pd
+from data_loader import load_titanic_data
+from preprocessor import TitanicPreprocessor
+from model_trainer import train_on_features
 from bias_validator import run_bias_audit
 from predict import generate_predictions
+from pipeline_cache import Stage, run_stages, print_summary, tee_stdout, source_closure
+from instrumentation import instrumented, add_arguments, start_from_args, finish_from_args
 
-def run_pipeline():
+STAGE_NAMES = ['load', 'feature_engineering', 'clean', 'train', 'audit', 'predict']
+MODEL_OUTPUTS = ['titanic_model.pkl', 'model_columns.pkl', 'preprocessor_state.pkl', 'model_artifact']
+
+
+def build_stages(train_data, test_data, workers=1):
+    """The pipeline DAG, in dependency order."""
+
+    def load(out_dir, upstream):
+        load_titanic_data(train_data).to_pickle(os.path.join(out_dir, 'train.pkl'))
+
+    def feature_engineering(out_dir, upstream):
+        # Fits the imputation statistics, FareBin edges and dummy-column vocabulary on train.csv
+        raw_df = pd.read_pickle(os.path.join(upstream['load'], 'train.pkl'))
+        TitanicPreprocessor().fit(raw_df).save(os.path.join(out_dir, 'preprocessor_state.pkl'))
+
+    def clean(out_dir, upstream):
+        raw_df = pd.read_pickle(os.path.join(upstream['load'], 'train.pkl'))
+        preprocessor = TitanicPreprocessor.load(os.path.join(upstream['feature_engineering'], 'preprocessor_state.pkl'))
+        preprocessor.transform(raw_df).astype(np.float32).to_pickle(os.path.join(out_dir, 'features.pkl'))
+        np.save(os.path.join(out_dir, 'target.npy'), raw_df['Survived'].to_numpy())
+
+    def train(out_dir, upstream):
+        X = pd.read_pickle(os.path.join(upstream['clean'], 'features.pkl'))
+        y = np.load(os.path.join(upstream['clean'], 'target.npy'))
+        preprocessor = TitanicPreprocessor.load(os.path.join(upstream['feature_engineering'], 'preprocessor_state.pkl'))
+        train_on_features(X, y, preprocessor, output_dir=out_dir)
+
+    def audit(out_dir, upstream):
+        with tee_stdout(os.path.join(out_dir, 'audit_report.txt')):
+            run_bias_audit(train_data, os.path.join(upstream['train'], 'model_artifact'),
+                           output_path=os.path.join(out_dir, 'bias_audit.csv'))
+
+    def replay_audit(out_dir):
+        with open(os.path.join(out_dir, 'audit_report.txt')) as f:
+            print(f.read(), end='')
+
+    def predict(out_dir, upstream):
+        model_dir = upstream['train']
+        generate_predictions(test_data, os.path.join(model_dir, 'model_artifact'),
+                             os.path.join(model_dir, 'model_columns.pkl'), workers=workers,
+                             output_path=os.path.join(out_dir, 'submission.csv'),
+                             drift_report=os.path.join(out_dir, 'drift_report.json'))
+
+    # Source files come from each body's import closure (main.py included), never from a hand-kept list
+    stages = [
+        Stage('load', load, inputs=[train_data], code=source_closure(load)),
+        Stage('feature_engineering', feature_engineering, deps=['load'], code=source_closure(feature_engineering)),
+        Stage('clean', clean, deps=['load', 'feature_engineering'], code=source_closure(clean)),
+        Stage('train', train, deps=['feature_engineering', 'clean'], code=source_closure(train),
+              exports=MODEL_OUTPUTS),
+        Stage('audit', audit, deps=['load', 'train'], inputs=[train_data], code=source_closure(audit),
+              on_hit=replay_audit),
+    ]
+    if os.path.exists(test_data):
+        # `workers` only changes how the rows are split, not the output, so it is not part of the key
+        stages.append(Stage('predict', predict, deps=['train'], inputs=[test_data], code=source_closure(predict),
+                            exports=['submission.csv', 'drift_report.json']))
+    else:
+        print(f"ℹ️ Skipping the predict stage ({test_data} not found).")
+    return stages
+
+
+@instrumented()
+def run_pipeline(workers=1, force=False, from_stage=None, cache_dir='.pipeline_cache'):
     # Define file paths
     TRAIN_DATA = 'train.csv'
     TEST_DATA = 'test.csv'
-    MODEL_PATH = 'titanic_model.pkl'
-    COLUMNS_PATH = 'model_columns.pkl'
 
     # Check if data exists
     if not os.path.exists(TRAIN_DATA):
@@ -24,26 +100,21 @@ def run_pipeline():
 
     print("🚀 Starting Titanic Survival Pipeline...\n")
 
-
-    # Step 1: Training
-    print("Step 1: Training Model...")
-    train_titanic_model(TRAIN_DATA)
-    print("✅ Training Complete.\n")
-
-    # Step 2: Bias Validation
-    print("Step 2: Running Bias Audit...")
-    run_bias_audit(TRAIN_DATA, MODEL_PATH)
-    print("✅ Audit Complete.\n")
-
-    # Step 3: Prediction
-    if os.path.exists(TEST_DATA):
-        print("Step 3: Generating Final Predictions...")
-        generate_predictions(TEST_DATA, MODEL_PATH, COLUMNS_PATH)
-        print("✅ submission.csv created.")
-    else:
-        print("Step 3: Skip (test.csv not found).")
+    records = run_stages(build_stages(TRAIN_DATA, TEST_DATA, workers), cache_dir, force, from_stage)
+    print_summary(records)
 
     print("\n🎉 Pipeline execution finished successfully.")
+    return records
 
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the Titanic survival pipeline.")
+    parser.add_argument('--workers', type=int, default=1, help="Processes used for batch scoring")
+    parser.add_argument('--force', action='store_true', help="Re-run every stage, ignoring the cache")
+    parser.add_argument('--from-stage', choices=STAGE_NAMES, default=None,
+                        help="Re-run this stage and everything downstream of it")
+    parser.add_argument('--cache-dir', default='.pipeline_cache')
+    add_arguments(parser)
+    args = parser.parse_args()
+    start_from_args(args)
+    run_pipeline(workers=args.workers, force=args.force, from_stage=args.from_stage, cache_dir=args.cache_dir)
+    finish_from_args(args)
@@ -0,0 +1,266 @@
+"""
+**Purpose**: Versioned model registry (`model_registry/`) with hot reload for long-running processes.
+- **Layout**: `versions/v0001/`, `versions/v0002/`, ... each hold one trained model (the pickles and
+  `model_artifact/`, as written by `model_trainer.save_model_artifacts`) plus `version.json` (creation time,
+  previous version, training metadata, SHA-256 of every file). `CURRENT` names the version to serve.
+- **Atomic publish**: A version is written to a hidden staging directory and renamed into `versions/` only
+  when complete; its files are then made read-only (versions are never modified). `CURRENT` is replaced with
+  `os.replace`, so readers see the old or the new name, never a partial file or a half-written model.
+- **Rollback**: `set_current(registry_dir, 'v0003')` points `CURRENT` back at any published version.
+- **`ModelWatcher`**: Polls `CURRENT` with one `os.stat` per interval on a background thread. A new version is
+  loaded and warmed with a probe on that thread, then swapped in with a single reference assignment: requests
+  that already hold the old model finish on it, and neither the load nor the swap runs on a request path.
+- **Paths**: `resolve_artifact(path)` turns a registry (or one version) directory into its `model_artifact/`,
+  so `--model model_registry` works wherever a `model_artifact/` directory is accepted.
+
+USAGE: python model_trainer.py --registry model_registry
+       python inference_server.py --model model_registry --poll-interval 2
+       python model_registry.py --list | --rollback v0002 | --prune 5
+"""
+
+import os
+import json
+import time
+import shutil
+import stat
+import argparse
+import threading
+from artifact_store import _sha256
+
+CURRENT_NAME = 'CURRENT'
+VERSIONS_DIR = 'versions'
+VERSION_MANIFEST = 'version.json'
+ARTIFACT_DIR = 'model_artifact'
+
+
+def is_registry(path):
+    return os.path.isfile(os.path.join(path, CURRENT_NAME))
+
+
+def current_version(registry_dir):
+    """Name of the version `CURRENT` points at (None for an empty or missing registry)."""
+    try:
+        with open(os.path.join(registry_dir, CURRENT_NAME)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def version_path(registry_dir, version):
+    return os.path.join(registry_dir, VERSIONS_DIR, version)
+
+
+def list_versions(registry_dir):
+    versions_dir = os.path.join(registry_dir, VERSIONS_DIR)
+    if not os.path.isdir(versions_dir):
+        return []
+    return sorted(name for name in os.listdir(versions_dir) if name.startswith('v'))
+
+
+def read_manifest(registry_dir, version):
+    with open(os.path.join(version_path(registry_dir, version), VERSION_MANIFEST)) as f:
+        return json.load(f)
+
+
+def resolve_artifact(path):
+    """`model_artifact/` of a registry's current version or of one version directory; `path` itself otherwise."""
+    if is_registry(path):
+        path = version_path(path, current_version(path))
+    if os.path.isfile(os.path.join(path, VERSION_MANIFEST)):
+        return os.path.join(path, ARTIFACT_DIR)
+    return path
+
+
+def set_current(registry_dir, version):
+    """Points `CURRENT` at a published version, atomically (also used for rollbacks)."""
+    if not os.path.isfile(os.path.join(version_path(registry_dir, version), VERSION_MANIFEST)):
+        raise ValueError(f"Unknown model version '{version}' in {registry_dir}")
+    staging = os.path.join(registry_dir, f'.{CURRENT_NAME}.{os.getpid()}.tmp')
+    with open(staging, 'w') as f:
+        f.write(version + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(staging, os.path.join(registry_dir, CURRENT_NAME))
+    return version
+
+
+def _file_hashes(directory):
+    hashes = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            hashes[os.path.relpath(path, directory)] = _sha256(path)
+    return hashes
+
+
+def _make_read_only(directory):
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            os.chmod(path, stat.S_IMODE(os.stat(path).st_mode) & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+def publish(registry_dir, write, metadata=None, make_current=True):
+    """
+    Publishes a new immutable version: `write(directory)` writes the model files (e.g. a call to
+    `save_model_artifacts`) into a staging directory that becomes `versions/vNNNN`. Returns the version name.
+    """
+    versions_dir = os.path.join(registry_dir, VERSIONS_DIR)
+    os.makedirs(versions_dir, exist_ok=True)
+    staging = os.path.join(versions_dir, f'.staging-{os.getpid()}-{time.time_ns()}')
+    try:
+        write(staging)
+        manifest = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'previous': current_version(registry_dir),
+                    'metadata': metadata or {}, 'files': _file_hashes(staging)}
+        while True:
+            existing = list_versions(registry_dir)
+            version = f'v{int(existing[-1][1:]) + 1 if existing else 1:04d}'
+            manifest['version'] = version
+            with open(os.path.join(staging, VERSION_MANIFEST), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            try:
+                # Atomic; fails if a concurrent publisher took this number first
+                os.rename(staging, os.path.join(versions_dir, version))
+                break
+            except OSError:
+                if not os.path.exists(os.path.join(versions_dir, version)):
+                    raise
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    _make_read_only(os.path.join(versions_dir, version))
+    if make_current:
+        set_current(registry_dir, version)
+    print(f"📦 Published model {version} to {registry_dir}" + (" (current)" if make_current else ""))
+    return version
+
+
+def verify_version(registry_dir, version):
+    """True when every file of the version still matches the hashes in its manifest."""
+    manifest = read_manifest(registry_dir, version)
+    directory = version_path(registry_dir, version)
+    return all(_sha256(os.path.join(directory, name)) == digest for name, digest in manifest['files'].items())
+
+
+def prune(registry_dir, keep=5):
+    """Deletes all but the newest `keep` versions (the current one is always kept); returns the deleted names."""
+    versions = list_versions(registry_dir)
+    kept = set(versions[-keep:] if keep else []) | {current_version(registry_dir)}
+    removed = [version for version in versions if version not in kept]
+    for version in removed:
+        directory = version_path(registry_dir, version)
+        # Files are read-only; the directories are not, so the tree can still be removed
+        shutil.rmtree(directory)
+    return removed
+
+
+class ModelWatcher:
+    """
+    Holds the served model of a registry and hot-swaps it when `CURRENT` changes.
+    `load(version_dir)` builds the served object (e.g. a scorer); `probe(obj)` warms it before the swap;
+    `on_swap(obj, version)` is called after each swap. Read `active` once per request and use that object.
+    The retired object's prediction cache (its `cache` attribute, if any) is invalidated on the swap.
+    """
+
+    def __init__(self, registry_dir, load, probe=None, interval=2.0, on_swap=None):
+        self.registry_dir = registry_dir
+        self.load = load
+        self.probe = probe
+        self.interval = interval
+        self.on_swap = on_swap
+        self.reloads = 0
+        self.last_error = None
+        self._signature = self._stat()
+        version = current_version(registry_dir)
+        if version is None:
+            raise ValueError(f"{registry_dir} has no current model version")
+        self._current = (version, self._load(version))
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def active(self):
+        return self._current[1]
+
+    @property
+    def version(self):
+        return self._current[0]
+
+    def _stat(self):
+        try:
+            info = os.stat(os.path.join(self.registry_dir, CURRENT_NAME))
+        except FileNotFoundError:
+            return None
+        # os.replace gives CURRENT a new inode, so this changes on every publish / rollback
+        return info.st_ino, info.st_mtime_ns, info.st_size
+
+    def _load(self, version):
+        loaded = self.load(version_path(self.registry_dir, version))
+        if self.probe is not None:
+            self.probe(loaded)
+        return loaded
+
+    def poll(self):
+        """One cheap check; loads, warms and swaps in a new current version. Returns True after a swap."""
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        version = current_version(self.registry_dir)
+        if version is None or version == self.version:
+            return False
+        try:
+            loaded = self._load(version)
+        except Exception as error:
+            # Keep serving the old version; the next change of CURRENT is tried again
+            self.last_error = f"{version}: {error}"
+            print(f"⚠️ Could not load model {version}, still serving {self.version}: {error}")
+            return False
+        # The swap: one reference assignment. Holders of the old model are unaffected.
+        retired = self.active
+        self._current = (version, loaded)
+        self.reloads += 1
+        # Its cached answers came from the old model; late holders just recompute on a miss (the cache is
+        # thread-safe, so in-flight batches on the old scorer are not disturbed)
+        cache = getattr(retired, 'cache', None)
+        if cache is not None:
+            cache.invalidate()
+        if self.on_swap is not None:
+            self.on_swap(loaded, version)
+        print(f"🔄 Now serving model {version}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and manage the model registry.")
+    parser.add_argument('--registry', default='model_registry')
+    parser.add_argument('--list', action='store_true', help="List the published versions")
+    parser.add_argument('--rollback', default=None, metavar='VERSION', help="Point CURRENT at VERSION")
+    parser.add_argument('--prune', type=int, default=None, metavar='KEEP', help="Keep only the newest KEEP versions")
+    args = parser.parse_args()
+
+    if args.rollback:
+        set_current(args.registry, args.rollback)
+        print(f"✅ {args.registry} now serves {args.rollback}")
+    if args.prune is not None:
+        print(f"🗑️ Removed: {', '.join(prune(args.registry, args.prune)) or 'nothing'}")
+    if args.list or not (args.rollback or args.prune is not None):
+        current = current_version(args.registry)
+        for version in list_versions(args.registry):
+            manifest = read_manifest(args.registry, version)
+            marker = '*' if version == current else ' '
+            print(f"{marker} {version} | {manifest['created']} | {json.dumps(manifest['metadata'])}")
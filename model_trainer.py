@@ -1,8 +1,15 @@
 """
 **Purpose**: Model selection and training.
 - **Algorithm**: Random Forest Classifier (set to `max_depth=5` to prevent overfitting).
-- **`get_feature_importance(model, feature_names)`**: Visualizes which columns influenced the decision-making process.
-- **Artifacts**: Saves `titanic_model.pkl` (the weights) and `model_columns.pkl` (the feature order).
+- **`get_feature_importance(model, feature_names)`**: Visualizes which columns influenced the decision-making process
+  (global importances; per-prediction contributions are in `attributions.py`).
+- **Artifacts**: Saves `titanic_model.pkl` (the weights), `model_columns.pkl` (the feature order) and
+  `preprocessor_state.pkl` (the fitted imputation/binning statistics reused at inference), plus the
+  memory-mappable `model_artifact/` bundle of all three (see `artifact_store.py`).
+  `--group-features` adds the ticket / surname / deck group features (`feature_engineering.fit_group_tables`).
+  `--registry DIR` also publishes them as a new immutable version that running servers hot-reload
+  (`model_registry.py`).
+- **Instrumentation**: `--instrument` records the cross-validation / fit / save steps (`instrumentation.py`).
 """
 
 """
@@ -10,48 +17,159 @@ Module: model_trainer.py
 Purpose: Trains the Random Forest and validates stability using Cross-Validation.
 """
 
+import os
+import time
+import argparse
+import numpy as np
 import pandas as pd
 import joblib
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.metrics import classification_report
-from data_loader import load_titanic_data
-from feature_engineering import run_feature_engineering
-from preprocessor import clean_data
+from data_loader import load_titanic_data, PIPELINE_COLUMNS, GROUP_COLUMNS
+from preprocessor import TitanicPreprocessor
+from artifact_store import save_artifact
+from model_registry import publish
+from drift_monitor import with_predictions
+from instrumentation import instrumented, span, start_from_args, finish_from_args
 
 
-def train_titanic_model(data_path):
-    # 1. Pipeline: Load -> Engineer -> Clean
-    raw_df = load_titanic_data(data_path)
-    engineered_df = run_feature_engineering(raw_df)
-    df_cleaned = clean_data(engineered_df)
+def build_model(n_jobs=None, oob_score=False, **params):
+    """The project's Random Forest; `params` override the default hyperparameters."""
+    settings = dict(n_estimators=100, max_depth=5, random_state=42)
+    settings.update(params)
+    return RandomForestClassifier(n_jobs=n_jobs, oob_score=oob_score, **settings)
+
+
+def get_feature_importance(model, feature_names, top=10):
+    """
+    Global impurity-based importances, highest first, printed as a text bar chart.
+    (Per-passenger explanations: `attributions.py`.)
+    """
+    importances = pd.Series(model.feature_importances_, index=list(feature_names)).sort_values(ascending=False)
+    print("--- Feature Importance ---")
+    for name, value in importances.head(top).items():
+        print(f"{name:12} {'█' * int(round(value * 50)):50} {value:.3f}")
+    return importances
+
+
+def save_model_artifacts(model, preprocessor, columns, output_dir='.'):
+    """Writes the pickles and the memory-mappable bundle to `output_dir`."""
+    os.makedirs(output_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(output_dir, 'titanic_model.pkl'))
+    joblib.dump(list(columns), os.path.join(output_dir, 'model_columns.pkl'))
+    preprocessor.save(os.path.join(output_dir, 'preprocessor_state.pkl'))
+    # Memory-mappable bundle used by the scoring entry points
+    save_artifact(os.path.join(output_dir, 'model_artifact'), model, preprocessor)
+
+
+@instrumented()
+def train_titanic_model(data_path, n_jobs=None, cv_mode='kfold', cv_folds=5, output_dir='.', params=None,
+                        registry=None, group_features=False):
+    """
+    Trains, validates and saves the model.
+    - `n_jobs`: cores for the CV folds (run in parallel) and for the final fit (-1 = all cores).
+    - `cv_mode`: 'kfold' (k refits, the default) or 'oob' (out-of-bag accuracy from the single final
+      fit: a cheaper stability estimate that costs no extra training).
+    - `registry`: also publish the model as the new current version of this `model_registry/`.
+    - `group_features`: also learn ticket / surname / deck group tables (reads Ticket and Cabin too).
+    """
+    timings = {}
+    start = time.perf_counter()
+
+    # 1. Pipeline: Load -> Fit preprocessing statistics -> Engineer + Clean
+    # train.csv is read on every run: keep its typed frame in the loader cache
+    raw_df = load_titanic_data(data_path, columns=PIPELINE_COLUMNS + GROUP_COLUMNS if group_features else None,
+                               cache=True)
+    if raw_df is None:
+        raise FileNotFoundError(f"No training data at {data_path}")
+    timings['load'] = time.perf_counter() - start
+
+    phase = time.perf_counter()
+    preprocessor = TitanicPreprocessor(group_features=group_features)
+    X = preprocessor.fit_transform(raw_df)
+    y = raw_df['Survived'].to_numpy()
+    timings['preprocess'] = time.perf_counter() - phase
+
+    return train_on_features(X, y, preprocessor, n_jobs, cv_mode, cv_folds, output_dir, params, timings, start,
+                             registry)
+
+
+@instrumented()
+def train_on_features(X, y, preprocessor, n_jobs=None, cv_mode='kfold', cv_folds=5, output_dir='.',
+                      params=None, timings=None, start=None, registry=None):
+    """Validation, final fit and saving for an already preprocessed feature frame `X` (see `main.py`)."""
+    timings = {} if timings is None else timings
+    start = time.perf_counter() if start is None else start
 
     # 2. Split Features and Target
-    X = df_cleaned.drop('Survived', axis=1)
-    y = df_cleaned['Survived']
+    # float32 is what the forest works in anyway (lazy under copy-on-write: no copy when X already is,
+    # e.g. `clean_data_lean`)
+    X = X.astype(np.float32)
+    # int64 labels, so classes_ (and the artifact) do not depend on the loader's compact dtype
+    y = np.asarray(y).astype(np.int64)
 
     # 3. Initialize Model
-    model = RandomForestClassifier(n_estimators=100, max_depth=5, random_state=42)
+    model = build_model(n_jobs=n_jobs, oob_score=(cv_mode == 'oob'), **(params or {}))
 
     # 4. CROSS-VALIDATION (The Stability Test)
-    # We split the data into 5 'folds' and test the model 5 times
-    print("🔄 Running 5-Fold Cross-Validation...")
-    cv_scores = cross_val_score(model, X, y, cv=5)
+    phase = time.perf_counter()
+    cv_scores = None
+    if cv_mode == 'kfold':
+        # We split the data into k 'folds' and test the model k times, folds in parallel;
+        # each fold's forest stays single-threaded so cores are not oversubscribed
+        print(f"🔄 Running {cv_folds}-Fold Cross-Validation...")
+        fold_model = build_model(n_jobs=1, **(params or {}))
+        # One compact matrix shared by every fold (no per-fold conversion; joblib memory-maps it
+        # to the worker processes instead of copying)
+        X_matrix = np.ascontiguousarray(X.to_numpy())
+        with span('cross_validation', rows_in=len(y)):
+            cv_scores = cross_val_score(fold_model, X_matrix, y, cv=cv_folds, n_jobs=n_jobs)
 
-    print(f"Mean CV Accuracy: {cv_scores.mean():.2f}")
-    print(f"Accuracy Deviation: +/- {cv_scores.std():.2f}")
-    print("-" * 30)
+        print(f"Mean CV Accuracy: {cv_scores.mean():.2f}")
+        print(f"Accuracy Deviation: +/- {cv_scores.std():.2f}")
+        print("-" * 30)
+    timings['cross_validation'] = time.perf_counter() - phase
 
     # 5. Final Training on full Train set
+    phase = time.perf_counter()
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-    model.fit(X_train, y_train)
+    with span('model.fit', rows_in=len(y_train)):
+        model.fit(X_train, y_train)
+    if cv_mode == 'oob':
+        print(f"🔄 Out-of-Bag Accuracy: {model.oob_score_:.2f}")
+    if preprocessor.drift_reference is not None:
+        # Baseline positive rate for drift monitoring, on rows the forest did not train on
+        preprocessor.drift_reference = with_predictions(preprocessor.drift_reference, model.predict(X_test))
+    # Predict single-threaded by default (keeps predict_proba summation order deterministic)
+    model.set_params(n_jobs=None)
+    timings['fit'] = time.perf_counter() - phase
 
     # 6. Save Artifacts
-    joblib.dump(model, 'titanic_model.pkl')
-    joblib.dump(X.columns.tolist(), 'model_columns.pkl')
+    phase = time.perf_counter()
+    with span('save_model_artifacts'):
+        save_model_artifacts(model, preprocessor, X.columns, output_dir)
+        if registry is not None:
+            metadata = {'rows': len(y), 'cv_mode': cv_mode, 'params': model.get_params(),
+                        'group_features': preprocessor.group_tables is not None}
+            if cv_mode == 'oob':
+                metadata['oob_score'] = model.oob_score_
+            publish(registry, lambda path: save_model_artifacts(model, preprocessor, X.columns, path), metadata)
+    timings['save'] = time.perf_counter() - phase
 
+    timings['total'] = time.perf_counter() - start
+    print("⏱️ " + " | ".join(f"{name}: {seconds:.2f}s" for name, seconds in timings.items()))
+    model.timings_ = timings
+    model.cv_scores_ = cv_scores
     return model
 
 
 if __name__ == "__main__":
-    train_titanic_model('train.csv')
\ No newline at end of file
+    from cli import add_train_arguments
+    parser = argparse.ArgumentParser(description="Train the Titanic Random Forest.")
+    args = add_train_arguments(parser).parse_args()
+    start_from_args(args)
+    trained = train_titanic_model(args.data, n_jobs=args.n_jobs, cv_mode=args.cv_mode, cv_folds=args.cv_folds,
+                                  registry=args.registry, group_features=args.group_features)
+    get_feature_importance(trained, trained.feature_names_in_)
+    finish_from_args(args)
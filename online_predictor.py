@@ -0,0 +1,209 @@
+"""
+**Purpose**: Low-latency scoring of a single passenger (Streamlit app, online services).
+- **`PassengerScorer`**: Keeps the model, the column layout and the fitted preprocessing state resident, and
+  fills one small float32 feature vector per request (no DataFrame, no `reindex`, no artifact reloads).
+  Safe to share across threads (e.g. Streamlit sessions): every call gets its own row, the cache is
+  thread-safe and the drift sketch is only updated under a lock.
+- **Features**: Same Title / FamilySize / IsAlone / FareBin / imputation logic as training (`TitanicPreprocessor`).
+- **Model**: Walks the compiled forest's trees (`tree_compiler.py`) directly on the one row, reproducing
+  `RandomForestClassifier.predict_proba` exactly while skipping sklearn's per-call validation and dispatch.
+  By default it loads the memory-mapped `model_artifact/`, which needs neither pandas nor scikit-learn.
+- **Cache**: Optional `PredictionCache` (`cache_size=`) for repeated inputs from the app's small discrete domain.
+- **Explanations**: `explain_one` splits the survival probability into per-feature contributions along the
+  same tree paths (path decomposition, as in `attributions.py`).
+- **Drift**: `drift=True` counts every request into a `DriftSketch` (`drift_report()` scores it vs training).
+"""
+
+import os
+import time
+import threading
+from bisect import bisect_left
+import numpy as np
+from artifact_store import load_artifact
+from model_registry import resolve_artifact
+from tree_compiler import CompiledForest, compile_forest
+from prediction_cache import PredictionCache
+from fast_encoder import fitted_titles
+
+
+def infer_title(sex, age):
+    """
+    The app does not ask for a name, so the Title is inferred from sex and age
+    (boys -> Master, men -> Mr, girls -> Miss, women -> Mrs).
+    """
+    if sex == 'male':
+        return 'Master' if age is not None and age < 13 else 'Mr'
+    return 'Miss' if age is not None and age < 18 else 'Mrs'
+
+
+class PassengerScorer:
+    """Single-record scorer; build once (e.g. with `st.cache_resource`) and call `predict_one` per request."""
+
+    def __init__(self, model, model_columns, preprocessor, cache=None, monitor=None):
+        # Accepts a fitted RandomForestClassifier or an already compiled forest (model_artifact/)
+        forest = model if isinstance(model, CompiledForest) else compile_forest(model)
+        self.forest = forest
+        # Optional PredictionCache built for this model (`load`); a reload through ModelWatcher invalidates it
+        self.cache = cache
+        # Optional DriftSketch (see `live_sketch`) updated by every predict_one
+        self.monitor = monitor
+        self.columns = list(model_columns)
+        # A TitanicPreprocessor or its state dict (e.g. `ModelArtifact.state`, which avoids importing pandas)
+        self.state = preprocessor if isinstance(preprocessor, dict) else preprocessor.get_state()
+        self.col_index = {col: i for i, col in enumerate(self.columns)}
+        # Titles the model knows (anything else would silently score as an unseen title)
+        self.titles = fitted_titles(dict(self.state, columns=self.columns))
+        self.fare_inner_edges = list(self.state['fare_bin_edges'][1:-1])
+        self.classes = np.asarray(forest.classes)
+        self._n_columns = len(self.columns)
+        # Guards the drift sketch (one scorer serves every Streamlit session thread)
+        self._lock = threading.Lock()
+
+        # Per-tree node arrays as Python lists: a 5-level walk is cheaper than a NumPy call
+        self._trees = []
+        for t in range(forest.n_trees):
+            nodes = slice(t * forest.n_nodes, (t + 1) * forest.n_nodes)
+            offset = t * forest.n_nodes
+            left = (forest.left[nodes] - offset).tolist()
+            right = (forest.right[nodes] - offset).tolist()
+            # In the compiled layout a leaf is a node whose right child is itself
+            is_leaf = [r == i for i, r in enumerate(right)]
+            self._trees.append((forest.feature[nodes].tolist(), forest.threshold[nodes].tolist(),
+                                left, right, is_leaf,
+                                forest.value[0, nodes].tolist(), forest.value[1, nodes].tolist()))
+
+    @classmethod
+    def load(cls, model_path='model_artifact', columns_path=None, state_path=None, cache_size=0, drift=False):
+        """`cache_size > 0` attaches an LRU PredictionCache with exact Fare bucketing; `drift` a DriftSketch."""
+        if os.path.isdir(model_path):
+            artifact = load_artifact(resolve_artifact(model_path))
+            forest, model_columns, preprocessor = artifact.forest, artifact.columns, artifact.state
+        else:
+            from predict import load_assets  # joblib pickles: the pandas-based loader
+            forest, model_columns, preprocessor = load_assets(model_path, columns_path, state_path)
+        cache = None
+        if cache_size:
+            if not isinstance(forest, CompiledForest):
+                forest = compile_forest(forest)
+            cache = PredictionCache.for_forest(forest, model_columns, cache_size)
+        monitor = None
+        if drift:
+            from drift_monitor import live_sketch
+            state = preprocessor if isinstance(preprocessor, dict) else preprocessor.get_state()
+            monitor = live_sketch(state.get('drift_reference'))
+        return cls(forest, model_columns, preprocessor, cache, monitor)
+
+    def _set(self, x, column, value):
+        i = self.col_index.get(column)
+        if i is not None:
+            x[i] = value
+
+    def encode_one(self, pclass, sex, age, sibsp, parch, fare, embarked, title=None):
+        """Returns a new float32 feature vector for one passenger (never shared between calls)."""
+        state = self.state
+        if title is None:
+            title = infer_title(sex, age)
+        if age is None:
+            age = state['title_age_medians'].get(title, state['age_fill'])
+        if fare is None:
+            fare = state['fare_fill']
+        if embarked is None:
+            embarked = state['embarked_mode']
+        family_size = sibsp + parch + 1
+
+        x = np.zeros(self._n_columns, dtype=np.float32)
+        self._set(x, 'Pclass', pclass)
+        self._set(x, 'Age', age)
+        self._set(x, 'SibSp', sibsp)
+        self._set(x, 'Parch', parch)
+        self._set(x, 'Fare', fare)
+        self._set(x, 'FamilySize', family_size)
+        self._set(x, 'IsAlone', 1 if family_size == 1 else 0)
+        self._set(x, 'FareBin', bisect_left(self.fare_inner_edges, fare))
+        self._set(x, f'Sex_{sex}', 1)
+        self._set(x, f'Embarked_{embarked}', 1)
+        self._set(x, f'Title_{title}', 1)
+        return x
+
+    def predict_proba_row(self, x):
+        """[P(not survived), P(survived)] for one float32 feature vector."""
+        row = x.tolist()
+        acc0 = acc1 = 0.0
+        for feature, threshold, left, right, is_leaf, value0, value1 in self._trees:
+            node = 0
+            while not is_leaf[node]:
+                node = left[node] if row[feature[node]] <= threshold[node] else right[node]
+            acc0 += value0[node]
+            acc1 += value1[node]
+        n_trees = len(self._trees)
+        return acc0 / n_trees, acc1 / n_trees
+
+    def explain_one(self, pclass, sex, age, sibsp, parch, fare, embarked, title=None):
+        """
+        Returns (bias, {column: contribution}) where bias + sum(contributions) is the survival probability:
+        every split on a tree path credits its feature with the change in P(survived) it causes.
+        """
+        row = self.encode_one(pclass, sex, age, sibsp, parch, fare, embarked, title).tolist()
+        totals = [0.0] * len(row)
+        root_sum = 0.0
+        for feature, threshold, left, right, is_leaf, value0, value1 in self._trees:
+            node = 0
+            root_sum += value1[0]
+            while not is_leaf[node]:
+                child = left[node] if row[feature[node]] <= threshold[node] else right[node]
+                totals[feature[node]] += value1[child] - value1[node]
+                node = child
+        n_trees = len(self._trees)
+        return root_sum / n_trees, {col: total / n_trees for col, total in zip(self.columns, totals)}
+
+    def predict_one(self, pclass, sex, age, sibsp, parch, fare, embarked, title=None):
+        """Returns (predicted class, survival probability) for one passenger."""
+        if title is None:
+            title = infer_title(sex, age)
+        x = self.encode_one(pclass, sex, age, sibsp, parch, fare, embarked, title)
+        if self.cache is None:
+            p0, p1 = self.predict_proba_row(x)
+        else:
+            key = self.cache.canonicalize(x[np.newaxis])[0].tobytes()
+            cached = self.cache.get(key)
+            if cached is None:
+                # A concurrent miss on the same key just computes it twice
+                cached = self.predict_proba_row(x)
+                self.cache.put(key, cached)
+            p0, p1 = cached
+        label = int(self.classes[1] if p1 > p0 else self.classes[0])
+        if self.monitor is not None:
+            with self._lock:
+                self.monitor.update_one(pclass, sex, age, fare, embarked, title, label)
+        return label, p1
+
+    def drift_report(self):
+        """Drift scores of the requests seen so far (None without a monitor or a training reference)."""
+        if self.monitor is None:
+            return None
+        from drift_monitor import DriftSketch, drift_scores
+        with self._lock:
+            return drift_scores(DriftSketch(self.state['drift_reference']), self.monitor)
+
+
+_default_scorer = None
+
+
+def predict_one(pclass, sex, age, sibsp, parch, fare, embarked, title=None):
+    """Module-level convenience API backed by a lazily loaded, resident `PassengerScorer`."""
+    global _default_scorer
+    if _default_scorer is None:
+        _default_scorer = PassengerScorer.load()
+    return _default_scorer.predict_one(pclass, sex, age, sibsp, parch, fare, embarked, title)
+
+
+if __name__ == "__main__":
+    # Latency check against the old DataFrame + model.predict path
+    scorer = PassengerScorer.load()
+    latencies = []
+    for i in range(2000):
+        start = time.perf_counter()
+        scorer.predict_one(1 + i % 3, 'male' if i % 2 else 'female', i % 80, i % 3, i % 2, float(i % 300), 'S')
+        latencies.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"predict_one latency: p50 {p50:.3f} ms | p99 {p99:.3f} ms")
@@ -0,0 +1,225 @@
+"""
+**Purpose**: Incremental execution of the pipeline's stage DAG (used by `main.py`).
+- **`Stage`**: A named step with upstream stages (`deps`), input files, the source files that implement it
+  (`code`) and its parameters. It writes its outputs into its own cache directory.
+- **Cache key**: SHA-256 over the input file hashes, the stage's source file hashes, its parameters and the keys
+  of its upstream stages. `source_closure(run)` derives the source files from the code itself: the file
+  defining `run`, the project modules it calls into and everything those import (lazy imports included), so
+  the list never has to be kept by hand. Outputs live in `.pipeline_cache/<stage>/<key>/`; a stage whose key already has a
+  finished directory is not re-executed.
+- **Overrides**: `force=True` re-runs everything; `from_stage=name` re-runs that stage and everything downstream.
+- **Exports**: Selected outputs (model files, `submission.csv`) are copied into the working directory after a
+  run or a cache hit, so the rest of the project sees the usual files.
+"""
+
+import os
+import ast
+import sys
+import json
+import time
+import types
+import shutil
+import hashlib
+from contextlib import contextmanager
+from instrumentation import span
+
+META_NAME = 'stage.json'
+
+
+def file_sha256(path, _memo={}):
+    """Content hash of a file (memoised per path, size and mtime within the process)."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _memo:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        _memo[memo_key] = digest.hexdigest()
+    return _memo[memo_key]
+
+
+def _is_main_guard(node):
+    return (isinstance(node, ast.If) and isinstance(node.test, ast.Compare)
+            and isinstance(node.test.left, ast.Name) and node.test.left.id == '__name__')
+
+
+def _imported_modules(path):
+    """
+    Top-level names of every module `path` imports, wherever the import statement is (lazy ones too),
+    except under `if __name__ == "__main__":` (script-only code never runs inside a stage).
+    """
+    with open(path, encoding='utf-8') as f:
+        nodes = list(ast.parse(f.read(), filename=path).body)
+    names = set()
+    while nodes:
+        node = nodes.pop()
+        if _is_main_guard(node):
+            continue
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+        nodes.extend(ast.iter_child_nodes(node))
+    return names
+
+
+def _called_modules(code, namespace):
+    """Modules of the globals a function's code (and its nested functions) refers to."""
+    modules = set()
+    for name in code.co_names:
+        value = namespace.get(name)
+        if isinstance(value, types.ModuleType):
+            modules.add(value.__name__)
+        elif getattr(value, '__module__', None):
+            modules.add(value.__module__)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            modules |= _called_modules(const, namespace)
+    return modules
+
+
+def source_closure(run):
+    """
+    Project source files `run` depends on: its own file, the project modules of the globals it uses and,
+    transitively, every project module those import. Only that file's stage body counts, not all of its
+    imports, so e.g. an audit stage defined in `main.py` does not depend on the trainer.
+    """
+    own_file = os.path.abspath(run.__code__.co_filename)
+    root = os.path.dirname(own_file)
+    pending = []
+    for module in _called_modules(run.__code__, run.__globals__):
+        path = getattr(sys.modules.get(module), '__file__', None)
+        if path and os.path.dirname(os.path.abspath(path)) == root:
+            pending.append(os.path.abspath(path))
+    files = {own_file}
+    while pending:
+        path = pending.pop()
+        if path in files:
+            continue
+        files.add(path)
+        for name in _imported_modules(path):
+            candidate = os.path.join(root, f'{name}.py')
+            if os.path.exists(candidate):
+                pending.append(candidate)
+    return sorted(os.path.relpath(path) for path in files)
+
+
+class Stage:
+    def __init__(self, name, run, deps=(), inputs=(), code=(), params=None, exports=(), on_hit=None):
+        """
+        `run(out_dir, upstream)` does the work; `upstream` maps each dependency name to its output directory.
+        `exports` are names inside `out_dir` copied to the working directory; `on_hit(out_dir)` replays
+        anything the stage normally reports (e.g. a printed audit) when it is served from the cache.
+        """
+        self.name = name
+        self.run = run
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.code = list(code)
+        self.params = params or {}
+        self.exports = list(exports)
+        self.on_hit = on_hit
+
+    def cache_key(self, upstream_keys):
+        payload = {
+            'stage': self.name,
+            'inputs': {path: file_sha256(path) for path in self.inputs},
+            'code': {path: file_sha256(path) for path in self.code},
+            'params': self.params,
+            'deps': {dep: upstream_keys[dep] for dep in self.deps},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def export_outputs(out_dir, names, workspace='.'):
+    """Copies cached outputs into the working directory (directories are swapped in whole)."""
+    for name in names:
+        source, target = os.path.join(out_dir, name), os.path.join(workspace, name)
+        if os.path.isdir(source):
+            staging = f'{target}.tmp-{os.getpid()}'
+            shutil.rmtree(staging, ignore_errors=True)
+            shutil.copytree(source, staging)
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(staging, target)
+        else:
+            shutil.copy2(source, target)
+
+
+def run_stages(stages, cache_dir='.pipeline_cache', force=False, from_stage=None, workspace='.'):
+    """Runs `stages` (listed in dependency order) with caching; returns one summary record per stage."""
+    names = [stage.name for stage in stages]
+    if from_stage is not None and from_stage not in names:
+        raise ValueError(f"Unknown stage '{from_stage}'. Choose from: {', '.join(names)}")
+
+    keys, dirs, forced, records = {}, {}, set(), []
+    for stage in stages:
+        if force or stage.name == from_stage or any(dep in forced for dep in stage.deps):
+            forced.add(stage.name)
+        key = stage.cache_key(keys)
+        out_dir = os.path.join(cache_dir, stage.name, key)
+        meta_path = os.path.join(out_dir, META_NAME)
+        keys[stage.name], dirs[stage.name] = key, out_dir
+
+        if stage.name not in forced and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            print(f"♻️ Stage '{stage.name}': cache hit ({key})")
+            if stage.on_hit is not None:
+                stage.on_hit(out_dir)
+            status, seconds, saved = 'cached', 0.0, meta['seconds']
+        else:
+            print(f"▶️ Stage '{stage.name}': running ({key})")
+            # Build in a scratch directory and rename it into place, so an interrupted
+            # stage never leaves a directory that looks finished
+            scratch = f'{out_dir}.tmp-{os.getpid()}'
+            shutil.rmtree(scratch, ignore_errors=True)
+            os.makedirs(scratch)
+            start = time.perf_counter()
+            with span(f'stage.{stage.name}'):
+                stage.run(scratch, {dep: dirs[dep] for dep in stage.deps})
+            seconds = time.perf_counter() - start
+            with open(os.path.join(scratch, META_NAME), 'w') as f:
+                json.dump({'stage': stage.name, 'key': key, 'seconds': seconds, 'created': time.time()}, f)
+            shutil.rmtree(out_dir, ignore_errors=True)
+            os.replace(scratch, out_dir)
+            status, saved = 'ran', 0.0
+
+        export_outputs(out_dir, stage.exports, workspace)
+        records.append({'stage': stage.name, 'status': status, 'key': key, 'seconds': seconds, 'saved': saved})
+    return records
+
+
+def print_summary(records):
+    print("\n--- Pipeline Summary ---")
+    for record in records:
+        print(f"{record['stage']:20} | {record['status']:6} | {record['seconds']:6.2f}s | "
+              f"saved {record['saved']:6.2f}s")
+    hits = sum(record['status'] == 'cached' for record in records)
+    total_saved = sum(record['saved'] for record in records)
+    print(f"Cache hits: {hits}/{len(records)} | Time saved: {total_saved:.2f}s")
+
+
+class _Tee:
+    def __init__(self, *streams):
+        self.streams = streams
+
+    def write(self, text):
+        for stream in self.streams:
+            stream.write(text)
+
+    def flush(self):
+        for stream in self.streams:
+            stream.flush()
+
+
+@contextmanager
+def tee_stdout(path):
+    """Prints as usual while also recording the output to `path` (replayed on cache hits)."""
+    original = sys.stdout
+    with open(path, 'w') as f:
+        sys.stdout = _Tee(original, f)
+        try:
+            yield
+        finally:
+            sys.stdout = original
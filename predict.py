@@ -1,48 +1,286 @@
 """
 **Purpose**: Production-ready inference.
 - **Feature Alignment**: Uses `reindex` to ensure that the `test.csv` has the exact same column structure as the training set (even if some Titles are missing in the test set).
+- **Fitted Statistics**: Age/Embarked/Fare fills and FareBin edges come from `preprocessor_state.pkl` (learned at training time), never from the test batch.
+- **Streaming**: `stream_predictions` scores a CSV path, a DataFrame or any iterator of DataFrames chunk by chunk and appends to the output, so peak memory depends on `chunksize`, not on the file size.
+- **Parallelism**: `workers > 1` scores shards in a process pool. Each worker loads the model once (pool initializer); results are written back in input (`PassengerId`) order.
+- **Deduplication**: `--dedupe` scores each distinct feature row once per chunk (`prediction_cache.py`).
+- **Artifacts**: `--model` accepts either `titanic_model.pkl` or the memory-mappable `model_artifact/` directory (see `artifact_store.py`).
+- **Group features**: Models trained with `--group-features` also get the Ticket/Cabin columns of the input
+  (`input_columns`); other models keep reading only the pipeline columns.
 - **Output**: Generates `submission.csv` in the standard Kaggle format.
+- **Drift**: `--drift-report PATH` counts the scored inputs and predictions into a `DriftSketch` (one per worker,
+  merged at the end) and writes PSI/KS scores against the training-time reference (`drift_monitor.py`).
+- **Explanations**: `--explain PATH` also writes every row's survival probability split into per-feature
+  contributions (path decomposition over the forest, `attributions.py`); `submission.csv` is unchanged.
+- **Instrumentation**: `--instrument` writes a run report of the read / transform / `model.predict` / write steps (`instrumentation.py`).
 
 """
+import os
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 import joblib
-from preprocessor import clean_data
+from preprocessor import TitanicPreprocessor
+from fast_encoder import FeatureEncoder
+from data_loader import load_titanic_data, iter_titanic_chunks, PIPELINE_COLUMNS, GROUP_COLUMNS
+from artifact_store import load_artifact
+from model_registry import resolve_artifact
+from prediction_cache import cached_predict_proba, model_classes
+from attributions import explain_frame
+from drift_monitor import DriftSketch, live_sketch, drift_scores, print_drift_report, write_drift_report
+from instrumentation import instrumented, span, start_from_args, finish_from_args
 
+SUBMISSION_COLUMNS = ['PassengerId', 'Survived']
 
-def generate_predictions(test_data_path, model_path, columns_path):
-    # 1. Load the unseen data and the saved model assets
-    test_df = pd.read_csv(test_data_path)
-    passenger_ids = test_df['PassengerId']  # Save for the final CSV
+try:
+    import resource  # POSIX only; used for the peak RSS report
+except ImportError:
+    resource = None
 
+
+@instrumented()
+def load_assets(model_path, columns_path=None, state_path=None):
+    """
+    Loads the model, the feature order and the fitted preprocessing state.
+    `model_path` may be a joblib pickle, a `model_artifact/` directory or a `model_registry/` (its current
+    version); directories memory-map a compiled forest that carries its own columns and state.
+    """
+    if os.path.isdir(model_path):
+        artifact = load_artifact(resolve_artifact(model_path))
+        return artifact.forest, artifact.columns, artifact.preprocessor
+
+    columns_path, state_path = _asset_paths(model_path, columns_path, state_path)
     model = joblib.load(model_path)
     model_columns = joblib.load(columns_path)
+    preprocessor = TitanicPreprocessor.load(state_path)
+    return model, model_columns, preprocessor
+
+
+def _asset_paths(model_path, columns_path=None, state_path=None):
+    if columns_path is None:
+        columns_path = os.path.join(os.path.dirname(model_path), 'model_columns.pkl')
+    # The fitted statistics live next to model_columns.pkl
+    if state_path is None:
+        state_path = os.path.join(os.path.dirname(columns_path), 'preprocessor_state.pkl')
+    return columns_path, state_path
 
-    # 2. Preprocess the test data
-    # Note: We must ensure the test columns match the training columns exactly
-    X_test = clean_data(test_df)
 
-    # Handle the specific case of a missing Fare in the test set
-    if 'Fare' in X_test.columns:
-        X_test['Fare'] = X_test['Fare'].fillna(X_test['Fare'].median())
+def load_preprocessor(model_path, columns_path=None, state_path=None):
+    """Only the fitted preprocessing state of `load_assets` (a pickled model is not loaded at all)."""
+    if os.path.isdir(model_path):
+        # The forest is memory-mapped: no pages are read unless something scores with it
+        return load_artifact(resolve_artifact(model_path)).preprocessor
+    return TitanicPreprocessor.load(_asset_paths(model_path, columns_path, state_path)[1])
 
-    # 3. Align Columns
-    # This ensures that if a 'Title' exists in train but not test,
-    # the model still gets the correct input shape.
-    X_test = X_test.reindex(columns=model_columns, fill_value=0)
 
-    # 4. Predict
-    predictions = model.predict(X_test)
+def input_columns(preprocessor):
+    """Raw columns to read for this model (None = the loader's default pipeline columns)."""
+    return PIPELINE_COLUMNS + GROUP_COLUMNS if preprocessor.group_tables is not None else None
 
-    # 5. Create Submission DataFrame
+
+@instrumented()
+def score_frame(df, model, model_columns, preprocessor, dedupe=False, monitor=None, explain=False, encoder=None):
+    """
+    Returns the submission rows (PassengerId, Survived) for one batch of passengers.
+    `dedupe=True` collapses identical feature rows so the model only scores unique ones.
+    `monitor`: a `DriftSketch` that also counts this batch's inputs and predictions.
+    `encoder`: the `FeatureEncoder` that gives the monitor its titles; streams build it once and pass it in.
+    `explain=True` appends Probability, Bias and one contribution column per feature.
+    """
+    X = preprocessor.transform(df).reindex(columns=model_columns, fill_value=0)
+    with span('model.predict', rows_in=len(X)):
+        if dedupe:
+            predictions = model_classes(model).take(np.argmax(cached_predict_proba(model, X), axis=1))
+        else:
+            predictions = model.predict(X)
+    if monitor is not None:
+        with span('drift_monitor', rows_in=len(df)):
+            # Titles via the single-regex encoder (code -1, no known title, is counted as `Other`)
+            if encoder is None:
+                encoder = FeatureEncoder.from_preprocessor(preprocessor)
+            titles = np.asarray(encoder.titles + ['Other'], dtype=object)[encoder.title_codes(df['Name'].to_numpy())]
+            monitor.update(df, titles, predictions)
     submission = pd.DataFrame({
-        "PassengerId": passenger_ids,
+        "PassengerId": df['PassengerId'].to_numpy(),
         "Survived": predictions
     })
+    if explain:
+        with span('explain', rows_in=len(X)):
+            explanation = explain_frame(model, X).reset_index(drop=True)
+        submission = pd.concat([submission, explanation], axis=1)
+    return submission
+
+
+def write_chunk(submission, output_path, explain_path=None, first=True):
+    """Writes (or appends) the Kaggle columns to `output_path` and the full rows to `explain_path`."""
+    mode = 'w' if first else 'a'
+    submission[SUBMISSION_COLUMNS].to_csv(output_path, mode=mode, header=first, index=False)
+    if explain_path:
+        submission.to_csv(explain_path, mode=mode, header=first, index=False)
+
+
+def iter_chunks(source, chunksize, columns=None):
+    """Yields DataFrames from a CSV path (reading `columns`), a DataFrame or an iterable of DataFrames."""
+    if isinstance(source, (str, os.PathLike)):
+        yield from iter_titanic_chunks(source, chunksize, columns)
+    elif isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    else:
+        yield from source
+
+
+# Per-process assets, populated once by the pool initializer
+_worker_assets = None
+
+
+def _init_worker(model_path, columns_path, state_path, dedupe, drift, explain):
+    global _worker_assets
+    model, model_columns, preprocessor = load_assets(model_path, columns_path, state_path)
+    encoder = FeatureEncoder.from_preprocessor(preprocessor) if drift else None
+    _worker_assets = (model, model_columns, preprocessor, dedupe, drift, explain, encoder)
+
+
+def _score_shard(df):
+    model, model_columns, preprocessor, dedupe, drift, explain, encoder = _worker_assets
+    # A fresh sketch per shard: its counts travel back with the shard and are merged by the parent
+    monitor = live_sketch(preprocessor.drift_reference) if drift else None
+    submission = score_frame(df, model, model_columns, preprocessor, dedupe, monitor, explain, encoder)
+    return submission, (monitor.get_state() if monitor is not None else None)
+
+
+def parallel_score(chunks, model_path, columns_path, state_path=None, workers=2, dedupe=False, drift=False,
+                   explain=False):
+    """
+    Yields (submission frame, drift sketch state or None) in input order while scoring shards in
+    `workers` processes. At most 2 shards per worker are in flight, so memory stays bounded for huge inputs.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, columns_path, state_path, dedupe, drift, explain)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_score_shard, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def peak_rss_mb():
+    """Peak resident set size over the whole process lifetime in MB, not just this run (None where unsupported)."""
+    if resource is None:
+        return None
+    # ru_maxrss is reported in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def report_drift(monitor, reference_state, path):
+    """Scores the accumulated sketch against the training reference, prints and writes the report."""
+    if monitor is None:
+        print("ℹ️ This model has no drift reference (retrain it to enable drift monitoring).")
+        return None
+    scores = drift_scores(DriftSketch(reference_state), monitor)
+    print_drift_report(scores)
+    write_drift_report(path, scores)
+    return scores
+
+
+@instrumented(rows=lambda n_rows: n_rows)
+def stream_predictions(source, model_path, columns_path, output_path='submission.csv',
+                       chunksize=100_000, state_path=None, workers=1, dedupe=False, drift_report=None,
+                       explain_path=None):
+    """
+    Bounded-memory scoring: transform, predict and append one chunk at a time.
+    With `workers > 1` the chunks are the shards of a process pool.
+    Returns the number of rows written.
+    """
+    start = time.perf_counter()
+    # With workers the parent only needs the fitted state: which columns to read and the drift reference
+    if workers > 1:
+        model = model_columns = None
+        preprocessor = load_preprocessor(model_path, columns_path, state_path)
+    else:
+        model, model_columns, preprocessor = load_assets(model_path, columns_path, state_path)
+    # Empty chunks (e.g. a header-only CSV) are skipped: the model rejects zero-row input
+    chunks = (chunk for chunk in iter_chunks(source, chunksize, input_columns(preprocessor)) if len(chunk))
+    monitor = live_sketch(preprocessor.drift_reference) if drift_report else None
+    if workers > 1:
+        results = parallel_score(chunks, model_path, columns_path, state_path, workers, dedupe,
+                                 drift=monitor is not None, explain=bool(explain_path))
+    else:
+        encoder = FeatureEncoder.from_preprocessor(preprocessor) if monitor is not None else None
+        results = ((score_frame(chunk, model, model_columns, preprocessor, dedupe, monitor, bool(explain_path),
+                                encoder), None) for chunk in chunks)
+
+    n_rows, n_chunks = 0, 0
+    for submission, sketch in results:
+        # First chunk (re)creates the file with a header, later chunks append
+        write_chunk(submission, output_path, explain_path, first=(n_chunks == 0))
+        n_rows += len(submission)
+        n_chunks += 1
+        if sketch is not None:
+            monitor.merge(DriftSketch(sketch))
+    if n_chunks == 0:
+        # No input rows at all: still a valid (header-only) submission
+        write_chunk(pd.DataFrame(columns=SUBMISSION_COLUMNS), output_path, explain_path)
+
+    elapsed = time.perf_counter() - start
+    rate = n_rows / elapsed if elapsed > 0 else float('inf')
+    rss = peak_rss_mb()
+    rss_msg = f" | Peak RSS (process lifetime): {rss:.0f} MB" if rss is not None else ""
+    print(f"Scored {n_rows:,} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec){rss_msg}")
+    print(f"Success! '{output_path}' has been created.")
+    if drift_report:
+        report_drift(monitor, preprocessor.drift_reference, drift_report)
+    return n_rows
+
+
+@instrumented(rows=lambda n_rows: n_rows)
+def generate_predictions(test_data_path, model_path, columns_path, state_path=None,
+                         chunksize=None, workers=1, dedupe=False, output_path='submission.csv', drift_report=None,
+                         explain_path=None):
+    # Large inputs / multi-core: score in chunks instead of materialising the whole file
+    if chunksize is not None or workers > 1:
+        return stream_predictions(test_data_path, model_path, columns_path, output_path=output_path,
+                                  chunksize=chunksize or 100_000, state_path=state_path,
+                                  workers=workers, dedupe=dedupe, drift_report=drift_report,
+                                  explain_path=explain_path)
+
+    # 1. Load the saved model assets and the unseen data
+    model, model_columns, preprocessor = load_assets(model_path, columns_path, state_path)
+    test_df = load_titanic_data(test_data_path, columns=input_columns(preprocessor))
+    if test_df is None:
+        raise FileNotFoundError(f"No passenger data to score at {test_data_path}")
+
+    # 2. Preprocess with the training-time statistics, align columns and predict
+    # (missing Fare/Age/Embarked are filled from train.csv, not from this batch;
+    # reindex keeps the model's input shape even if a Title is absent from test)
+    monitor = live_sketch(preprocessor.drift_reference) if drift_report else None
+    submission = score_frame(test_df, model, model_columns, preprocessor, dedupe, monitor, bool(explain_path))
+
+    with span('write_csv', rows_in=len(submission)):
+        write_chunk(submission, output_path, explain_path)
+    print(f"Success! '{output_path}' has been created.")
+    if drift_report:
+        report_drift(monitor, preprocessor.drift_reference, drift_report)
+    return len(submission)
+
 
-    submission.to_csv('submission.csv', index=False)
-    print("Success! 'submission.csv' has been created.")
+def parse_args(argv=None):
+    from cli import add_predict_arguments
+    parser = argparse.ArgumentParser(description="Score passengers with the trained Titanic model.")
+    return add_predict_arguments(parser).parse_args(argv)
 
 
 if __name__ == "__main__":
     # Ensure you have run model_trainer.py first to generate the .pkl files
-    generate_predictions('test.csv', 'titanic_model.pkl', 'model_columns.pkl')
\ No newline at end of file
+    args = parse_args()
+    start_from_args(args)
+    generate_predictions(args.input, args.model, args.columns, chunksize=args.chunksize, workers=args.workers,
+                         dedupe=args.dedupe, output_path=args.output, drift_report=args.drift_report,
+                         explain_path=args.explain)
+    finish_from_args(args)
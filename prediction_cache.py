@@ -0,0 +1,128 @@
+"""
+**Purpose**: Prediction cache over the (mostly discrete) passenger feature space.
+- **`PredictionCache`**: LRU-bounded map from a canonical feature vector to `[P(not survived), P(survived)]`,
+  with hit/miss/eviction counters and explicit `invalidate()`. Every loaded model gets its own
+  cache; `ModelWatcher` invalidates the retired model's cache when it swaps in a new version. Thread-safe:
+  in-flight batches may still use a cache while the watcher thread clears it (they just miss).
+- **Canonical key**: The encoded float32 model row. With `fare_edges` the Fare value is replaced by its bucket;
+  `fare_split_points(forest, columns)` gives the forest's own Fare thresholds, which makes bucketing exact
+  (every Fare inside a bucket takes the same path through every tree).
+- **`cached_predict_proba(forest, X, cache)`**: Batch helper used by `predict.py` (`--dedupe`), the app and the
+  inference server. Identical rows are collapsed first, so the model only ever sees unique uncached rows.
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+def fare_split_points(forest, columns):
+    """Sorted unique thresholds the compiled forest uses on the Fare column."""
+    fare_index = list(columns).index('Fare')
+    internal = np.asarray(forest.threshold) != -np.inf
+    return np.unique(np.asarray(forest.threshold)[internal & (np.asarray(forest.feature) == fare_index)])
+
+
+class PredictionCache:
+    def __init__(self, max_entries=100_000, fare_edges=None, fare_column=None):
+        self.max_entries = max_entries
+        self.fare_edges = None if fare_edges is None else np.asarray(fare_edges, dtype=np.float64)
+        self.fare_column = fare_column
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def for_forest(cls, forest, columns, max_entries=100_000):
+        """Cache with exact Fare bucketing on the forest's own Fare split points."""
+        columns = list(columns)
+        return cls(max_entries, fare_split_points(forest, columns), columns.index('Fare'))
+
+    def canonicalize(self, X):
+        """Float32 rows used as keys (Fare replaced by its bucket index when bucketing is on)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if self.fare_edges is not None and self.fare_column is not None:
+            X = X.copy()
+            X[:, self.fare_column] = np.searchsorted(self.fare_edges, X[:, self.fare_column].astype(np.float64),
+                                                     side='left')
+        return X
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drops every entry (e.g. after a model reload); counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+def unique_rows(X):
+    """Returns (indices of the first occurrence of each unique row, inverse mapping)."""
+    X = np.ascontiguousarray(X)
+    row_view = X.view(np.dtype((np.void, X.dtype.itemsize * X.shape[1]))).ravel()
+    _, first, inverse = np.unique(row_view, return_index=True, return_inverse=True)
+    return first, inverse.ravel()
+
+
+def model_classes(model):
+    """Class labels of a sklearn forest (`classes_`) or a CompiledForest (`classes`)."""
+    return np.asarray(model.classes_ if hasattr(model, 'classes_') else model.classes)
+
+
+def cached_predict_proba(model, X, cache=None):
+    """
+    predict_proba that scores each distinct row once and (optionally) reuses cached results.
+    `model` is a CompiledForest or sklearn forest; `X` an array or DataFrame in model column order.
+    Row keys come from `cache.canonicalize` when a cache is given, else from the raw float32 rows.
+    """
+    values = np.ascontiguousarray(X, dtype=np.float32)
+    keys = cache.canonicalize(values) if cache is not None else values
+    first, inverse = unique_rows(keys)
+
+    def score(rows):
+        # Keep DataFrames as DataFrames so sklearn still sees the feature names
+        return model.predict_proba(X.iloc[rows] if hasattr(X, 'iloc') else values[rows])
+
+    unique_proba = np.empty((len(first), len(model_classes(model))), dtype=np.float64)
+    if cache is None:
+        unique_proba[:] = score(first)
+    else:
+        key_bytes = [keys[i].tobytes() for i in first]
+        missing = []
+        for j, key in enumerate(key_bytes):
+            value = cache.get(key)
+            if value is None:
+                missing.append(j)
+            else:
+                unique_proba[j] = value
+        if missing:
+            unique_proba[missing] = score(first[missing])
+            for j in missing:
+                cache.put(key_bytes[j], unique_proba[j].copy())
+    return unique_proba[inverse]
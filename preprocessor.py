@@ -7,28 +7,46 @@ TRANSFORMATIONS:
 2. Grouped Imputation: Fills missing 'Age' values based on the median age of the 'Title' group.
 3. Feature Engineering: Creates 'FamilySize' from 'SibSp' and 'Parch'.
 4. Categorical Encoding: Maps 'Sex' and 'Embarked' to numerical values.
+5. Fitted State: `TitanicPreprocessor` learns the statistics above once on the
+   training set and re-applies them at inference ('preprocessor_state.pkl').
+6. Group Features (opt-in, `TitanicPreprocessor(group_features=True)`): ticket / surname / deck group
+   sizes, deck and out-of-fold group survival rates from fitted lookup tables (feature_engineering.py).
+7. Lean Mode: `clean_data_lean` is `run_feature_engineering` + `clean_data` in one pass
+   that writes each output column once into a preallocated float32 matrix;
+   `memory_footprint` reports a step's peak traced memory relative to its input.
 
 QA CONTROLS:
 - Asserts that 'PassengerId' and 'Ticket' are dropped to prevent feature leakage.
 - Validates that final output is a numeric-only matrix.
 """
+import tracemalloc
 import pandas as pd
 import numpy as np
+import joblib
+from feature_engineering import (create_family_features, run_feature_engineering,
+                                 fit_fare_bins, apply_fare_bins, fit_group_tables, apply_group_features)
+from instrumentation import instrumented, span
+from drift_monitor import DriftSketch
+# Title rules shared with the NumPy encoder (fast_encoder.py)
+from titles import TITLE_PATTERN, RARE_TITLES, TITLE_ALIASES
+from group_tables import GROUP_FEATURES, MAX_KEYS, SMOOTHING
 
+# Raw columns the model actually consumes (everything else is dropped)
+RAW_FEATURES = ['Pclass', 'Name', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare', 'Embarked']
 
+
+@instrumented()
 def extract_titles(df):
     """Extracts titles (Mr, Mrs, etc.) from the Name column."""
-    df['Title'] = df['Name'].str.extract(' ([A-Za-z]+)\.', expand=False)
+    df['Title'] = df['Name'].str.extract(TITLE_PATTERN, expand=False)
 
     # Standardize rare titles
-    df['Title'] = df['Title'].replace(['Lady', 'Countess', 'Capt', 'Col', 'Don',
-                                       'Dr', 'Major', 'Rev', 'Sir', 'Jonkheer', 'Dona'], 'Rare')
-    df['Title'] = df['Title'].replace('Mlle', 'Miss')
-    df['Title'] = df['Title'].replace('Ms', 'Miss')
-    df['Title'] = df['Title'].replace('Mme', 'Mrs')
+    df['Title'] = df['Title'].replace(RARE_TITLES, 'Rare')
+    df['Title'] = df['Title'].replace(TITLE_ALIASES)
     return df
 
 
+@instrumented()
 def impute_age(df):
     """Fills missing ages based on the median age of the person's Title."""
     # Group by Title and find the median age for each
@@ -37,6 +55,7 @@ def impute_age(df):
     return df
 
 
+@instrumented()
 def clean_data(df):
     """Main cleaning pipeline."""
     # 1. Feature Engineering: Extract Title
@@ -48,18 +67,224 @@ def clean_data(df):
 
     # 3. Drop Leakage/Irrelevant Columns
     # Names are dropped here so the model doesn't 'memorize' individuals
+    # (the loader may already have pruned Ticket/Cabin)
     cols_to_drop = ['PassengerId', 'Name', 'Ticket', 'Cabin']
-    df = df.drop(columns=cols_to_drop)
+    df = df.drop(columns=cols_to_drop, errors='ignore')
 
     # 4. Convert Categorical to Dummies (One-Hot Encoding)
-    df = pd.get_dummies(df, columns=['Sex', 'Embarked', 'Title'], drop_first=True)
+    with span('get_dummies', rows_in=len(df)):
+        df = pd.get_dummies(df, columns=['Sex', 'Embarked', 'Title'], drop_first=True)
 
     return df
 
 
+def _dummy_levels(values):
+    """The levels `pd.get_dummies` emits for `values`: declared categories, else the sorted values."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return list(values.cat.categories)
+    return sorted(values.dropna().unique())
+
+
+def _write_dummies(out, first_col, codes, uniques, levels):
+    """One-hot columns for `levels` (drop_first already applied) written in place; missing -> all zeros."""
+    uniques = list(uniques)
+    for i, level in enumerate(levels):
+        if level in uniques:
+            np.equal(codes, uniques.index(level), out=out[:, first_col + i])
+        else:
+            out[:, first_col + i] = 0
+
+
+@instrumented()
+def clean_data_lean(df, consume=True):
+    """
+    Memory-lean `clean_data(run_feature_engineering(df))`: same columns, same values (as float32),
+    but each output column is written once into a preallocated matrix instead of going through
+    the intermediate frames of `fillna`/`replace`/`drop`/`get_dummies`.
+
+    With `consume=True` the input's columns are popped as they are used, so Name/Ticket/Cabin are
+    released as soon as they are consumed (`df` is left empty). `consume=False` leaves `df` untouched.
+    """
+    df = df if consume else df.copy(deep=False)
+    n_rows = len(df)
+    for col in ('PassengerId', 'Ticket', 'Cabin'):
+        if col in df.columns:
+            del df[col]
+
+    # Titles as small integer codes; only the few distinct titles are ever strings
+    raw_codes, raw_titles = pd.factorize(df.pop('Name').str.extract(TITLE_PATTERN, expand=False))
+    canonical = ['Rare' if t in RARE_TITLES else TITLE_ALIASES.get(t, t) for t in raw_titles]
+    title_levels = sorted(set(canonical))
+    lookup = np.array([title_levels.index(t) for t in canonical] + [-1], dtype=np.int16)
+    title_codes = lookup[raw_codes]  # factorize marks a missing title as -1, and lookup[-1] == -1
+    del raw_codes
+
+    sex = df.pop('Sex')
+    embarked = df.pop('Embarked')
+    embarked = embarked.fillna(embarked.mode()[0])
+    categoricals = [('Sex', sex, _dummy_levels(sex)[1:]), ('Embarked', embarked, _dummy_levels(embarked)[1:]),
+                    ('Title', None, title_levels[1:])]
+    numeric = list(df.columns)
+    columns = numeric + ['FamilySize', 'IsAlone', 'FareBin']
+    columns += [f'{name}_{level}' for name, _, levels in categoricals for level in levels]
+    position = {col: i for i, col in enumerate(columns)}
+
+    # Column-major, so every column write is contiguous and the result wraps it without a copy
+    out = np.empty((n_rows, len(columns)), dtype=np.float32, order='F')
+    fare = None
+    for col in numeric:
+        values = df.pop(col).to_numpy(dtype=np.float64 if col in ('Age', 'Fare') else None)
+        if col == 'Age':
+            # Title-median imputation on float64, as impute_age does
+            values = values.copy()
+            missing = np.isnan(values)
+            for code in range(len(title_levels)):
+                in_title = title_codes == code
+                known = values[in_title & ~missing]
+                if known.size:
+                    values[in_title & missing] = np.median(known)
+        elif col == 'Fare':
+            fare = values  # Binned below on float64, not on the float32 copy
+        out[:, position[col]] = values
+
+    family = out[:, position['FamilySize']]
+    np.add(out[:, position['SibSp']], out[:, position['Parch']], out=family)
+    family += 1
+    np.equal(family, 1, out=out[:, position['IsAlone']])
+    fare_bin = out[:, position['FareBin']]
+    fare_bin[:] = np.searchsorted(np.asarray(fit_fare_bins(fare)[1:-1]), fare, side='left')
+    fare_bin[np.isnan(fare)] = np.nan
+    del fare
+
+    first_col = len(numeric) + 3
+    for name, values, levels in categoricals:
+        codes, uniques = (title_codes, title_levels) if values is None else pd.factorize(values)
+        _write_dummies(out, first_col, codes, uniques, levels)
+        first_col += len(levels)
+
+    return pd.DataFrame(out, columns=columns, copy=False)
+
+
+def memory_footprint(func, df):
+    """
+    Runs `func(df)` under `tracemalloc`; returns (result, report) where the report holds the input size
+    (deep), the peak traced allocation during the call and their ratio.
+    """
+    input_bytes = int(df.memory_usage(deep=True).sum())
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    try:
+        result = func(df)
+        peak = tracemalloc.get_traced_memory()[1] - start
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+    report = {'input_mb': input_bytes / 2 ** 20, 'peak_mb': peak / 2 ** 20, 'peak_to_input': peak / input_bytes}
+    return result, report
+
+
+class TitanicPreprocessor:
+    """
+    Fit/transform version of `run_feature_engineering` + `clean_data`.
+
+    `fit` learns every data-dependent value once on the training set:
+    Title -> median Age table, Embarked mode, Fare fill value, FareBin edges
+    and the dummy-column vocabulary (the model's feature order), plus the
+    drift-monitoring reference sketch of the raw inputs. With `group_features=True` it also learns
+    the ticket / surname / deck group tables (Ticket, Cabin and Survived must then be in the frame).
+
+    `transform` only looks these values up, so it runs in O(rows) on a batch of
+    any size (down to one passenger) and a row's features never depend on the
+    other rows in its batch.
+    """
+
+    def __init__(self, state=None, group_features=False):
+        self.group_features = group_features
+        self.group_tables = None
+        self.group_prior = None
+        self.group_smoothing = SMOOTHING
+        self.title_age_medians = {}
+        self.age_fill = None
+        self.embarked_mode = None
+        self.fare_fill = None
+        self.fare_bin_edges = None
+        self.columns = None
+        self.drift_reference = None
+        if state is not None:
+            self.__dict__.update(state)
+
+    @instrumented('preprocessor.fit')
+    def fit(self, df):
+        work = extract_titles(df[RAW_FEATURES].copy())
+        self.title_age_medians = work.groupby('Title')['Age'].median().dropna().to_dict()
+        self.age_fill = float(work['Age'].median())
+        self.embarked_mode = work['Embarked'].mode()[0]
+        self.fare_fill = float(work['Fare'].median())
+        self.fare_bin_edges = [float(e) for e in fit_fare_bins(work['Fare'])]
+        # Training-time input distributions, the baseline of drift_monitor.py
+        self.drift_reference = DriftSketch.reference(work).get_state()
+
+        # The vocabulary is exactly what the batch pipeline produces on the training set
+        cleaned = clean_data_lean(df, consume=False)
+        self.columns = [col for col in cleaned.columns if col != 'Survived']
+        if self.group_features:
+            self.group_tables = fit_group_tables(df, df['Survived'], MAX_KEYS)
+            self.group_prior = float(df['Survived'].mean())
+            self.columns += GROUP_FEATURES
+        return self
+
+    @instrumented('preprocessor.transform')
+    def transform(self, df):
+        """Returns the model matrix for `df` in `self.columns` order (input is not modified)."""
+        out = extract_titles(df[RAW_FEATURES].copy())
+
+        # Lookups only: no groupby, mode or quantile pass over the batch
+        medians = out['Title'].map(self.title_age_medians).astype(float).fillna(self.age_fill)
+        out['Age'] = out['Age'].fillna(medians)
+        out['Embarked'] = out['Embarked'].fillna(self.embarked_mode)
+        out['Fare'] = out['Fare'].fillna(self.fare_fill)
+
+        out = create_family_features(out)
+        out = apply_fare_bins(out, self.fare_bin_edges)
+        out = out.drop(columns=['Name'])
+        if self.group_tables is not None:
+            out = out.join(apply_group_features(df, self.group_tables, self.group_prior, self.group_smoothing))
+
+        # Unseen categories simply get no column; reindex restores the training layout
+        with span('get_dummies', rows_in=len(out)):
+            out = pd.get_dummies(out, columns=['Sex', 'Embarked', 'Title'])
+        return out.reindex(columns=self.columns, fill_value=0)
+
+    def fit_transform(self, df):
+        X = self.fit(df).transform(df)
+        if self.group_tables is not None:
+            # Training rows: out-of-fold rates, so no passenger's own label feeds their features
+            X[GROUP_FEATURES] = apply_group_features(df, self.group_tables, self.group_prior, self.group_smoothing,
+                                                     survived=df['Survived'])
+        return X
+
+    def get_state(self):
+        return dict(self.__dict__)
+
+    def save(self, path):
+        # Stored as a plain dict so the artifact does not depend on this class' pickle path
+        joblib.dump(self.get_state(), path)
+
+    @classmethod
+    def load(cls, path):
+        return cls(joblib.load(path))
+
+
 if __name__ == "__main__":
-    # Example usage for testing
+    # Example usage for testing: both modes, with their peak memory relative to the input
     raw_data = pd.read_csv('train.csv')
-    cleaned_data = clean_data(raw_data)
+    cleaned_data, standard = memory_footprint(lambda df: clean_data(run_feature_engineering(df.copy())), raw_data)
+    _, lean = memory_footprint(lambda df: clean_data_lean(df, consume=False), raw_data)
     print(f"Cleaned Data Shape: {cleaned_data.shape}")
-    print(cleaned_data.head())
\ No newline at end of file
+    for mode, report in (('standard', standard), ('lean', lean)):
+        print(f"📦 {mode:8} | input {report['input_mb']:.2f} MB | peak {report['peak_mb']:.2f} MB "
+              f"({report['peak_to_input']:.2f}x input)")
+    print(cleaned_data.head())
@@ -0,0 +1,223 @@
+"""
+**Purpose**: Vectorized fairness audit over slice combinations of scored passengers.
+- **One grouped pass**: Every row is mapped to one cell of the full `Sex x Pclass x AgeBin x Embarked x IsAlone`
+  grid and counted into `[TN, FP, FN, TP]` with a single `np.bincount`. Any coarser slice (e.g. `Sex` or
+  `Sex x Pclass`) is a sum over that small count tensor, so the row data is read once whatever the number of slices.
+- **Metrics**: Accuracy, recall, precision and false-positive rate from the counts (`NaN` when undefined).
+- **Bootstrap CIs**: Resampling rows with replacement is a multinomial draw over the cell counts, so each
+  replicate is one vectorized `rng.multinomial` call; replicates are split across worker processes.
+- **Inputs**: Precomputed predictions (a `Predictions` column, e.g. scored logs) or a model to score with.
+  `count_cells` also accepts an iterable of chunks, so million-row CSVs are audited in constant memory.
+- **Output**: A tidy table (one row per slice) written to CSV or JSON.
+
+USAGE: python slice_audit.py --data scored.csv --pred-column Predictions --output audit.csv --bootstrap 1000
+"""
+
+import os
+import warnings
+import argparse
+from itertools import combinations
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+AGE_EDGES = [0, 12, 18, 30, 45, 60, np.inf]
+AGE_LABELS = ['0-12', '12-18', '18-30', '30-45', '45-60', '60+']
+# Fixed levels keep cell codes identical across chunks; anything else falls into a trailing 'Unknown' level
+SLICE_LEVELS = {
+    'Sex': ['female', 'male'],
+    'Pclass': [1, 2, 3],
+    'AgeBin': AGE_LABELS,
+    'Embarked': ['C', 'Q', 'S'],
+    'IsAlone': [0, 1],
+}
+DIMENSIONS = list(SLICE_LEVELS)
+METRICS = ['accuracy', 'recall', 'precision', 'fpr']
+COUNT_NAMES = ['tn', 'fp', 'fn', 'tp']
+
+
+def slice_values(df):
+    """The audit dimensions of raw passenger rows (`test.csv`/`train.csv` schema)."""
+    age_bin = pd.cut(df['Age'], AGE_EDGES, labels=AGE_LABELS, right=False)
+    return {
+        'Sex': df['Sex'],
+        'Pclass': df['Pclass'],
+        'AgeBin': age_bin.astype(object),
+        'Embarked': df['Embarked'],
+        'IsAlone': ((df['SibSp'] + df['Parch']) == 0).astype(int),
+    }
+
+
+def cell_codes(df):
+    """Flat index of each row in the full slice grid (mixed radix over the dimension levels)."""
+    values = slice_values(df)
+    codes = np.zeros(len(df), dtype=np.int64)
+    for dim in DIMENSIONS:
+        levels = SLICE_LEVELS[dim]
+        index = pd.Index(levels).get_indexer(values[dim])
+        index[index < 0] = len(levels)  # Unknown / missing
+        codes = codes * (len(levels) + 1) + index
+    return codes
+
+
+def grid_shape():
+    return tuple(len(SLICE_LEVELS[dim]) + 1 for dim in DIMENSIONS)
+
+
+def count_cells(frames, y_true='Survived', y_pred='Predictions'):
+    """
+    Confusion counts per grid cell, shape `grid_shape() + (4,)` ordered TN, FP, FN, TP.
+    `frames` is a DataFrame or an iterable of DataFrame chunks (counts are summed).
+    """
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    n_cells = int(np.prod(grid_shape()))
+    counts = np.zeros(n_cells * 4, dtype=np.int64)
+    for df in frames:
+        outcome = 2 * df[y_true].to_numpy(dtype=np.int64) + df[y_pred].to_numpy(dtype=np.int64)
+        counts += np.bincount(cell_codes(df) * 4 + outcome, minlength=n_cells * 4)
+    return counts.reshape(grid_shape() + (4,))
+
+
+def slice_combinations(max_order=2):
+    """Every combination of up to `max_order` dimensions (plus the overall slice `()`)."""
+    combos = [()]
+    for order in range(1, max_order + 1):
+        combos += list(combinations(DIMENSIONS, order))
+    return combos
+
+
+def marginalize(counts, combo):
+    """Sums a `(..., grid..., 4)` count tensor down to the dimensions in `combo`."""
+    lead = counts.ndim - len(DIMENSIONS) - 1
+    drop = tuple(lead + i for i, dim in enumerate(DIMENSIONS) if dim not in combo)
+    return counts.sum(axis=drop)
+
+
+def metrics_from_counts(counts):
+    """Accuracy, recall, precision and FPR from `[..., 4]` counts (NaN where a denominator is 0)."""
+    tn, fp, fn, tp = (counts[..., i].astype(np.float64) for i in range(4))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'accuracy': (tp + tn) / (tp + tn + fp + fn),
+            'recall': tp / (tp + fn),
+            'precision': tp / (tp + fp),
+            'fpr': fp / (fp + tn),
+        }
+
+
+def _bootstrap_counts(flat_counts, n_replicates, seed):
+    """`n_replicates` row-bootstrap resamples of the flattened cell counts."""
+    rng = np.random.default_rng(seed)
+    total = int(flat_counts.sum())
+    return rng.multinomial(total, flat_counts / total, size=n_replicates)
+
+
+def _bootstrap_metrics(counts, combos, n_replicates, seed):
+    """Metric replicates per combination: {combo: {metric: array (replicates, *slice shape)}}."""
+    replicates = _bootstrap_counts(counts.ravel(), n_replicates, seed).reshape((n_replicates,) + counts.shape)
+    return {combo: metrics_from_counts(marginalize(replicates, combo)) for combo in combos}
+
+
+def bootstrap_intervals(counts, combos, n_bootstrap=1000, confidence=0.95, workers=1, seed=42, batch=250):
+    """Percentile CIs per combination and metric: {combo: {metric: (low, high)}}."""
+    seeds = np.random.SeedSequence(seed).spawn(-(-n_bootstrap // batch))
+    sizes = [min(batch, n_bootstrap - i * batch) for i in range(len(seeds))]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_bootstrap_metrics, [counts] * len(seeds), [combos] * len(seeds), sizes, seeds))
+    else:
+        parts = [_bootstrap_metrics(counts, combos, size, s) for size, s in zip(sizes, seeds)]
+
+    alpha = (1 - confidence) / 2
+    intervals = {}
+    for combo in combos:
+        intervals[combo] = {}
+        for metric in METRICS:
+            samples = np.concatenate([part[combo][metric] for part in parts])
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN slices (metric never defined)
+                low, high = np.nanquantile(samples, [alpha, 1 - alpha], axis=0)
+            intervals[combo][metric] = (low, high)
+    return intervals
+
+
+def audit_table(counts, max_order=2, n_bootstrap=0, confidence=0.95, workers=1, seed=42):
+    """One row per non-empty slice: dimension values, counts, metrics and (optionally) CI bounds."""
+    combos = slice_combinations(max_order)
+    intervals = bootstrap_intervals(counts, combos, n_bootstrap, confidence, workers, seed) if n_bootstrap else None
+    rows = []
+    for combo in combos:
+        sliced = marginalize(counts, combo)
+        metrics = metrics_from_counts(sliced)
+        for index in np.ndindex(sliced.shape[:-1]):
+            n = int(sliced[index].sum())
+            if n == 0:
+                continue
+            row = {'slice': ' & '.join(combo) or 'overall'}
+            for dim, level in zip(combo, index):
+                levels = SLICE_LEVELS[dim]
+                row[dim] = levels[level] if level < len(levels) else 'Unknown'
+            row['n'] = n
+            row.update({name: int(value) for name, value in zip(COUNT_NAMES, sliced[index])})
+            for metric in METRICS:
+                row[metric] = float(metrics[metric][index])
+                if intervals is not None:
+                    low, high = intervals[combo][metric]
+                    row[f'{metric}_low'], row[f'{metric}_high'] = float(low[index]), float(high[index])
+            rows.append(row)
+    columns = ['slice'] + DIMENSIONS + ['n'] + COUNT_NAMES + [
+        col for metric in METRICS for col in ([metric, f'{metric}_low', f'{metric}_high'] if intervals else [metric])]
+    return pd.DataFrame(rows).reindex(columns=columns)
+
+
+def save_table(table, path):
+    """Writes the audit as CSV, or JSON records when `path` ends in `.json`."""
+    if path.endswith('.json'):
+        table.to_json(path, orient='records', indent=2)
+    else:
+        table.to_csv(path, index=False)
+    print(f"✅ Slice audit written to {path} ({len(table)} slices)")
+
+
+def score_chunks(chunks, model_path):
+    """Adds model `Predictions` to chunks that do not carry precomputed ones (the model loads on first need)."""
+    assets = None
+    for chunk in chunks:
+        if 'Predictions' not in chunk:
+            from predict import load_assets, score_frame
+            assets = assets or load_assets(model_path)
+            chunk = chunk.assign(Predictions=score_frame(chunk, *assets)['Survived'].to_numpy())
+        yield chunk
+
+
+def run_slice_audit(data_path, output_path='slice_audit.csv', model_path=None, pred_column='Predictions',
+                    chunksize=None, max_order=2, n_bootstrap=1000, workers=1):
+    """Audits a labelled CSV; rows are scored with `model_path` only when `pred_column` is absent."""
+    from data_loader import load_titanic_data, iter_titanic_chunks
+    # Precomputed predictions are not part of the passenger schema, so ask for every column
+    chunks = iter_titanic_chunks(data_path, chunksize, columns='all') if chunksize else \
+        [load_titanic_data(data_path, columns='all')]
+    chunks = (chunk.rename(columns={pred_column: 'Predictions'}) for chunk in chunks)
+    if model_path is not None:
+        chunks = score_chunks(chunks, model_path)
+    counts = count_cells(chunks)
+    table = audit_table(counts, max_order, n_bootstrap, workers=workers)
+    if output_path:
+        save_table(table, output_path)
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Slice-level fairness audit with bootstrap confidence intervals.")
+    parser.add_argument('--data', default='train.csv', help="Labelled CSV (needs Survived)")
+    parser.add_argument('--pred-column', default='Predictions', help="Column holding precomputed predictions")
+    parser.add_argument('--model', default='model_artifact', help="Used only when the prediction column is absent")
+    parser.add_argument('--output', default='slice_audit.csv', help="CSV, or JSON when ending in .json")
+    parser.add_argument('--chunksize', type=int, default=None)
+    parser.add_argument('--max-order', type=int, default=2, help="Largest number of dimensions crossed")
+    parser.add_argument('--bootstrap', type=int, default=1000, help="Bootstrap replicates (0 = no CIs)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    run_slice_audit(args.data, args.output, args.model, args.pred_column, args.chunksize,
+                    args.max_order, args.bootstrap, args.workers)
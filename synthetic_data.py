@@ -0,0 +1,82 @@
+"""
+**Purpose**: Synthetic passengers in the `train.csv` / `test.csv` schema, at any size (1k to 10M+ rows).
+- **Shape**: Rows are drawn jointly from `train.csv` (keeps the Pclass / Sex / family / Embarked / Survived
+  relationships and the Embarked and Cabin gaps), then perturbed:
+    - *Name*: a random surname from the pool + the drawn row's `Title. Given names`, so title patterns stay intact.
+    - *Age*: jittered by a few years where present; missing ages stay missing (same missing-Age rate).
+    - *Fare*: multiplicative log-normal jitter (keeps the skew; zero fares stay zero).
+- **`write_synthetic_csv(path, n_rows)`**: Generates and writes in chunks, so 10M rows never sit in memory at once.
+
+USAGE: python synthetic_data.py --rows 1000000 --output synthetic_train.csv [--unlabelled]
+"""
+
+import argparse
+import numpy as np
+import pandas as pd
+from data_loader import load_titanic_data
+
+JOINT_COLUMNS = ['Survived', 'Pclass', 'Sex', 'SibSp', 'Parch', 'Ticket', 'Cabin', 'Embarked']
+AGE_JITTER = 2.0
+FARE_JITTER = 0.1
+
+
+class PassengerGenerator:
+    """Holds the resampling pools taken from `source`; `sample(n)` returns a new DataFrame."""
+
+    def __init__(self, source='train.csv', seed=42):
+        df = load_titanic_data(source, columns='all')
+        self.pool = df[JOINT_COLUMNS].reset_index(drop=True)
+        names = df['Name'].str.split(', ', n=1, expand=True)
+        self.surnames = names[0].unique().astype(object)
+        self.title_and_given = names[1].to_numpy(dtype=object)
+        self.age = df['Age'].to_numpy(dtype=np.float64)
+        self.fare = df['Fare'].to_numpy(dtype=np.float64)
+        self.rng = np.random.default_rng(seed)
+        self.next_id = 1
+
+    def sample(self, n_rows, labelled=True):
+        rng = self.rng
+        rows = rng.integers(0, len(self.pool), n_rows)
+        out = self.pool.iloc[rows].reset_index(drop=True)
+
+        surnames = self.surnames[rng.integers(0, len(self.surnames), n_rows)]
+        out.insert(0, 'Name', pd.Series(surnames, dtype=object) + ', ' + self.title_and_given[rows])
+
+        age = self.age[rows] + rng.normal(0.0, AGE_JITTER, n_rows)
+        out['Age'] = np.round(np.clip(age, 0.42, 80.0), 1)  # NaN stays NaN
+        out['Fare'] = np.round(self.fare[rows] * rng.lognormal(0.0, FARE_JITTER, n_rows), 4)
+
+        out.insert(0, 'PassengerId', np.arange(self.next_id, self.next_id + n_rows))
+        self.next_id += n_rows
+        columns = ['PassengerId', 'Survived', 'Pclass', 'Name', 'Sex', 'Age', 'SibSp', 'Parch',
+                   'Ticket', 'Fare', 'Cabin', 'Embarked']
+        if not labelled:
+            columns.remove('Survived')
+        return out[columns]
+
+
+def generate_passengers(n_rows, seed=42, labelled=True, source='train.csv'):
+    """One in-memory synthetic DataFrame of `n_rows` passengers."""
+    return PassengerGenerator(source, seed).sample(n_rows, labelled)
+
+
+def write_synthetic_csv(path, n_rows, seed=42, labelled=True, source='train.csv', chunk_rows=500_000):
+    """Streams `n_rows` synthetic passengers to `path`."""
+    generator = PassengerGenerator(source, seed)
+    written = 0
+    while written < n_rows:
+        chunk = generator.sample(min(chunk_rows, n_rows - written), labelled)
+        chunk.to_csv(path, mode='w' if written == 0 else 'a', header=(written == 0), index=False)
+        written += len(chunk)
+    print(f"✅ Wrote {written:,} synthetic passengers to {path}")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic Titanic-schema passengers.")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--output', default='synthetic_train.csv')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--unlabelled', action='store_true', help="Omit Survived (test.csv schema)")
+    args = parser.parse_args()
+    write_synthetic_csv(args.output, args.rows, args.seed, labelled=not args.unlabelled)
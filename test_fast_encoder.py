@@ -0,0 +1,53 @@
+"""
+Module: test_fast_encoder.py
+Purpose: Parity tests for the pandas-free FeatureEncoder.
+Logic: The NumPy matrix must equal `clean_data` + `reindex` (via TitanicPreprocessor) cast to float32.
+"""
+
+import numpy as np
+import pandas as pd
+from preprocessor import TitanicPreprocessor
+from fast_encoder import FeatureEncoder
+
+
+def _edge_case_rows():
+    """Passengers that exercise every fallback: unknown/missing titles, NaN Age/Fare/Embarked, extreme Fare."""
+    return pd.DataFrame({
+        'PassengerId': [1, 2, 3, 4, 5, 6],
+        'Pclass': [1, 3, 2, 3, 1, 2],
+        'Name': ['Doe, Dona. Maria', 'Smith, Mlle. Anne', 'Nobody Without Title',
+                 'Roe, Capt. Jack', 'Lee, Prof. Ann', np.nan],
+        'Sex': ['female', 'female', 'male', 'male', 'female', 'male'],
+        'Age': [np.nan, np.nan, np.nan, 60.0, np.nan, 0.42],
+        'SibSp': [0, 1, 0, 0, 3, 1],
+        'Parch': [0, 0, 2, 0, 2, 1],
+        'Ticket': ['A', 'B', 'C', 'D', 'E', 'F'],
+        'Fare': [np.nan, 0.0, 7.9104, 600.0, 31.0, 14.4543],
+        'Cabin': [np.nan] * 6,
+        'Embarked': [np.nan, 'C', 'Q', None, 'S', 'S'],
+    })
+
+
+def test_encoder_matches_pandas_pipeline():
+    """Exact float32 parity on train.csv, test.csv and hand-written edge cases."""
+    preprocessor = TitanicPreprocessor.load('preprocessor_state.pkl')
+    encoder = FeatureEncoder.from_preprocessor(preprocessor)
+
+    for name, df in [('train', pd.read_csv('train.csv')),
+                     ('test', pd.read_csv('test.csv')),
+                     ('edge cases', _edge_case_rows())]:
+        expected = preprocessor.transform(df).to_numpy(dtype=np.float32)
+        actual = encoder.transform(df)
+        assert actual.dtype == np.float32 and actual.shape == expected.shape, f"❌ Shape/dtype mismatch on {name}!"
+        assert np.array_equal(actual, expected), f"❌ Encoder output differs from clean_data on {name}!"
+
+
+def test_encoder_reuses_output_buffer():
+    """A preallocated buffer is filled in place and fully reset between batches."""
+    encoder = FeatureEncoder.from_preprocessor(TitanicPreprocessor.load('preprocessor_state.pkl'))
+    df = pd.read_csv('test.csv')
+    buffer = np.full((len(df), len(encoder.columns)), 99, dtype=np.float32)
+
+    out = encoder.transform(df, out=buffer)
+    assert np.shares_memory(out, buffer), "❌ Encoder allocated a new matrix instead of reusing the buffer!"
+    assert np.array_equal(out, encoder.transform(df)), "❌ Stale values left in the reused buffer!"
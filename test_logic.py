@@ -5,7 +5,7 @@ Logic: Uses 'assert' statements to force failure if data quality standards aren'
 """
 
 import pandas as pd
-from preprocessor import clean_data
+from preprocessor import clean_data, TitanicPreprocessor
 from feature_engineering import run_feature_engineering
 
 
@@ -43,5 +43,32 @@ def test_preprocessing_integrity():
     print("\n🏆 ALL LOGIC TESTS PASSED!")
 
 
+def test_fitted_preprocessor_is_batch_independent():
+    """
+    The fitted preprocessor must reproduce the training pipeline on train.csv
+    and give every test passenger the same features alone or in a batch.
+    """
+    train_df = pd.read_csv('train.csv')
+    test_df = pd.read_csv('test.csv')
+
+    preprocessor = TitanicPreprocessor().fit(train_df)
+
+    # 1. TEST: Parity with run_feature_engineering + clean_data on the training set
+    expected = clean_data(run_feature_engineering(train_df.copy())).drop('Survived', axis=1)
+    actual = preprocessor.transform(train_df)
+    assert list(actual.columns) == list(expected.columns), "❌ Test Failed: Column vocabulary drifted!"
+    assert (actual.astype(float).values == expected.astype(float).values).all(), \
+        "❌ Test Failed: Fitted transform does not match the training pipeline!"
+
+    # 2. TEST: Single-row inference equals full-batch inference
+    batch = preprocessor.transform(test_df)
+    single = pd.concat([preprocessor.transform(test_df.iloc[[i]]) for i in range(0, len(test_df), 37)])
+    assert (single.astype(float).values == batch.iloc[::37].astype(float).values).all(), \
+        "❌ Test Failed: Features depend on batch composition!"
+    assert batch.isnull().sum().sum() == 0, "❌ Test Failed: Missing values after fitted transform!"
+    print("✅ Pass: Fitted preprocessing is batch-independent.")
+
+
 if __name__ == "__main__":
-    test_preprocessing_integrity()
\ No newline at end of file
+    test_preprocessing_integrity()
+    test_fitted_preprocessor_is_batch_independent()
\ No newline at end of file
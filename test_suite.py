@@ -14,6 +14,7 @@ EXECUTION:
 - CI/CD: Triggered automatically by GitHub Actions on every push to 'main'.
 """
 import pytest
+import numpy as np
 import pandas as pd
 import joblib
 import os
@@ -55,3 +56,681 @@ def test_feature_consistency():
     # Standard feature count for our engineered dataset
     assert len(model_columns) >= 8, "Feature mismatch: Model expecting too few inputs."
 
+
+def test_streaming_predictions_match_batch(tmp_path):
+    """Chunked scoring must write exactly what one-shot scoring would."""
+    from predict import load_assets, score_frame, stream_predictions
+
+    test_df = pd.read_csv('test.csv')
+    model, model_columns, preprocessor = load_assets('titanic_model.pkl', 'model_columns.pkl')
+    expected = score_frame(test_df, model, model_columns, preprocessor)
+
+    # Odd chunk size so the last chunk is partial
+    output = tmp_path / 'submission.csv'
+    n_rows = stream_predictions('test.csv', 'titanic_model.pkl', 'model_columns.pkl',
+                                output_path=output, chunksize=37)
+    assert n_rows == len(test_df), "Streaming dropped or duplicated rows!"
+    assert pd.read_csv(output).equals(expected), "Streaming output differs from batch scoring!"
+
+    # Iterator-of-DataFrames input (pipeline integration)
+    frames = (test_df.iloc[i:i + 100] for i in range(0, len(test_df), 100))
+    stream_predictions(frames, 'titanic_model.pkl', 'model_columns.pkl', output_path=output)
+    assert pd.read_csv(output).equals(expected), "Iterator input differs from batch scoring!"
+
+    # No rows at all (header-only CSV, or an iterator that yields nothing): a header-only submission
+    test_df.iloc[:0].to_csv(tmp_path / 'empty.csv', index=False)
+    for source, name in ((str(tmp_path / 'empty.csv'), 'from_csv.csv'), (iter([]), 'from_iter.csv')):
+        assert stream_predictions(source, 'titanic_model.pkl', 'model_columns.pkl',
+                                  output_path=tmp_path / name) == 0, "Rows appeared from nowhere!"
+        assert list(pd.read_csv(tmp_path / name).columns) == ['PassengerId', 'Survived'], "No header written!"
+
+
+def test_parallel_predictions_keep_passenger_order(tmp_path, monkeypatch):
+    """Process-pool scoring must return rows in the original PassengerId order."""
+    import predict
+    from predict import stream_predictions
+
+    serial, parallel = tmp_path / 'serial.csv', tmp_path / 'parallel.csv'
+    stream_predictions('test.csv', 'titanic_model.pkl', 'model_columns.pkl', output_path=serial, chunksize=50)
+    # With workers the parent reads only the fitted state; the model is loaded by the workers
+    loaded = []
+    real_load = predict.joblib.load
+    monkeypatch.setattr(predict.joblib, 'load', lambda path, *a, **k: loaded.append(path) or real_load(path, *a, **k))
+    stream_predictions('test.csv', 'titanic_model.pkl', 'model_columns.pkl', output_path=parallel,
+                       chunksize=50, workers=2)
+    assert 'titanic_model.pkl' not in loaded, "❌ The parent loaded the model it never uses!"
+
+    result = pd.read_csv(parallel)
+    assert result['PassengerId'].tolist() == pd.read_csv('test.csv')['PassengerId'].tolist(), "Shard order lost!"
+    assert result.equals(pd.read_csv(serial)), "Parallel predictions differ from serial scoring!"
+
+
+def test_single_passenger_scorer_matches_model():
+    """predict_one must agree exactly with the batch pipeline + model.predict_proba."""
+    from online_predictor import PassengerScorer
+    from predict import load_assets
+
+    model, model_columns, preprocessor = load_assets('titanic_model.pkl', 'model_columns.pkl')
+    scorer = PassengerScorer(model, model_columns, preprocessor)
+
+    passengers = pd.DataFrame({
+        'PassengerId': [1, 2, 3], 'Pclass': [3, 1, 2],
+        'Name': ['A, Mr. B', 'C, Mrs. D', 'E, Master. F'], 'Sex': ['male', 'female', 'male'],
+        'Age': [22.0, 38.0, 4.0], 'SibSp': [1, 1, 1], 'Parch': [0, 0, 1], 'Ticket': ['x'] * 3,
+        'Fare': [7.25, 71.2833, 23.0], 'Cabin': [None] * 3, 'Embarked': ['S', 'C', 'S'],
+    })
+    expected = model.predict_proba(preprocessor.transform(passengers))[:, 1]
+
+    for row, p_expected in zip(passengers.itertuples(), expected):
+        label, p_survived = scorer.predict_one(row.Pclass, row.Sex, row.Age, row.SibSp,
+                                               row.Parch, row.Fare, row.Embarked)
+        assert p_survived == p_expected, "Single-passenger probability differs from the model!"
+        assert label == int(p_expected > 0.5), "Single-passenger label differs from the model!"
+
+    # One scorer shared by many threads (the app's st.cache_resource): nobody scores another caller's row
+    from concurrent.futures import ThreadPoolExecutor
+    shared = PassengerScorer(model, model_columns, preprocessor)
+    inputs = [(1 + i % 3, 'male' if i % 2 else 'female', float(i % 70), i % 3, i % 2, float(i % 250), 'SCQ'[i % 3])
+              for i in range(2000)]
+    serial = [shared.predict_one(*args) for args in inputs]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(lambda args: shared.predict_one(*args), inputs)) == serial, "❌ Threads mixed rows!"
+
+
+def test_compiled_forest_matches_sklearn():
+    """The array-backed forest must reproduce predict/predict_proba bit for bit."""
+    from predict import load_assets
+    from tree_compiler import compile_forest
+
+    model, model_columns, preprocessor = load_assets('titanic_model.pkl', 'model_columns.pkl')
+    forest = compile_forest(model)
+    X = pd.concat([preprocessor.transform(pd.read_csv(path)) for path in ('train.csv', 'test.csv')])
+
+    assert (forest.predict_proba(X) == model.predict_proba(X)).all(), "Compiled probabilities differ!"
+    assert (forest.predict(X) == model.predict(X)).all(), "Compiled predictions differ!"
+    assert (forest.predict(X.iloc[[0]]) == model.predict(X.iloc[[0]])).all(), "Single-row prediction differs!"
+
+
+def test_artifact_roundtrip_is_memory_mapped(tmp_path):
+    """The memory-mappable artifact must score exactly like the pickled model."""
+    import numpy as np
+    from artifact_store import save_artifact, load_artifact
+    from predict import load_assets
+
+    model, model_columns, preprocessor = load_assets('titanic_model.pkl', 'model_columns.pkl')
+    save_artifact(tmp_path / 'artifact', model, preprocessor)
+    artifact = load_artifact(tmp_path / 'artifact')
+
+    assert artifact.columns == model_columns, "Artifact column order differs!"
+    assert isinstance(artifact.forest.threshold, np.memmap), "Artifact arrays are not memory-mapped!"
+    assert not artifact.forest.threshold.flags.writeable, "Artifact arrays must be read-only!"
+
+    X = artifact.preprocessor.transform(pd.read_csv('test.csv'))
+    assert (artifact.predict_proba(X) == model.predict_proba(X)).all(), "Artifact predictions differ!"
+
+
+def test_micro_batched_service_matches_single_scorer():
+    """Concurrent single-record requests are merged into batches without changing any result."""
+    import asyncio
+    from inference_server import InferenceServer
+    from online_predictor import PassengerScorer
+
+    server = InferenceServer('model_artifact', max_batch_size=16, max_wait_ms=5)
+    scorer = PassengerScorer.load('model_artifact')
+    records = [{'Pclass': 1 + i % 3, 'Sex': 'male' if i % 2 else 'female', 'Age': float(i % 70),
+                'SibSp': i % 3, 'Parch': i % 2, 'Fare': float(i * 3 % 250), 'Embarked': 'SCQ'[i % 3]}
+               for i in range(50)]
+
+    async def fire():
+        server.batcher.start()
+        return await asyncio.gather(*[server.batcher.submit(record) for record in records])
+
+    results = asyncio.run(fire())
+    for record, result in zip(records, results):
+        label, probability = scorer.predict_one(record['Pclass'], record['Sex'], record['Age'], record['SibSp'],
+                                                record['Parch'], record['Fare'], record['Embarked'])
+        assert (result['Survived'], result['probability']) == (label, probability), "Service result differs!"
+    assert server.metrics.batches < len(records), "Requests were not micro-batched!"
+
+
+def test_service_rejects_bad_records_without_failing_the_batch(monkeypatch):
+    """A malformed record gets its own 400; co-batched requests from other clients still get 200."""
+    import json
+    import asyncio
+    import inference_server
+    from inference_server import InferenceServer
+    monkeypatch.setattr(inference_server, 'MAX_BODY_BYTES', 64)
+
+    server = InferenceServer('model_artifact', max_batch_size=16, max_wait_ms=20)
+    good = {'Pclass': '3', 'Sex': 'male', 'Age': 22, 'SibSp': 1, 'Parch': 0, 'Fare': 7.25, 'Embarked': 'S'}
+    bodies = [good, dict(good, Pclass='x'), {'Sex': 'female'}, dict(good, Sex='Male'), good]
+
+    async def fire():
+        server.batcher.start()
+        results = await asyncio.gather(*[server.route('POST', '/predict', json.dumps(b).encode()) for b in bodies])
+        tcp = await asyncio.start_server(server.handle_connection, '127.0.0.1', 0)
+        reader, writer = await asyncio.open_connection(*tcp.sockets[0].getsockname()[:2])
+        writer.write(b'POST /predict HTTP/1.1\r\nContent-Length: abc\r\n\r\n')
+        status_line = await reader.readline()
+        writer.close()
+        # An oversized body is never read, so it must not be served as the next request
+        smuggled = b'GET /nope HTTP/1.1\r\n\r\n' * 8
+        reader, writer = await asyncio.open_connection(*tcp.sockets[0].getsockname()[:2])
+        writer.write(b'POST /predict HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % len(smuggled) + smuggled)
+        too_large = await asyncio.wait_for(reader.read(), 10)
+        writer.close()
+        tcp.close()
+        return [result[0] for result in results], status_line, too_large
+
+    statuses, status_line, too_large = asyncio.run(fire())
+    assert statuses == [200, 400, 400, 400, 200], f"❌ Unexpected statuses {statuses}!"
+    assert status_line.startswith(b'HTTP/1.1 400'), "❌ A bad Content-Length was not answered with 400!"
+    assert too_large.startswith(b'HTTP/1.1 413') and b'Connection: close' in too_large, "❌ 413 kept the socket!"
+    assert too_large.count(b'HTTP/1.1') == 1, "❌ The unread body was served as a second request!"
+
+
+def test_prediction_cache_is_exact_and_bounded():
+    """Bucketed cache keys never change a prediction; LRU bound, counters and invalidation work."""
+    import numpy as np
+    from artifact_store import load_artifact
+    from fast_encoder import FeatureEncoder
+    from prediction_cache import PredictionCache, cached_predict_proba
+
+    artifact = load_artifact('model_artifact')
+    X = FeatureEncoder(artifact.preprocessor.get_state()).transform(pd.read_csv('train.csv'))
+    X = np.concatenate([X, X[:100]])  # guaranteed duplicates
+    fare = artifact.columns.index('Fare')
+    X[::7, fare] += 0.01  # nudge Fares inside their bucket
+
+    cache = PredictionCache.for_forest(artifact.forest, artifact.columns, max_entries=200)
+    expected = artifact.forest.predict_proba(X)
+    assert (cached_predict_proba(artifact.forest, X, cache) == expected).all(), "Cached scoring changed results!"
+    assert (cached_predict_proba(artifact.forest, X, cache) == expected).all(), "Cache hits returned wrong values!"
+
+    stats = cache.stats()
+    assert stats['entries'] == 200 and stats['evictions'] > 0, "LRU bound not enforced!"
+    assert stats['hits'] > 0 and stats['misses'] > 0, "Hit/miss counters not updated!"
+    cache.invalidate()
+    assert len(cache) == 0, "Invalidation left stale entries!"
+
+
+def test_hyperparameter_search_resumes_from_trial_log(tmp_path, monkeypatch):
+    """An interrupted search must reuse logged trials and reach the same winner."""
+    import hyperparameter_search
+    from hyperparameter_search import cache_feature_matrix, successive_halving
+
+    X_path, y_path = cache_feature_matrix('train.csv', tmp_path / 'cache')
+    assert not list((tmp_path / 'cache').rglob('*.tmp-*')), "❌ Scratch files were left behind!"
+    # An edit to the preprocessing code must not reuse the cached matrix
+    real_sha256 = hyperparameter_search.file_sha256
+    with monkeypatch.context() as patch:
+        patch.setattr(hyperparameter_search, 'file_sha256',
+                      lambda path: real_sha256(path) + ('edited' if path == 'preprocessor.py' else ''))
+        assert cache_feature_matrix('train.csv', tmp_path / 'cache')[0] != X_path, "❌ Stale matrix reused!"
+    space = {'n_estimators': [10, 20], 'max_depth': [3, 5], 'min_samples_leaf': [1],
+             'max_features': ['sqrt'], 'class_weight': [None]}
+    log_path = tmp_path / 'trials.jsonl'
+    config, trial = successive_halving(X_path, y_path, n_configs=4, eta=2, workers=1, log_path=log_path, space=space)
+
+    # Simulate an interruption after the first trial (plus a half-written line)
+    lines = log_path.read_text().splitlines()
+    log_path.write_text(lines[0] + '\n{"key": "trunc')
+    resumed_config, resumed = successive_halving(X_path, y_path, n_configs=4, eta=2, workers=1,
+                                                 log_path=log_path, space=space)
+
+    assert resumed['trials_reused'] == 1, "❌ Logged trial was not reused!"
+    assert resumed['trials_run'] == len(lines) - 1, "❌ Resumed search re-ran finished trials!"
+    assert resumed_config == config and resumed['score'] == trial['score'], "❌ Resumed search changed the winner!"
+    _, again = successive_halving(X_path, y_path, n_configs=4, eta=2, workers=1, log_path=log_path, space=space)
+    assert again['trials_run'] == 0, "❌ Trials appended after a partial line were lost!"
+
+    # Same row count, edited data: the shared log must not serve the old scores
+    edited = pd.read_csv('train.csv')
+    edited.loc[:100, 'Survived'] = 1 - edited.loc[:100, 'Survived']
+    edited.to_csv(tmp_path / 'edited.csv', index=False)
+    X_edited, y_edited = cache_feature_matrix(str(tmp_path / 'edited.csv'), tmp_path / 'cache')
+    _, fresh = successive_halving(X_edited, y_edited, n_configs=4, eta=2, workers=1, log_path=log_path, space=space)
+    assert fresh['trials_reused'] == 0, "❌ Trials of other data were reused!"
+
+
+def test_pipeline_stages_rerun_only_when_inputs_change(tmp_path):
+    """Cached stages must be skipped until their inputs, code or upstream change."""
+    from pipeline_cache import Stage, run_stages
+
+    source = tmp_path / 'source.txt'
+    source.write_text('1')
+    calls = []
+
+    def double(out_dir, upstream):
+        calls.append('double')
+        with open(os.path.join(out_dir, 'value.txt'), 'w') as f:
+            f.write(str(2 * int(source.read_text())))
+
+    def report(out_dir, upstream):
+        calls.append('report')
+        with open(os.path.join(upstream['double'], 'value.txt')) as f:
+            value = f.read()
+        with open(os.path.join(out_dir, 'report.txt'), 'w') as f:
+            f.write(f'value={value}')
+
+    def stages():
+        return [Stage('double', double, inputs=[str(source)]),
+                Stage('report', report, deps=['double'], exports=['report.txt'])]
+
+    cache_dir, workspace = tmp_path / 'cache', tmp_path
+    run_stages(stages(), cache_dir, workspace=workspace)
+    records = run_stages(stages(), cache_dir, workspace=workspace)
+    assert calls == ['double', 'report'], "❌ Unchanged stages were re-executed!"
+    assert [r['status'] for r in records] == ['cached', 'cached'], "❌ Expected two cache hits!"
+
+    run_stages(stages(), cache_dir, from_stage='report', workspace=workspace)
+    assert calls[2:] == ['report'], "❌ --from-stage should only re-run that stage and its dependents!"
+
+    source.write_text('5')
+    run_stages(stages(), cache_dir, workspace=workspace)
+    assert calls[3:] == ['double', 'report'], "❌ Changed input did not invalidate downstream stages!"
+    assert (workspace / 'report.txt').read_text() == 'value=10', "❌ Exported output is stale!"
+
+    # main.py stages hash their import closure: lazy and indirect imports count, unrelated modules do not
+    from main import build_stages
+    code = {stage.name: set(stage.code) for stage in build_stages('train.csv', 'test.csv')}
+    assert all('main.py' in files for files in code.values()), "❌ A stage does not hash main.py!"
+    assert {'data_loader.py', 'model_registry.py', 'group_tables.py', 'drift_monitor.py'} <= code['predict'], \
+        "❌ The predict stage misses modules it runs!"
+    assert 'model_registry.py' in code['audit'], "❌ The audit stage misses resolve_artifact's module!"
+    assert 'model_trainer.py' not in code['load'] | code['audit'], "❌ Unrelated modules invalidate a stage!"
+
+
+def test_slice_audit_matches_per_slice_metrics():
+    """Grouped confusion counts must reproduce sklearn's per-slice metrics, with sane bootstrap CIs."""
+    from sklearn.metrics import accuracy_score, precision_score, recall_score
+    from slice_audit import count_cells, audit_table
+    from bias_validator import run_bias_audit
+
+    df = pd.read_csv('train.csv')
+    df['Predictions'] = (df['Sex'] == 'female').astype(int)  # Precomputed "model"
+    table = audit_table(count_cells(df), max_order=2, n_bootstrap=200)
+
+    row = table[(table['slice'] == 'Sex & Pclass') & (table['Sex'] == 'male') & (table['Pclass'] == 1)].iloc[0]
+    subset = df[(df['Sex'] == 'male') & (df['Pclass'] == 1)]
+    assert row['n'] == len(subset), "❌ Slice size mismatch!"
+    assert abs(row['accuracy'] - accuracy_score(subset['Survived'], subset['Predictions'])) < 1e-12, "❌ Accuracy!"
+
+    overall = table[table['slice'] == 'overall'].iloc[0]
+    assert abs(overall['precision'] - precision_score(df['Survived'], df['Predictions'])) < 1e-12, "❌ Precision!"
+    assert overall['recall_low'] <= overall['recall'] <= overall['recall_high'], "❌ CI does not cover the estimate!"
+
+    # Chunked counting and the precomputed-predictions path give the same table
+    chunked = count_cells([df.iloc[:300], df.iloc[300:]])
+    assert (chunked == count_cells(df)).all(), "❌ Chunked counts differ!"
+    audited = run_bias_audit('train.csv', predictions=df['Predictions'])
+    assert audited.equals(audit_table(count_cells(df))), "❌ Bias audit ignored the precomputed predictions!"
+    male = df[df['Sex'] == 'male']
+    male_recall = audited.loc[(audited['slice'] == 'Sex') & (audited['Sex'] == 'male'), 'recall'].iloc[0]
+    assert male_recall == recall_score(male['Survived'], male['Predictions']), "❌ Recall mismatch!"
+
+
+def test_synthetic_data_keeps_train_shape_and_benchmarks_flag_regressions():
+    """Synthetic passengers must look like train.csv; the comparison must flag slowdowns."""
+    from synthetic_data import generate_passengers
+    from benchmark_suite import compare
+
+    real = pd.read_csv('train.csv')
+    fake = generate_passengers(20_000, seed=1)
+    assert list(fake.columns) == list(real.columns), "❌ Synthetic schema differs from train.csv!"
+    assert abs(fake['Age'].isna().mean() - real['Age'].isna().mean()) < 0.02, "❌ Missing-Age rate drifted!"
+    assert fake['Embarked'].isna().any(), "❌ Embarked gaps were not reproduced!"
+    assert fake['Name'].str.contains(r', (Mr|Mrs|Miss|Master)\. ').mean() > 0.9, "❌ Name/title pattern lost!"
+    assert abs(np.log1p(fake['Fare']).median() - np.log1p(real['Fare']).median()) < 0.1, "❌ Fare shape drifted!"
+
+    baseline = {'results': {'1000': {'load': {'seconds': 1.0, 'peak_mb': 10.0}}}}
+    current = {'results': {'1000': {'load': {'seconds': 1.5, 'peak_mb': 10.5}}}}
+    regressions = compare(current, baseline, threshold=0.2)
+    assert [(r['stage'], r['metric']) for r in regressions] == [('load', 'seconds')], "❌ Regression not flagged!"
+
+
+def test_instrumentation_records_nested_spans_and_is_inert_when_off(tmp_path):
+    """Spans nest, count rows and export JSON/Prometheus; disabled hooks record nothing."""
+    import json
+    import instrumentation
+    from preprocessor import TitanicPreprocessor
+
+    df = pd.read_csv('train.csv')
+    preprocessor = TitanicPreprocessor().fit(df)
+    assert instrumentation.report() is None, "❌ Instrumentation should be off by default!"
+
+    instrumentation.enable(memory=True)
+    try:
+        with instrumentation.span('stage', rows_in=len(df)) as stage:
+            stage.rows_out = len(preprocessor.transform(df))
+    finally:
+        report = instrumentation.disable()
+
+    spans = report['spans']
+    assert spans['stage']['rows_out'] == len(df), "❌ Rows out not recorded!"
+    assert spans['stage/preprocessor.transform/extract_titles']['calls'] == 1, "❌ Sub-step span missing!"
+    assert spans['stage']['peak_memory_delta_mb'] > 0, "❌ Peak memory not traced!"
+    assert spans['stage']['wall_seconds'] >= spans['stage/preprocessor.transform']['wall_seconds'], "❌ Nesting!"
+
+    instrumentation.write_report(str(tmp_path / 'report.json'), report)
+    instrumentation.write_prometheus(str(tmp_path / 'metrics.prom'), report)
+    assert json.loads((tmp_path / 'report.json').read_text())['spans'].keys() == spans.keys(), "❌ JSON report!"
+    assert 'titanic_stage_wall_seconds_total{stage="stage"}' in (tmp_path / 'metrics.prom').read_text(), "❌ Prom!"
+
+    with instrumentation.span('ignored') as off:
+        off.rows_out = 1
+    assert instrumentation.report() is None, "❌ Disabled span recorded data!"
+
+
+def test_typed_loader_prunes_columns_and_caches(tmp_path, monkeypatch):
+    """Compact dtypes, pruned columns, a cache hit on reload and a float fallback for missing counts."""
+    import data_loader
+    monkeypatch.setattr(data_loader, 'CACHE_DIR', str(tmp_path / 'cache'))
+
+    df = data_loader.load_titanic_data('train.csv', cache=True)
+    assert 'Ticket' not in df.columns and 'Cabin' not in df.columns, "❌ Unused columns were loaded!"
+    assert df['Sex'].dtype == 'category' and df['Pclass'].dtype == np.int8, "❌ Schema dtypes not applied!"
+    assert df['Fare'].dtype == np.float64, "❌ Fare must stay float64 (FareBin edges)!"
+    assert len(list((tmp_path / 'cache').glob('*.p*'))) == 1, "❌ Typed frame was not cached!"
+    cached = data_loader.load_titanic_data('train.csv', cache=True)
+    assert cached.equals(df), "❌ Cached frame differs from the parsed one!"
+    data_loader.load_titanic_data('test.csv')
+    assert len(list((tmp_path / 'cache').glob('*.p*'))) == 1, "❌ A file was cached without cache=True!"
+
+    raw = pd.read_csv('train.csv')
+    raw.loc[0, 'SibSp'] = np.nan
+    raw.to_csv(tmp_path / 'gaps.csv', index=False)
+    gaps = data_loader.load_titanic_data(str(tmp_path / 'gaps.csv'), columns='all')
+    assert np.isnan(gaps.loc[0, 'SibSp']) and 'Cabin' in gaps.columns, "❌ Fallback or columns='all' failed!"
+    assert gaps['Parch'].dtype == np.int8 and gaps['SibSp'].dtype == np.float64, "❌ Fallback hit clean columns!"
+    assert gaps['PassengerId'].dtype == np.int32, "❌ PassengerId lost its integer type!"
+
+
+def test_streaming_handles_blank_counts_and_unknown_levels(tmp_path, capsys):
+    """Chunked scoring (predict.py and the bulk job) survives a blank SibSp and reports unknown Sex values."""
+    from predict import stream_predictions
+    from bulk_scorer import BulkScoringJob
+    from online_predictor import PassengerScorer
+
+    raw = pd.read_csv('test.csv')
+    raw.loc[0, 'SibSp'] = np.nan
+    raw.loc[1, 'Sex'] = 'Male'
+    raw.to_csv(tmp_path / 'gaps.csv', index=False)
+    output = tmp_path / 'submission.csv'
+    n_rows = stream_predictions(str(tmp_path / 'gaps.csv'), 'model_artifact', None, output_path=str(output),
+                                chunksize=100)
+    assert n_rows == len(raw), "❌ Rows were lost while streaming!"
+    assert "unknown Sex value(s) 'Male'" in capsys.readouterr().out, "❌ Unknown Sex level was not reported!"
+    with open(output) as f:
+        assert f.readlines()[1].startswith(f"{raw.loc[0, 'PassengerId']},"), "❌ PassengerId is not an integer!"
+
+    scorer = PassengerScorer.load('model_artifact')
+    job = BulkScoringJob(str(tmp_path / 'gaps.csv'), scorer.forest, scorer.state, chunksize=100).start().wait(60)
+    assert job.error is None and job.rows == len(raw), f"❌ Bulk job failed: {job.error}"
+    job.cleanup()
+
+
+def test_lean_preprocessing_matches_and_bounds_peak_memory(tmp_path, monkeypatch):
+    """Same matrix as clean_data(run_feature_engineering(...)) with a pinned peak-to-input memory ratio."""
+    import data_loader
+    from feature_engineering import run_feature_engineering
+    from preprocessor import clean_data, clean_data_lean, memory_footprint
+    from synthetic_data import generate_passengers
+    monkeypatch.setattr(data_loader, 'CACHE_DIR', str(tmp_path / 'cache'))
+
+    for df in (pd.read_csv('train.csv'), generate_passengers(50_000)):
+        standard, standard_memory = memory_footprint(lambda d: clean_data(run_feature_engineering(d.copy())), df)
+        lean, lean_memory = memory_footprint(lambda d: clean_data_lean(d, consume=False), df)
+        assert list(lean.columns) == list(standard.columns), "❌ Lean mode changed the column layout!"
+        assert np.array_equal(lean.to_numpy(), standard.to_numpy(dtype=np.float32), equal_nan=True), "❌ Values!"
+        assert lean_memory['peak_to_input'] < 0.75, f"❌ Lean peak is {lean_memory['peak_to_input']:.2f}x input!"
+        assert lean_memory['peak_mb'] < standard_memory['peak_mb'], "❌ Lean mode used more memory!"
+
+    consumed = pd.read_csv('train.csv')
+    clean_data_lean(consumed)
+    assert consumed.shape[1] == 0, "❌ Consumed columns were not released!"
+
+
+def test_parallel_training_matches_serial_and_oob_is_scored(tmp_path, monkeypatch):
+    """n_jobs=-1 gives the same CV scores and forest as n_jobs=1; cv_mode='oob' scores the final fit."""
+    import data_loader
+    from model_trainer import train_titanic_model
+    monkeypatch.setattr(data_loader, 'CACHE_DIR', str(tmp_path / 'cache'))
+
+    params = {'n_estimators': 20}
+    serial = train_titanic_model('train.csv', n_jobs=1, output_dir=str(tmp_path / 'serial'), params=params)
+    parallel = train_titanic_model('train.csv', n_jobs=-1, output_dir=str(tmp_path / 'parallel'), params=params)
+    assert (serial.cv_scores_ == parallel.cv_scores_).all(), "❌ Parallel folds changed the CV scores!"
+    X = pd.DataFrame(np.random.default_rng(0).random((200, len(serial.feature_names_in_))),
+                     columns=serial.feature_names_in_)
+    assert (serial.predict_proba(X) == parallel.predict_proba(X)).all(), "❌ Parallel fit changed the model!"
+
+    oob = train_titanic_model('train.csv', cv_mode='oob', output_dir=str(tmp_path / 'oob'), params=params)
+    assert oob.cv_scores_ is None, "❌ OOB mode still ran the k-fold refits!"
+    assert 0.5 < oob.oob_score_ <= 1.0, "❌ OOB accuracy was not computed!"
+
+
+def test_incremental_update_grows_window_and_merges_statistics(tmp_path, monkeypatch):
+    """Merged aggregates equal a refit on all rows; updates add trees on the batch and retire old ones."""
+    import data_loader
+    from preprocessor import TitanicPreprocessor
+    from model_trainer import train_titanic_model
+    from incremental_trainer import PreprocessingAggregates, update_model
+    monkeypatch.setattr(data_loader, 'CACHE_DIR', str(tmp_path / 'cache'))
+
+    raw = pd.read_csv('train.csv')
+    history, batch = raw.iloc[:600], raw.iloc[600:]
+    merged = PreprocessingAggregates.from_frame(history).merge(PreprocessingAggregates.from_frame(batch))
+    refit, updated = TitanicPreprocessor().fit(raw), merged.apply_to(TitanicPreprocessor())
+    for key in ('title_age_medians', 'age_fill', 'embarked_mode', 'fare_fill', 'fare_bin_edges'):
+        assert getattr(updated, key) == getattr(refit, key), f"❌ Merged {key} differs from a full refit!"
+
+    history.to_csv(tmp_path / 'history.csv', index=False)
+    batch.iloc[:150].to_csv(tmp_path / 'batch.csv', index=False)
+    batch.iloc[150:].to_csv(tmp_path / 'batch2.csv', index=False)
+    model_dir = str(tmp_path / 'model')
+    train_titanic_model(str(tmp_path / 'history.csv'), cv_mode='oob', output_dir=model_dir,
+                        params={'n_estimators': 20})
+    model = update_model(str(tmp_path / 'batch.csv'), model_dir, n_new_trees=5,
+                         history_path=str(tmp_path / 'history.csv'))
+    assert len(model.estimators_) == 25, "❌ Warm start did not keep the existing trees!"
+    with pytest.raises(ValueError):
+        update_model(str(tmp_path / 'batch.csv'), model_dir, n_new_trees=5)  # a replay would double-count
+    model = update_model(str(tmp_path / 'batch2.csv'), model_dir, n_new_trees=5, window=2)
+    assert len(model.estimators_) == 10, "❌ Sliding window did not retire the initial trees!"
+    assert joblib.load(os.path.join(model_dir, 'titanic_model.pkl')).n_estimators == 10, "❌ Update not saved!"
+    saved = PreprocessingAggregates.load(os.path.join(model_dir, 'preprocessor_aggregates.pkl'))
+    assert saved.rows == len(raw) and len(saved.batches) == 3, "❌ Aggregates did not count each batch once!"
+
+
+def test_drift_sketches_merge_and_flag_shifted_inputs():
+    """Sketches merge exactly, single-row and batch updates agree, and a shifted Fare is flagged."""
+    from preprocessor import extract_titles
+    from drift_monitor import DriftSketch, drift_scores
+
+    frame = extract_titles(pd.read_csv('train.csv'))
+    reference = DriftSketch.reference(frame)
+    halves = reference.empty().update(frame.iloc[:400], frame['Title'].iloc[:400])
+    halves.merge(reference.empty().update(frame.iloc[400:], frame['Title'].iloc[400:]))
+    assert halves.get_state() == reference.get_state(), "❌ Merged sketches differ from one pass!"
+
+    rows = reference.empty()
+    for r in frame.itertuples():
+        rows.update_one(r.Pclass, r.Sex, None if r.Age != r.Age else r.Age, r.Fare,
+                        None if r.Embarked != r.Embarked else r.Embarked, r.Title)
+    assert rows.get_state() == reference.get_state(), "❌ update_one disagrees with update!"
+
+    same = drift_scores(reference, halves)
+    assert all(score['status'] == 'ok' for score in same['features'].values()), "❌ False drift alarm!"
+    shifted = frame.assign(Fare=frame['Fare'] * 3)
+    scores = drift_scores(reference, reference.empty().update(shifted, shifted['Title']))
+    assert scores['features']['Fare']['status'] == 'drift', "❌ Tripled fares were not flagged!"
+    assert scores['features']['Sex']['psi'] < 1e-9, "❌ Unchanged feature reported drift!"
+
+
+def test_attributions_add_up_to_forest_probabilities():
+    """Bias + per-feature contributions equals predict_proba, in batch and for a single passenger."""
+    from predict import load_assets
+    from attributions import explain_frame
+    from online_predictor import PassengerScorer
+
+    forest, model_columns, preprocessor = load_assets('model_artifact')
+    X = preprocessor.transform(pd.read_csv('test.csv')).reindex(columns=model_columns, fill_value=0)
+    explanation = explain_frame(forest, X)
+    contributions = explanation[model_columns].to_numpy()
+    assert np.allclose(explanation['Bias'] + contributions.sum(axis=1), forest.predict_proba(X)[:, 1]), "❌ Sum!"
+    assert np.allclose(explanation['Probability'], forest.predict_proba(X)[:, 1]), "❌ Probability column!"
+
+    scorer = PassengerScorer(forest, model_columns, preprocessor)
+    bias, single = scorer.explain_one(1, 'female', 30, 0, 0, 80.0, 'C')
+    row = explain_frame(forest, scorer.encode_one(1, 'female', 30, 0, 0, 80.0, 'C')[np.newaxis], model_columns)
+    assert np.allclose(list(single.values()), row[model_columns].to_numpy()[0]), "❌ explain_one differs!"
+    assert abs(bias + sum(single.values()) - scorer.predict_one(1, 'female', 30, 0, 0, 80.0, 'C')[1]) < 1e-9
+
+
+def test_cli_scoring_startup_budget():
+    """`cli.py predict --help` and a cold single-passenger predict start fast and never import sklearn/pandas."""
+    import sys
+    import time
+    import subprocess
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, 'cli.py', 'predict', '--help'], check=True, capture_output=True)
+    assert time.perf_counter() - start < 1.0, "❌ 'predict --help' is over its 1s startup budget!"
+
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, 'cli.py', '--import-profile', 'predict', '--passenger', 'Pclass=3',
+                             'Sex=male', 'Age=22', 'SibSp=1', 'Parch=0', 'Fare=7.25', 'Embarked=S'],
+                            check=True, capture_output=True, text=True)
+    assert time.perf_counter() - start < 2.0, "❌ Cold single-row predict is over its 2s startup budget!"
+    assert '"Survived"' in result.stdout, "❌ No prediction printed!"
+    assert 'Heavy packages loaded: none' in result.stdout, "❌ The scoring path imported pandas/sklearn!"
+
+    # Unknown levels are rejected with a message, never scored as an unseen title / sex / port
+    from cli import parse_passenger
+    titles = ['Master', 'Miss', 'Mr', 'Mrs', 'Rare']
+    base = ['Pclass=3', 'Sex=male', 'SibSp=0', 'Parch=0']
+    assert parse_passenger(base + ['Title=Mr', 'Embarked='], titles)['title'] == 'Mr', "❌ Valid passenger rejected!"
+    for bad in ('Title=Foo', 'Sex=Male', 'Embarked=X', 'Pclass=4'):
+        with pytest.raises(ValueError):
+            parse_passenger(base + [bad], titles)
+    result = subprocess.run([sys.executable, 'cli.py', 'predict', '--passenger', *base, 'Title=Foo'],
+                            capture_output=True, text=True)
+    assert result.returncode != 0 and '❌ Title' in result.stderr, "❌ The CLI scored an unknown title!"
+
+
+def test_lookup_table_matches_the_forest(tmp_path):
+    """A lookup table over a slice of the app's domain agrees with the model on every cell and random inputs."""
+    from lookup_table import build_table, verify_table, LookupScorer
+
+    domain = {'Pclass': [1, 2, 3], 'Sex': ['male', 'female'], 'Embarked': ['S', 'C', 'Q'],
+              'Age': [10, 30], 'SibSp': [0, 1], 'Parch': [0, 1], 'Fare': [5.0, 20.0]}
+    build_table('model_artifact', str(tmp_path), domain)
+    summary = verify_table(str(tmp_path), samples=2_000)
+    assert summary['ok'], f"❌ Table disagrees with the model: {summary}"
+
+    table = LookupScorer.load(str(tmp_path), artifact_dir='model_artifact')
+    with pytest.raises(ValueError):
+        table.predict_one(1, 'female', 30, 0, 0, 80.0, 'C')  # Fare outside the table's domain
+
+
+def test_model_registry_hot_swap(tmp_path):
+    """Published versions are immutable; a watcher swaps in a new CURRENT while old holders keep their model."""
+    import stat
+    from model_registry import publish, set_current, ModelWatcher, resolve_artifact, version_path, verify_version
+    from model_trainer import save_model_artifacts
+    from preprocessor import TitanicPreprocessor
+    from online_predictor import PassengerScorer
+
+    registry = str(tmp_path / 'model_registry')
+    model = joblib.load('titanic_model.pkl')
+    preprocessor = TitanicPreprocessor.load('preprocessor_state.pkl')
+    columns = joblib.load('model_columns.pkl')
+    first = publish(registry, lambda path: save_model_artifacts(model, preprocessor, columns, path))
+    model_file = os.path.join(version_path(registry, first), 'titanic_model.pkl')
+    assert not os.stat(model_file).st_mode & stat.S_IWUSR, "❌ Published files are writable!"
+    assert resolve_artifact(registry).endswith(os.path.join(first, 'model_artifact')), "❌ Wrong current artifact!"
+
+    probes = []
+    watcher = ModelWatcher(registry, lambda path: PassengerScorer.load(path, cache_size=100), probe=probes.append,
+                           interval=60)
+    old = watcher.active
+    old.predict_one(3, 'male', 22, 1, 0, 7.25, 'S')
+    assert len(old.cache) == 1, "❌ Prediction was not cached!"
+    assert not watcher.poll(), "❌ Swapped without a new version!"
+
+    model.estimators_ = model.estimators_[:10]
+    second = publish(registry, lambda path: save_model_artifacts(model, preprocessor, columns, path))
+    assert watcher.poll() and watcher.version == second, "❌ New version was not swapped in!"
+    assert len(probes) == 2 and probes[-1] is watcher.active, "❌ New version was not warmed before the swap!"
+    assert old.forest.n_trees == 100 and watcher.active.forest.n_trees == 10, "❌ Old holders lost their model!"
+    assert len(old.cache) == 0, "❌ The retired model's cache survived the swap!"
+
+    set_current(registry, first)
+    assert watcher.poll() and watcher.version == first, "❌ Rollback was not picked up!"
+    assert verify_version(registry, second), "❌ A published version changed!"
+
+
+def test_bulk_upload_scoring_matches_batch_predictions():
+    """The app's background bulk job scores an uploaded file in chunks exactly like predict.py."""
+    import io
+    from bulk_scorer import BulkScoringJob
+    from online_predictor import PassengerScorer
+    from predict import load_assets, score_frame
+
+    forest, model_columns, preprocessor = load_assets('model_artifact')
+    expected = score_frame(pd.read_csv('test.csv'), forest, model_columns, preprocessor)
+
+    scorer = PassengerScorer.load('model_artifact')
+    with open('test.csv', 'rb') as f:
+        upload = io.BytesIO(f.read())
+    job = BulkScoringJob(upload, scorer.forest, scorer.state, chunksize=50, preview_rows=10).start().wait(60)
+    stats = job.progress()
+    assert stats['done'] and stats['error'] is None, f"❌ Bulk job failed: {stats['error']}"
+    assert stats['rows'] == len(expected) and stats['fraction'] == 1.0, "❌ Progress does not cover the file!"
+    assert len(stats['preview']) == 10 and stats['rows_per_sec'] > 0, "❌ Preview / timings missing!"
+    scored = pd.read_csv(job.output_path)
+    assert scored['Survived'].tolist() == expected['Survived'].tolist(), "❌ Bulk predictions differ!"
+    job.cleanup()
+    assert not os.path.exists(job.output_path), "❌ Temporary submission file left behind!"
+
+    # A job dropped without cleanup() (e.g. its session ended) still removes its output
+    import gc
+    job = BulkScoringJob('test.csv', scorer.forest, scorer.state).start().wait(60)
+    output_path = job.output_path
+    del job
+    gc.collect()
+    assert not os.path.exists(output_path), "❌ Output of a dropped job was left behind!"
+
+
+def test_group_features_are_leak_free_and_match_the_encoder():
+    """Opt-in ticket/surname/deck features: a row's rate ignores its own label, tables are bounded, both paths agree."""
+    from data_loader import PIPELINE_COLUMNS, GROUP_COLUMNS
+    from preprocessor import TitanicPreprocessor
+    from fast_encoder import FeatureEncoder
+    from feature_engineering import fit_group_tables, apply_group_features
+    from group_tables import GROUP_FEATURES
+
+    train = pd.read_csv('train.csv', usecols=PIPELINE_COLUMNS + GROUP_COLUMNS)
+    X = TitanicPreprocessor(group_features=True).fit_transform(train)
+    assert list(X.columns[-len(GROUP_FEATURES):]) == GROUP_FEATURES, "❌ Group columns missing!"
+
+    # Flipping one passenger's label changes the tables, but not that passenger's own (out-of-fold) rates
+    flipped = train['Survived'].copy()
+    flipped[0] = 1 - flipped[0]
+    rates = [apply_group_features(train, fit_group_tables(train, labels), 0.4, 2.0, survived=labels).loc[0]
+             for labels in (train['Survived'], flipped)]
+    assert rates[0].equals(rates[1]), "❌ A row's features see its label!"
+
+    preprocessor = TitanicPreprocessor(group_features=True).fit(train)
+    test = pd.read_csv('test.csv')
+    expected = preprocessor.transform(test).to_numpy(dtype=np.float32)
+    assert np.array_equal(FeatureEncoder(preprocessor.get_state()).transform(test), expected), "❌ Encoder differs!"
+    # Without Ticket/Cabin (e.g. an online request) the groups fall back to unseen / unknown deck
+    unseen = FeatureEncoder(preprocessor.get_state()).transform(test.drop(columns=GROUP_COLUMNS + ['Name'])
+                                                                .assign(Title='Mr'))
+    assert (unseen[:, preprocessor.columns.index('TicketGroupSize')] == 1).all(), "❌ Unseen group size is not 1!"
+
+    tables = fit_group_tables(train, train['Survived'], max_keys=50)
+    assert all(len(table['keys']) <= 50 for table in tables.values()), "❌ Group tables are not bounded!"
+    assert min(tables['Ticket']['count']) >= 2, "❌ Bounded table did not keep the largest groups!"
@@ -0,0 +1,9 @@
+"""
+**Purpose**: Title rules shared by the pandas pipeline (`preprocessor.py`) and the NumPy encoder (`fast_encoder.py`).
+Kept in a standard-library-only module so the pandas-free scoring path can import them without pandas.
+"""
+
+TITLE_PATTERN = r' ([A-Za-z]+)\.'
+RARE_TITLES = ['Lady', 'Countess', 'Capt', 'Col', 'Don',
+               'Dr', 'Major', 'Rev', 'Sir', 'Jonkheer', 'Dona']
+TITLE_ALIASES = {'Mlle': 'Miss', 'Ms': 'Miss', 'Mme': 'Mrs'}
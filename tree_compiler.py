@@ -0,0 +1,158 @@
+"""
+**Purpose**: Array-backed evaluation of the saved Random Forest.
+- **`compile_forest(model)`**: Exports every tree into contiguous NumPy arrays (feature index, threshold,
+  left/right child, normalised node value), padded to a common node count.
+- **`CompiledForest.predict_proba(X)`**: Walks all trees for a whole batch level by level. Leaves point to
+  themselves, so a depth-5 forest is exactly 5 vectorised gather steps regardless of batch size.
+- **Exactness**: Features are compared in float32 like sklearn, and per-tree probabilities are accumulated
+  in estimator order, so results match `RandomForestClassifier.predict` / `predict_proba` bit for bit.
+- **When to use**: It removes sklearn's per-call overhead (validation, thread dispatch), so it wins clearly on
+  small batches (single rows, online requests). For very large batches sklearn's compiled tree walk is
+  still faster; `python tree_compiler.py` prints the crossover on the current machine.
+"""
+
+import time
+import numpy as np
+
+# Rows evaluated per block; keeps the (trees x rows) index matrices cache-sized
+BLOCK_ROWS = 4_096
+
+
+class CompiledForest:
+    """
+    Flattened forest: per-node arrays have shape (n_trees * max_nodes,) and child
+    pointers are global node ids (tree t's root is node t * max_nodes).
+    """
+
+    def __init__(self, feature, threshold, left, right, value, classes, max_depth, n_trees, n_nodes,
+                 left_minus_right=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value  # (n_classes, n_trees * max_nodes), class-major so each class is contiguous
+        self.classes = classes
+        self.max_depth = int(max_depth)
+        self.n_trees = int(n_trees)
+        self.n_nodes = int(n_nodes)
+        self.roots = np.arange(self.n_trees, dtype=np.intp) * self.n_nodes
+        self.left_minus_right = left - right if left_minus_right is None else left_minus_right
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        """Rebuilds a forest from `to_arrays()` / `meta()` output (arrays may be read-only memory maps)."""
+        return cls(arrays['feature'], arrays['threshold'], arrays['left'], arrays['right'],
+                   arrays['value'], arrays['classes'], meta['max_depth'], meta['n_trees'], meta['n_nodes'],
+                   arrays.get('left_minus_right'))
+
+    def to_arrays(self):
+        return {'feature': self.feature, 'threshold': self.threshold, 'left': self.left,
+                'right': self.right, 'left_minus_right': self.left_minus_right,
+                'value': self.value, 'classes': self.classes}
+
+    def meta(self):
+        return {'max_depth': self.max_depth, 'n_trees': self.n_trees, 'n_nodes': self.n_nodes}
+
+    def _predict_block(self, X):
+        n, n_features = X.shape
+        # Tree-major layout: node[t, i] is the global node id of row i in tree t
+        node = np.repeat(self.roots[:, np.newaxis], n, axis=1)
+        row_base = np.arange(n, dtype=np.intp) * n_features
+        X_flat = X.astype(np.float64).ravel()
+        for _ in range(self.max_depth):
+            # Leaves have threshold -inf and right == self, so finished rows stay put
+            feature_pos = self.feature.take(node)
+            feature_pos += row_base
+            go_left = X_flat.take(feature_pos) <= self.threshold.take(node)
+            # child = right, or left when go_left (arithmetic select beats np.where here)
+            child = self.right.take(node)
+            child += self.left_minus_right.take(node) * go_left
+            node = child
+
+        columns = []
+        for class_values in self.value:
+            leaf_values = class_values.take(node)
+            column = np.zeros(n, dtype=np.float64)
+            # Same summation order as sklearn (tree 0, 1, 2, ...) for bit-identical results
+            for t in range(self.n_trees):
+                column += leaf_values[t]
+            columns.append(column / self.n_trees)
+        return np.stack(columns, axis=1)
+
+    def predict_proba(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.shape[0] <= BLOCK_ROWS:
+            return self._predict_block(X)
+        return np.concatenate([self._predict_block(X[start:start + BLOCK_ROWS])
+                               for start in range(0, X.shape[0], BLOCK_ROWS)])
+
+    def predict(self, X):
+        return np.asarray(self.classes).take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def compile_forest(model):
+    """Converts a fitted (single-output) RandomForestClassifier into a CompiledForest."""
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    n_trees = len(trees)
+    n_nodes = max(tree.node_count for tree in trees)
+    n_classes = trees[0].value.shape[2]
+
+    feature = np.zeros((n_trees, n_nodes), dtype=np.intp)
+    # Padding and leaves never go left and their right child is themselves,
+    # so extra levels are no-ops for rows that already reached a leaf
+    threshold = np.full((n_trees, n_nodes), -np.inf, dtype=np.float64)
+    offsets = np.arange(n_trees, dtype=np.intp)[:, np.newaxis] * n_nodes
+    left = offsets + np.arange(n_nodes, dtype=np.intp)
+    right = left.copy()
+    value = np.zeros((n_trees, n_nodes, n_classes), dtype=np.float64)
+
+    for t, tree in enumerate(trees):
+        count = tree.node_count
+        internal = tree.children_left != -1
+        feature[t, :count][internal] = tree.feature[internal]
+        threshold[t, :count][internal] = tree.threshold[internal]
+        left[t, :count][internal] = offsets[t, 0] + tree.children_left[internal]
+        right[t, :count][internal] = offsets[t, 0] + tree.children_right[internal]
+
+        # Same normalisation as DecisionTreeClassifier.predict_proba
+        tree_value = tree.value[:, 0, :]
+        normalizer = tree_value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        value[t, :count] = tree_value / normalizer
+
+    return CompiledForest(feature.ravel(), threshold.ravel(), left.ravel(), right.ravel(),
+                          np.ascontiguousarray(value.reshape(n_trees * n_nodes, n_classes).T),
+                          np.asarray(model.classes_),
+                          max(tree.max_depth for tree in trees), n_trees, n_nodes)
+
+
+def benchmark(model, X_pool, batch_sizes=(1, 100, 10_000, 1_000_000), repeats=5):
+    """Prints sklearn vs compiled latency per batch size and checks the predictions are identical."""
+    forest = compile_forest(model)
+    rng = np.random.default_rng(42)
+    print(f"{'batch':>10} | {'sklearn (ms)':>12} | {'compiled (ms)':>13} | {'speed-up':>8} | identical")
+    for size in batch_sizes:
+        X = X_pool[rng.integers(0, len(X_pool), size)]
+        runs = 1 if size >= 1_000_000 else repeats
+        timings = {}
+        for name, fn in [('sklearn', model.predict), ('compiled', forest.predict)]:
+            start = time.perf_counter()
+            for _ in range(runs):
+                result = fn(X)
+            timings[name] = ((time.perf_counter() - start) / runs * 1000, result)
+        identical = np.array_equal(timings['sklearn'][1], timings['compiled'][1])
+        sk_ms, cp_ms = timings['sklearn'][0], timings['compiled'][0]
+        print(f"{size:>10,} | {sk_ms:>12.2f} | {cp_ms:>13.2f} | {sk_ms / cp_ms:>7.1f}x | {identical}")
+
+
+if __name__ == "__main__":
+    import warnings
+    import pandas as pd
+    from predict import load_assets
+    from fast_encoder import FeatureEncoder
+
+    model, model_columns, preprocessor = load_assets('titanic_model.pkl', 'model_columns.pkl')
+    # sklearn warns about missing feature names for plain arrays; irrelevant for the timing
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    X_pool = FeatureEncoder.from_preprocessor(preprocessor).transform(pd.read_csv('train.csv'))
+    benchmark(model, X_pool)